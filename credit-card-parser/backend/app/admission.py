@@ -0,0 +1,177 @@
+"""
+Admission control for the upload path
+Caps concurrent parses and concurrent OCR jobs, with bounded wait queues;
+requests beyond the queue are rejected immediately with a retry hint
+"""
+import itertools
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+import logging
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Retry-After bounds in seconds
+MIN_RETRY_AFTER = 1
+MAX_RETRY_AFTER = 120
+
+# Weight of the newest sample in the hold-time moving average
+HOLD_TIME_SMOOTHING = 0.2
+
+
+class Saturated(Exception):
+    """Raised when a gate cannot admit a request"""
+
+    def __init__(self, gate: str, status_code: int, retry_after: int, reason: str):
+        super().__init__(f"{gate} {reason}")
+        self.gate = gate
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class Slot:
+    """A held gate slot; release() is idempotent"""
+
+    def __init__(self, gate: "AdmissionGate"):
+        self._gate = gate
+        self._acquired_at = time.monotonic()
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self._gate._release(time.monotonic() - self._acquired_at)
+
+
+class AdmissionGate:
+    """
+    Counting semaphore with a bounded, ordered wait queue
+
+    Up to limit holders run at once and up to max_queue callers wait in
+    arrival order. A caller that finds the queue full gets 429 at once;
+    one that waits longer than wait_timeout gets 503.
+    """
+
+    def __init__(self, name: str, limit: int, max_queue: int, wait_timeout: float):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.wait_timeout = wait_timeout
+        self._condition = threading.Condition()
+        self._tickets = itertools.count()
+        self._waiting = []  # tickets in arrival order
+        self._active = 0
+        self._hold_time = 1.0  # seconds, moving average
+        self.admitted = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+
+    def acquire(self) -> Slot:
+        """Wait for a slot; raises Saturated when the queue is full or the wait times out"""
+        with self._condition:
+            if self._active < self.limit and not self._waiting:
+                return self._admit()
+
+            if len(self._waiting) >= self.max_queue:
+                self.rejected_queue_full += 1
+                raise Saturated(self.name, 429, self._retry_after(), "queue full")
+
+            ticket = next(self._tickets)
+            self._waiting.append(ticket)
+            deadline = time.monotonic() + self.wait_timeout
+            try:
+                while not (self._waiting[0] == ticket and self._active < self.limit):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.rejected_timeout += 1
+                        raise Saturated(self.name, 503, self._retry_after(), "wait timed out")
+                    self._condition.wait(remaining)
+            finally:
+                self._waiting.remove(ticket)
+                self._condition.notify_all()
+            return self._admit()
+
+    @contextmanager
+    def slot(self) -> Iterator[Slot]:
+        """Hold a slot for the duration of the block (it may be released early)"""
+        held = self.acquire()
+        try:
+            yield held
+        finally:
+            held.release()
+
+    def _admit(self) -> Slot:
+        self._active += 1
+        self.admitted += 1
+        return Slot(self)
+
+    def _release(self, held_for: float):
+        with self._condition:
+            self._active -= 1
+            self._hold_time += HOLD_TIME_SMOOTHING * (held_for - self._hold_time)
+            self._condition.notify_all()
+
+    def _retry_after(self) -> int:
+        """Seconds until the queue ahead would likely have drained"""
+        rounds = (len(self._waiting) + 1) / max(self.limit, 1)
+        return int(min(max(math.ceil(rounds * self._hold_time), MIN_RETRY_AFTER), MAX_RETRY_AFTER))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._condition:
+            return {
+                "limit": self.limit,
+                "active": self._active,
+                "queued": len(self._waiting),
+                "max_queue": self.max_queue,
+                "admitted": self.admitted,
+                "rejected_queue_full": self.rejected_queue_full,
+                "rejected_timeout": self.rejected_timeout,
+                "avg_hold_seconds": round(self._hold_time, 3),
+            }
+
+
+_gates: Dict[str, AdmissionGate] = {}
+_gates_lock = threading.Lock()
+
+
+def _get_gate(name: str, limit: int, max_queue: int, wait_timeout: float) -> AdmissionGate:
+    with _gates_lock:
+        if name not in _gates:
+            _gates[name] = AdmissionGate(name, limit, max_queue, wait_timeout)
+        return _gates[name]
+
+
+def get_parse_gate() -> AdmissionGate:
+    """Gate around a whole upload parse (text extraction and field extraction)"""
+    return _get_gate(
+        "parse", settings.PARSE_CONCURRENCY, settings.PARSE_QUEUE_SIZE, settings.PARSE_QUEUE_TIMEOUT_SECONDS
+    )
+
+
+def get_ocr_gate() -> AdmissionGate:
+    """Gate around rasterizing and OCR'ing one document"""
+    return _get_gate(
+        "ocr", settings.OCR_CONCURRENCY, settings.OCR_QUEUE_SIZE, settings.OCR_QUEUE_TIMEOUT_SECONDS
+    )
+
+
+@contextmanager
+def ocr_admission(parse_slot: Optional[Slot] = None) -> Iterator[Slot]:
+    """
+    Enter the OCR gate, first giving up the caller's parse slot
+
+    OCR documents then wait (and run) outside the parse gate, so digital
+    PDFs are never queued behind scanned ones.
+    """
+    if parse_slot is not None:
+        parse_slot.release()
+    with get_ocr_gate().slot() as held:
+        yield held
+
+
+def admission_stats() -> Dict[str, Any]:
+    return {"parse": get_parse_gate().stats(), "ocr": get_ocr_gate().stats()}
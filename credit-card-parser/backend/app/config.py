@@ -2,6 +2,8 @@
 Application configuration
 """
 import os
+from typing import Optional
+
 from pydantic_settings import BaseSettings
 
 
@@ -10,6 +12,13 @@ class Settings(BaseSettings):
     
     # Database
     DATABASE_URL: str = "postgresql://parser:parser123@db:5432/credit_parser"
+    DB_CREATE_ALL: bool = True  # Create missing tables at startup (alembic manages changes)
+    REPLICA_DATABASE_URL: Optional[str] = None  # Read replica for /results, /history, /statements/due
+    REPLICA_STICKY_SECONDS: int = 10  # After an upload, that client reads from the primary this long
+    REPLICA_RETRY_SECONDS: float = 30  # A failing replica is skipped this long
+    PARTITION_PREMAKE_MONTHS: int = 3  # Monthly partitions created ahead of time (PostgreSQL)
+    RETENTION_MONTHS: int = 0  # Full months kept before the current one; 0 keeps everything
+    ARCHIVE_DIR: str = "archive"  # Retention writes .csv.gz archives here
     
     # API
     API_HOST: str = "0.0.0.0"
@@ -21,9 +30,76 @@ class Settings(BaseSettings):
     ALLOWED_EXTENSIONS: list = [".pdf"]
     
     # Parser
+    PDF_TEXT_BACKEND: str = "auto"  # "auto" (fastest installed), "pypdfium2", "pdfminer" or "pypdf2"
     OCR_ENABLED: bool = True
     OCR_DPI: int = 300
     MAX_PAGES_OCR: int = 3
+    OCR_BACKEND: str = "auto"  # "auto", "tesserocr" or "pytesseract"
+    OCR_WORKERS: int = 2  # 0 = recognize in the calling thread
+    OCR_DESKEW: bool = True
+    OCR_COLLAPSE_BLANK_ROWS: bool = True
+    OCR_CACHE_ENABLED: bool = True
+    OCR_CACHE_DIR: str = "ocr_cache"
+    OCR_CACHE_MAX_MB: int = 512
+    OCR_WORKER_MAX_TASKS: int = 0  # OCR pool replaced after this many pages per worker; 0 = never
+    OCR_WORKER_MAX_RSS_MB: int = 0  # ... or once a worker's RSS passes this; 0 = no limit
+    
+    # Admission control (requests beyond the queue are rejected with Retry-After)
+    PARSE_CONCURRENCY: int = 4
+    PARSE_QUEUE_SIZE: int = 16
+    PARSE_QUEUE_TIMEOUT_SECONDS: float = 30
+    OCR_CONCURRENCY: int = 2  # Documents rasterized at once (300-DPI pages are large)
+    OCR_QUEUE_SIZE: int = 8
+    OCR_QUEUE_TIMEOUT_SECONDS: float = 60
+    
+    # Recycling: an API or queue worker process past a limit drains and exits (0 = no limit)
+    WORKER_MAX_JOBS: int = 0  # Parses per process
+    WORKER_MAX_RSS_MB: int = 0
+    # Set when something restarts the process after it exits (container restart
+    # policy, systemd, supervisord); uvicorn --workers does not respawn workers.
+    # The limits above are ignored without it
+    PROCESS_SUPERVISED: bool = False
+    
+    # Write-behind: group-commit parse results (acknowledged after the batch commits)
+    WRITE_BEHIND_ENABLED: bool = False  # False = strict mode, one transaction per upload
+    WRITE_BEHIND_BATCH_SIZE: int = 100
+    WRITE_BEHIND_FLUSH_MS: float = 10  # Longest a statement waits for its batch to fill
+    WRITE_BEHIND_MAX_PENDING: int = 1000  # Writers block while this many uploads wait
+    WRITE_BEHIND_TIMEOUT_SECONDS: float = 30
+    
+    # Job queue: API nodes only enqueue uploads, `python -m app.worker` parses them
+    JOB_QUEUE_ENABLED: bool = False
+    JOB_QUEUE_MAX_PENDING: int = 1000  # Queued jobs beyond this are rejected with 429
+    JOB_LEASE_SECONDS: int = 120  # Renewed while a worker is parsing; expiry means the worker died
+    JOB_MAX_ATTEMPTS: int = 3
+    JOB_RETRY_BACKOFF_SECONDS: float = 10  # Doubles with every attempt
+    JOB_POLL_INTERVAL_SECONDS: float = 1.0  # Idle worker sleep between claims
+    
+    SEGMENTATION_ENABLED: bool = False  # Split PDFs holding several statements (months or cards)
+    SEGMENT_WORKERS: int = 2  # Processes parsing segments in parallel (capped at available CPUs); 0 = in the calling thread
+    SEGMENT_PARALLEL_MIN: int = 4  # Fewer segments than this are parsed in the calling thread
+    
+    EXTRACT_HEADER_CHARS: int = 4000  # Header window when page boundaries are unknown
+    EXTRACT_CONFIDENCE_THRESHOLD: float = 0.8  # Fields below this search wider windows
+    PATTERN_STATS_ENABLED: bool = True
+    PATTERN_STATS_PATH: str = "pattern_stats.json"
+    PATTERN_STATS_SAVE_EVERY: int = 100  # Wins between writes to the stats file
+    PARSE_MEMO_SIZE: int = 1024  # Memoized parse results per process; 0 disables
+    PARSE_MEMO_TTL_SECONDS: int = 3600
+    
+    # Responses
+    GZIP_MIN_BYTES: int = 1024  # Smaller responses are not compressed
+    GZIP_LEVEL: int = 5  # Most of the size win of level 9 at a fraction of the CPU
+    RESULT_CACHE_SIZE: int = 4096  # Serialized /results responses kept in memory; 0 disables
+    RESULT_CACHE_TTL_SECONDS: int = 600  # Bounds staleness after a re-extraction run
+    RESULT_MAX_AGE_SECONDS: int = 0  # Browser reuse of /results without revalidating; 0 = always revalidate (ETag)
+    
+    # Profiling of uploads (profiles are downloaded from /admin/profiles)
+    PROFILING_ENABLED: bool = False  # Off: X-Profile headers are ignored and nothing is sampled
+    PROFILE_SAMPLE_RATE: float = 0.0  # Fraction of uploads profiled without an X-Profile header
+    PROFILE_MODE: str = "sample"  # "sample" (stack sampling, speedscope) or "cprofile" (pstats)
+    PROFILE_SAMPLE_INTERVAL_MS: float = 5
+    PROFILE_BUFFER_SIZE: int = 20  # Most recent profiles kept in memory per process
     
     # Security
     CORS_ORIGINS: list = ["http://localhost:3000", "http://frontend:3000"]
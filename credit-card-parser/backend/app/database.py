@@ -1,20 +1,39 @@
 """
 Database configuration and session management
+Writes always go to the primary; read-only routes can be served by an
+optional replica (REPLICA_DATABASE_URL) through read_router
 """
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+import logging
+
 from sqlalchemy import create_engine
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 import os
 
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
 DATABASE_URL = os.getenv(
     "DATABASE_URL", 
     "postgresql://parser:parser123@db:5432/credit_parser"
 )
+REPLICA_DATABASE_URL = os.getenv("REPLICA_DATABASE_URL")
 
 engine = create_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# Separate pool, so dashboard reads never wait for connections held by uploads
+replica_engine = create_engine(REPLICA_DATABASE_URL, pool_pre_ping=True) if REPLICA_DATABASE_URL else None
+ReplicaSessionLocal = (
+    sessionmaker(autocommit=False, autoflush=False, bind=replica_engine) if replica_engine is not None else None
+)
+
 
 def get_db():
     """Dependency for FastAPI routes"""
@@ -22,4 +41,88 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+class ReadRouter:
+    """
+    Runs read-only queries on the replica, falling back to the primary
+
+    The primary is used when there is no replica, when the caller asks
+    for it (a client that wrote moments ago), when the replica errors
+    (it is then skipped for retry_seconds) and, if retry_on_primary says
+    so, when the replica's answer may just be lagging (e.g. a row not
+    found that was inserted moments ago).
+    """
+
+    def __init__(
+        self,
+        primary: sessionmaker,
+        replica: Optional[sessionmaker] = None,
+        retry_seconds: float = 30
+    ):
+        self.primary = primary
+        self.replica = replica
+        self.retry_seconds = retry_seconds
+        self._replica_down_until = 0.0
+        self._lock = threading.Lock()
+        self.counts = {"replica": 0, "primary": 0, "sticky": 0, "replica_errors": 0, "lag_retries": 0}
+
+    def run(
+        self,
+        query: Callable[[Session], Any],
+        use_primary: bool = False,
+        retry_on_primary: Optional[Callable[[Any], bool]] = None
+    ) -> Any:
+        """
+        Run query(session) and return its result
+
+        Args:
+            query: Reads through the session it is given (session closed afterwards)
+            use_primary: Read-your-writes; skip the replica
+            retry_on_primary: Predicate on the replica's result that re-runs the query on the primary
+        """
+        if use_primary:
+            self._count("sticky")
+        elif self._replica_available():
+            try:
+                result = self._run_on(self.replica, query)
+            except DBAPIError as e:
+                logger.warning(f"Replica read failed, using primary for {self.retry_seconds}s: {e}")
+                with self._lock:
+                    self._replica_down_until = time.monotonic() + self.retry_seconds
+                    self.counts["replica_errors"] += 1
+            else:
+                if retry_on_primary is None or not retry_on_primary(result):
+                    self._count("replica")
+                    return result
+                self._count("lag_retries")
+
+        self._count("primary")
+        return self._run_on(self.primary, query)
+
+    def _replica_available(self) -> bool:
+        return self.replica is not None and time.monotonic() >= self._replica_down_until
+
+    @staticmethod
+    def _run_on(sessions: sessionmaker, query: Callable[[Session], Any]) -> Any:
+        db = sessions()
+        try:
+            return query(db)
+        finally:
+            db.close()
+
+    def _count(self, key: str):
+        with self._lock:
+            self.counts[key] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "replica_configured": self.replica is not None,
+                "replica_available": self._replica_available(),
+                **self.counts,
+            }
+
+
+read_router = ReadRouter(SessionLocal, ReplicaSessionLocal, settings.REPLICA_RETRY_SECONDS)
@@ -0,0 +1,270 @@
+"""
+Database-backed parse job queue
+API nodes enqueue uploads; workers (python -m app.worker) claim them with
+SELECT ... FOR UPDATE SKIP LOCKED on PostgreSQL, or an optimistic
+conditional UPDATE elsewhere (SQLite for local runs). A claimed job is
+leased: the worker renews the lease while parsing, and a job whose lease
+expires is requeued (or failed once out of attempts)
+"""
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+import json
+import logging
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.admission import Saturated
+from app.config import settings
+from app.models import ParseJob
+from app.utils.serialization import dumps
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# Candidates tried per claim where rows cannot be locked (lost races skip to the next)
+CLAIM_CANDIDATES = 5
+# Retry-After when the queue is full
+QUEUE_FULL_RETRY_AFTER = 30
+# Stuck jobs and failures listed by queue_stats
+LISTED_JOBS = 10
+
+
+def enqueue_job(
+    db: Session,
+    job_id: str,
+    filename: str,
+    content: bytes,
+    file_hash: str,
+    idempotency_key: Optional[str] = None
+) -> ParseJob:
+    """
+    Add an upload to the queue (committed)
+
+    Raises:
+        Saturated: JOB_QUEUE_MAX_PENDING jobs are already waiting
+    """
+    pending = db.query(func.count(ParseJob.id)).filter(ParseJob.status == QUEUED).scalar()
+    if pending >= settings.JOB_QUEUE_MAX_PENDING:
+        raise Saturated("job_queue", 429, QUEUE_FULL_RETRY_AFTER, "queue full")
+
+    now = datetime.utcnow()
+    job = ParseJob(
+        id=job_id,
+        filename=filename,
+        file_hash=file_hash,
+        idempotency_key=idempotency_key,
+        content=content,
+        status=QUEUED,
+        attempts=0,
+        available_at=now,
+        created_at=now
+    )
+    db.add(job)
+    db.commit()
+    return job
+
+
+def find_job_by_key(db: Session, idempotency_key: str) -> Optional[ParseJob]:
+    """Earliest job with this Idempotency-Key that has not failed"""
+    return db.query(ParseJob).filter(
+        ParseJob.idempotency_key == idempotency_key,
+        ParseJob.status != FAILED
+    ).order_by(ParseJob.created_at).first()
+
+
+def claim_job(db: Session, worker_id: str, now: Optional[datetime] = None) -> Optional[ParseJob]:
+    """
+    Lease the oldest available job to worker_id
+
+    Returns:
+        The claimed job (status running, attempts incremented), or None
+    """
+    now = now or datetime.utcnow()
+    skip_locked = db.get_bind().dialect.name == "postgresql"
+
+    candidates = db.query(ParseJob.id).filter(
+        ParseJob.status == QUEUED,
+        ParseJob.available_at <= now
+    ).order_by(ParseJob.available_at).limit(1 if skip_locked else CLAIM_CANDIDATES)
+    if skip_locked:
+        # Rows locked by other workers' claims are skipped, not waited on
+        candidates = candidates.with_for_update(skip_locked=True)
+
+    for (job_id,) in candidates.all():
+        # The status check makes the claim safe without row locks too
+        claimed = db.query(ParseJob).filter(
+            ParseJob.id == job_id,
+            ParseJob.status == QUEUED
+        ).update({
+            ParseJob.status: RUNNING,
+            ParseJob.attempts: ParseJob.attempts + 1,
+            ParseJob.lease_owner: worker_id,
+            ParseJob.lease_expires_at: now + timedelta(seconds=settings.JOB_LEASE_SECONDS),
+            ParseJob.started_at: now
+        }, synchronize_session=False)
+        if claimed:
+            db.commit()
+            return db.get(ParseJob, job_id)
+
+    db.rollback()
+    return None
+
+
+def renew_lease(db: Session, job_id: str, worker_id: str) -> bool:
+    """Extend a running job's lease; False if worker_id no longer holds it"""
+    renewed = db.query(ParseJob).filter(
+        ParseJob.id == job_id,
+        ParseJob.status == RUNNING,
+        ParseJob.lease_owner == worker_id
+    ).update({
+        ParseJob.lease_expires_at: datetime.utcnow() + timedelta(seconds=settings.JOB_LEASE_SECONDS)
+    }, synchronize_session=False)
+    db.commit()
+    return bool(renewed)
+
+
+def complete_job(db: Session, job_id: str, worker_id: str, result: Dict[str, Any]) -> bool:
+    """Mark a job done with its ParseResponse body; False if the lease was lost"""
+    completed = db.query(ParseJob).filter(
+        ParseJob.id == job_id,
+        ParseJob.status == RUNNING,
+        ParseJob.lease_owner == worker_id
+    ).update({
+        ParseJob.status: DONE,
+        ParseJob.result: dumps(result).decode(),
+        ParseJob.content: None,
+        ParseJob.lease_expires_at: None,
+        ParseJob.finished_at: datetime.utcnow()
+    }, synchronize_session=False)
+    db.commit()
+    return bool(completed)
+
+
+def fail_job(db: Session, job_id: str, worker_id: str, error: str, retryable: bool = True) -> Optional[str]:
+    """
+    Record a failed attempt
+
+    Retryable failures are requeued with exponential backoff until
+    JOB_MAX_ATTEMPTS is reached.
+
+    Returns:
+        New status (queued or failed), or None if the lease was lost
+    """
+    job = db.query(ParseJob).filter(
+        ParseJob.id == job_id,
+        ParseJob.status == RUNNING,
+        ParseJob.lease_owner == worker_id
+    ).first()
+    if job is None:
+        db.rollback()
+        return None
+
+    now = datetime.utcnow()
+    job.last_error = error[:2000]
+    job.lease_owner = None
+    job.lease_expires_at = None
+    if retryable and job.attempts < settings.JOB_MAX_ATTEMPTS:
+        job.status = QUEUED
+        job.available_at = now + timedelta(seconds=retry_backoff(job.attempts))
+    else:
+        job.status = FAILED
+        job.finished_at = now
+    db.commit()
+    return job.status
+
+
+def retry_backoff(attempts: int) -> float:
+    """Delay before the next attempt after `attempts` failures"""
+    return settings.JOB_RETRY_BACKOFF_SECONDS * 2 ** max(attempts - 1, 0)
+
+
+def reap_expired_leases(db: Session, now: Optional[datetime] = None) -> int:
+    """
+    Requeue running jobs whose worker stopped renewing the lease
+
+    Jobs already out of attempts are failed instead, so a PDF that kills
+    its worker cannot crash the pool forever.
+
+    Returns:
+        Number of jobs reaped
+    """
+    now = now or datetime.utcnow()
+    expired = (
+        ParseJob.status == RUNNING,
+        ParseJob.lease_expires_at < now
+    )
+    failed = db.query(ParseJob).filter(*expired, ParseJob.attempts >= settings.JOB_MAX_ATTEMPTS).update({
+        ParseJob.status: FAILED,
+        ParseJob.last_error: "Lease expired (worker stopped) on the last attempt",
+        ParseJob.lease_owner: None,
+        ParseJob.lease_expires_at: None,
+        ParseJob.finished_at: now
+    }, synchronize_session=False)
+    requeued = db.query(ParseJob).filter(*expired).update({
+        ParseJob.status: QUEUED,
+        ParseJob.last_error: "Lease expired (worker stopped)",
+        ParseJob.lease_owner: None,
+        ParseJob.lease_expires_at: None,
+        ParseJob.available_at: now
+    }, synchronize_session=False)
+    db.commit()
+    if failed or requeued:
+        logger.warning(f"Reaped expired leases: {requeued} requeued, {failed} failed")
+    return failed + requeued
+
+
+def job_status(job: ParseJob) -> Dict[str, Any]:
+    """GET /jobs/{job_id} response body"""
+    body = {
+        "id": job.id,
+        "filename": job.filename,
+        "status": job.status,
+        "attempts": job.attempts,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+        "error": job.last_error if job.status == FAILED else None,
+        "status_url": f"/jobs/{job.id}",
+    }
+    if job.status == DONE:
+        body["result_url"] = f"/results/{job.id}"
+        body["result"] = json.loads(job.result) if job.result else None
+    return body
+
+
+def queue_stats(db: Session, now: Optional[datetime] = None) -> Dict[str, Any]:
+    """
+    Queue depth per status, age of the oldest queued job, jobs whose lease
+    has expired (stuck) and the latest failures
+    """
+    now = now or datetime.utcnow()
+    counts = dict(db.query(ParseJob.status, func.count(ParseJob.id)).group_by(ParseJob.status).all())
+    oldest = db.query(func.min(ParseJob.created_at)).filter(ParseJob.status == QUEUED).scalar()
+
+    stuck = db.query(
+        ParseJob.id, ParseJob.lease_owner, ParseJob.attempts, ParseJob.lease_expires_at
+    ).filter(
+        ParseJob.status == RUNNING,
+        ParseJob.lease_expires_at < now
+    ).order_by(ParseJob.lease_expires_at).limit(LISTED_JOBS).all()
+
+    failures = db.query(
+        ParseJob.id, ParseJob.filename, ParseJob.attempts, ParseJob.last_error, ParseJob.finished_at
+    ).filter(ParseJob.status == FAILED).order_by(ParseJob.finished_at.desc()).limit(LISTED_JOBS).all()
+
+    return {
+        "counts": {status: counts.get(status, 0) for status in (QUEUED, RUNNING, DONE, FAILED)},
+        "oldest_queued_seconds": round((now - oldest).total_seconds(), 1) if oldest else None,
+        "stuck": [_row(row) for row in stuck],
+        "recent_failures": [_row(row) for row in failures],
+    }
+
+
+def _row(row) -> Dict[str, Any]:
+    return {key: value.isoformat() if isinstance(value, datetime) else value for key, value in row._asdict().items()}
+
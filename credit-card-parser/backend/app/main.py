@@ -3,36 +3,86 @@ FastAPI Backend for Credit Card Statement Parser
 Provides REST API for PDF upload, parsing, and result retrieval
 """
 
-from fastapi import FastAPI, File, UploadFile, HTTPException
+from fastapi import FastAPI, File, UploadFile, HTTPException, Query, Header, Cookie, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
 import uvicorn
+import asyncio
+from contextlib import asynccontextmanager
 import logging
 from pathlib import Path
 import uuid
-from datetime import datetime
-
-from app.database import engine, SessionLocal, Base
-from app.models import ParsedStatement, ParseResponse
-from app.parser.pdf_reader import extract_text_from_pdf
-from app.parser.ocr_handler import extract_text_with_ocr
-from app.parser.issuer_detector import detect_issuer
-from app.parser.extractors import extract_fields
+import hashlib
+from datetime import datetime, date, timedelta
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+
+from app.database import SessionLocal, read_router
+from app.admission import Saturated, admission_stats, get_parse_gate
+from app.config import settings
+from app.jobs import enqueue_job, find_job_by_key, job_status, queue_stats
+from app.models import ParsedStatement, ParseJob, StatementText, ParseResponse, HistoryItem
+from app.parser.extractors import TRACKED_PATTERNS
+from app.parser.memo import get_parse_memo
+from app.parser.pattern_stats import get_pattern_stats, describe_wins
+from app.pipeline import extract_document_pages, join_pages, page_ends, parse_text, statement_columns
+from app.text_store import build_statement_text, load_fields, load_text, load_pages
+from app.memory import get_memory_guard, memory_stats, track_memory
+from app.profiling import choose_profile_mode, get_profile_buffer, run_profiled
+from app.search import search_statements
+from app.result_cache import get_result_cache, serialize_result, etag_matches
+from app.parser.ocr_cache import get_ocr_cache
+from app.parser.ocr_backends import ocr_pool_stats, shutdown_ocr_pool
+from app.parser.segmentation import get_segment_parser, segment_pages, shutdown_segment_parser
+from app.parser.text_backends import get_text_backends
 from app.utils.logger import setup_logger
+from app.utils.serialization import FastJSONResponse
+from app.utils.singleflight import SingleFlight
+from app.warmup import prepare_storage, warm_up, readiness
+from app.write_behind import close_writer, get_writer, store_statements
+
+logger = logging.getLogger(__name__)
 
-# Initialize logger
-logger = setup_logger(__name__)
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Application startup and shutdown
+    
+    Startup only creates storage; warm-up (parser modules, OCR stack,
+    database pool) runs in the background while / already answers,
+    and /ready turns 200 when it is done. Log handlers (and logs/) are
+    set up here rather than on import.
+    """
+    setup_logger(__name__)
+    await run_in_threadpool(prepare_storage, UPLOAD_DIR)
+    app.state.warmup = asyncio.create_task(run_in_threadpool(warm_up))
+    yield
+    # Commit statements still waiting in the write-behind buffer
+    await run_in_threadpool(close_writer)
+    # Stop the OCR and segment parsing worker processes
+    shutdown_ocr_pool()
+    shutdown_segment_parser()
+    # Keep pattern wins learned since the last periodic save
+    pattern_stats = get_pattern_stats()
+    if pattern_stats is not None:
+        pattern_stats.save()
+
 
 # Initialize FastAPI app
 app = FastAPI(
     title="Credit Card Statement Parser API",
     description="Extract key details from credit card statements",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
 
+# Compress large payloads (history pages); small responses are sent as is
+app.add_middleware(GZipMiddleware, minimum_size=settings.GZIP_MIN_BYTES, compresslevel=settings.GZIP_LEVEL)
+
 # CORS configuration for frontend
 app.add_middleware(
     CORSMiddleware,
@@ -42,9 +92,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Temporary storage for uploaded files
+# Uploads in progress, keyed by file hash
+upload_flights = SingleFlight()
+
+# Set after an upload; reads carrying it skip the replica
+READ_PRIMARY_COOKIE = "read_primary"
+
+# Temporary storage for uploaded files (created at startup)
 UPLOAD_DIR = Path("uploads")
-UPLOAD_DIR.mkdir(exist_ok=True)
 
 
 @app.get("/")
@@ -57,11 +112,94 @@ async def root():
     }
 
 
+@app.get("/ready")
+async def ready():
+    """
+    Readiness check: 503 until warm-up has finished and the database is
+    reachable, and again while the process drains before recycling
+    """
+    state = readiness()
+    state["recycling"] = get_memory_guard().reason
+    ready = state["ready"] and state["recycling"] is None
+    return FastJSONResponse(state, status_code=200 if ready else 503)
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """Runtime counters for the parsing pipeline"""
+    ocr_cache = get_ocr_cache()
+    parse_memo = get_parse_memo()
+    result_cache = get_result_cache()
+    writer = get_writer()
+    return {
+        "ocr_cache": ocr_cache.stats() if ocr_cache is not None else None,
+        "parse_memo": parse_memo.stats() if parse_memo is not None else None,
+        "result_cache": result_cache.stats() if result_cache is not None else None,
+        "upload_flights": upload_flights.stats(),
+        "admission": admission_stats(),
+        "pdf_text": get_text_backends().stats(),
+        "write_behind": writer.stats() if writer is not None else None,
+        "read_router": read_router.stats(),
+        "memory": {**memory_stats(), "ocr_pool": ocr_pool_stats()},
+        "segments": get_segment_parser().stats()
+    }
+
+
+@app.get("/admin/pattern-wins")
+async def get_pattern_wins():
+    """Win counts of each extraction pattern per field and issuer"""
+    return {
+        "enabled": get_pattern_stats() is not None,
+        "fields": describe_wins(TRACKED_PATTERNS)
+    }
+
+
+@app.get("/admin/profiles")
+async def list_profiles():
+    """Recent upload profiles of this process, newest first"""
+    return {
+        "enabled": settings.PROFILING_ENABLED,
+        "sample_rate": settings.PROFILE_SAMPLE_RATE,
+        "mode": settings.PROFILE_MODE,
+        "profiles": get_profile_buffer().list()
+    }
+
+
+@app.get("/admin/profiles/{profile_id}")
+async def download_profile(profile_id: str, format: str = Query("file", pattern="^(file|text)$")):
+    """
+    Download a profile: .pstats (cProfile) or speedscope JSON (sampled),
+    or with format=text a readable summary
+    """
+    profile = get_profile_buffer().get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found (evicted, or recorded by another worker)")
+    if format == "text":
+        return Response(content=profile.summary(), media_type="text/plain")
+    
+    content, media_type, filename = profile.export()
+    return Response(
+        content=content,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
 @app.post("/upload", response_model=ParseResponse)
-async def upload_statement(file: UploadFile = File(...)):
+async def upload_statement(
+    file: UploadFile = File(...),
+    idempotency_key: Optional[str] = Header(None, max_length=128),
+    x_profile: Optional[str] = Header(None, max_length=16)
+):
     """
     Upload and parse credit card statement PDF
     
+    A repeated Idempotency-Key returns the stored result of the first
+    request. Concurrent uploads of the same file (and key) share one parse.
+    With JOB_QUEUE_ENABLED the upload is queued for a worker instead and
+    202 is returned with the job status (poll /jobs/{id}).
+    With PROFILING_ENABLED, X-Profile: cprofile|sample profiles the parse.
+    
     Returns:
         ParseResponse with extracted fields and confidence scores
     """
@@ -72,23 +210,106 @@ async def upload_statement(file: UploadFile = File(...)):
         raise HTTPException(status_code=400, detail="Only PDF files are supported")
     
     try:
-        # Generate unique ID for this parsing session
-        session_id = str(uuid.uuid4())
+        content = await file.read()
+        file_hash = hashlib.sha256(content).hexdigest()
+        
+        if idempotency_key:
+            replay = await run_in_threadpool(replay_upload, idempotency_key)
+            if replay is not None:
+                logger.info(f"Replaying result {replay['id']} for idempotency key")
+                # A job still waiting for a worker is replayed as 202 too
+                return FastJSONResponse(replay, status_code=200 if replay["status"] == "success" else 202)
+        
+        # Queue mode: store the upload for a worker node and answer at once
+        if settings.JOB_QUEUE_ENABLED:
+            job = await run_in_threadpool(queue_upload, file.filename, content, file_hash, idempotency_key)
+            return read_your_writes(FastJSONResponse(job, status_code=202, headers={"Location": job["status_url"]}))
+        
+        # Identical files in flight at the same time are parsed once; the key
+        # is part of the flight so every Idempotency-Key gets its stored row
+        profile_mode = choose_profile_mode(x_profile)
+        result = await upload_flights.run(
+            (file_hash, idempotency_key),
+            lambda: run_in_threadpool(
+                run_profiled, profile_mode, f"upload {file.filename}",
+                process_upload, file.filename, content, file_hash, idempotency_key
+            )
+        )
+        return read_your_writes(FastJSONResponse(result))
         
+    except HTTPException:
+        raise
+    except Saturated as e:
+        logger.warning(f"Upload rejected: {e}")
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=f"Server busy ({e}), retry later",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except Exception as e:
+        logger.error(f"Error processing file: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Processing error: {str(e)}")
+
+
+def read_your_writes(response: Response) -> Response:
+    """
+    Pin the client's reads to the primary for a few seconds after a write,
+    so its own upload shows up in /history before the replica catches up
+    """
+    if read_router.replica is not None:
+        response.set_cookie(
+            READ_PRIMARY_COOKIE, "1", max_age=settings.REPLICA_STICKY_SECONDS, httponly=True, samesite="lax"
+        )
+    return response
+
+
+def process_upload(
+    filename: str,
+    content: bytes,
+    file_hash: str,
+    idempotency_key: Optional[str] = None,
+    session_id: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Parse an uploaded PDF and store the result (runs in the thread pool,
+    or in a queue worker with the job id as session_id)
+    
+    Counted by the memory guard, which recycles the process once it has
+    parsed WORKER_MAX_JOBS files or passed WORKER_MAX_RSS_MB.
+    
+    Returns:
+        ParseResponse body
+    """
+    with get_memory_guard().job(), track_memory("parse"):
+        return parse_and_store(filename, content, file_hash, idempotency_key, session_id)
+
+
+def parse_and_store(
+    filename: str,
+    content: bytes,
+    file_hash: str,
+    idempotency_key: Optional[str] = None,
+    session_id: Optional[str] = None
+) -> Dict[str, Any]:
+    """Body of process_upload: extract, parse, store and cache one upload"""
+    # Generate unique ID for this parsing session
+    session_id = session_id or str(uuid.uuid4())
+    
+    file_path = UPLOAD_DIR / f"{session_id}_{filename}"
+    parse_slot = None
+    try:
         # Save uploaded file temporarily
-        file_path = UPLOAD_DIR / f"{session_id}_{file.filename}"
         with open(file_path, "wb") as f:
-            content = await file.read()
             f.write(content)
-        
         logger.info(f"File saved: {file_path}")
         
-        # Step 1: Extract text (with OCR fallback)
-        text = extract_text_from_pdf(str(file_path))
+        # Wait for a parse slot (raises Saturated when overloaded)
+        parse_slot = get_parse_gate().acquire()
         
-        if not text or len(text.strip()) < 50:
-            logger.warning("Text extraction failed, trying OCR...")
-            text = extract_text_with_ocr(str(file_path))
+        # Step 1: Extract text (OCR only for pages without a usable text layer;
+        # OCR documents hand their parse slot over to the OCR gate)
+        pages = extract_document_pages(str(file_path), parse_slot)
+        text = join_pages(pages)
         
         if not text:
             raise HTTPException(
@@ -98,103 +319,332 @@ async def upload_statement(file: UploadFile = File(...)):
         
         logger.info(f"Extracted {len(text)} characters")
         
-        # Step 2: Detect issuer
-        issuer = detect_issuer(text)
-        logger.info(f"Detected issuer: {issuer}")
+        # Step 2: Split files holding several statements (months or cards)
+        segments = segment_pages(pages) if settings.SEGMENTATION_ENABLED else [pages]
         
-        # Step 3: Extract fields
-        extracted_data = extract_fields(text, issuer)
-        logger.info(f"Extracted fields: {extracted_data}")
+        # Step 3: Detect issuer and extract fields of each statement
+        if len(segments) == 1:
+            parsed = [parse_text(text, page_ends(pages))]
+        else:
+            parsed = get_segment_parser().parse([(join_pages(s), page_ends(s)) for s in segments])
         
-        # Step 4: Calculate overall confidence
-        confidence_scores = [v.get('confidence', 0) for v in extracted_data.values()]
-        overall_confidence = sum(confidence_scores) / len(confidence_scores) if confidence_scores else 0
-        
-        # Step 5: Save to database
-        db = SessionLocal()
-        try:
+        # Step 4: Build rows (including overall confidence); the first statement keeps the session id
+        created_at = datetime.utcnow()
+        records, responses = [], []
+        for index, (segment, (issuer, extracted_data)) in enumerate(zip(segments, parsed)):
+            statement_id = session_id if index == 0 else f"{session_id}-{index + 1}"
+            segment_text = text if len(segments) == 1 else join_pages(segment)
+            logger.info(f"Statement {statement_id}: issuer {issuer}, fields {extracted_data}")
+            columns = statement_columns(issuer, extracted_data)
             db_statement = ParsedStatement(
-                id=session_id,
-                filename=file.filename,
-                issuer=issuer,
-                card_last_four=extracted_data.get('card_last_four', {}).get('value'),
-                billing_cycle=extracted_data.get('billing_cycle', {}).get('value'),
-                due_date=extracted_data.get('due_date', {}).get('value'),
-                total_amount_due=extracted_data.get('total_amount_due', {}).get('value'),
-                confidence_score=overall_confidence,
-                raw_text=text[:1000],  # Store first 1000 chars
-                created_at=datetime.utcnow()
+                id=statement_id,
+                filename=filename,
+                **columns,
+                raw_text=segment_text[:1000],  # Preview; full text lives in statement_texts
+                file_hash=file_hash,
+                idempotency_key=idempotency_key,
+                upload_id=session_id,
+                first_page=segment[0]["page"],
+                last_page=segment[-1]["page"],
+                created_at=created_at
             )
-            db.add(db_statement)
-            db.commit()
-            db.refresh(db_statement)
-            logger.info(f"Saved to database with ID: {session_id}")
-        finally:
-            db.close()
+            records.append((db_statement, build_statement_text(statement_id, segment_text, segment, extracted_data)))
+            responses.append(upload_response(
+                statement_id, filename, issuer, extracted_data, columns["confidence_score"],
+                pages=(segment[0]["page"], segment[-1]["page"]) if len(segments) > 1 else None
+            ))
+        
+        # Step 5: Save to database (strict or group-committed; returns once durable)
+        store_statements(records)
+        logger.info(f"Saved {len(records)} statement(s) to database with ID: {session_id}")
         
+        # Dashboards poll /results right after upload; answer from memory
+        result_cache = get_result_cache()
+        if result_cache is not None:
+            for db_statement, _ in records:
+                result_cache.put(db_statement.id, serialize_result(db_statement))
+    finally:
+        if parse_slot is not None:
+            parse_slot.release()
         # Clean up uploaded file
         file_path.unlink(missing_ok=True)
-        
-        return ParseResponse(
-            id=session_id,
-            filename=file.filename,
-            issuer=issuer,
-            extracted_fields=extracted_data,
-            confidence_score=overall_confidence,
-            status="success"
+    
+    # Serialized straight from the result objects (no ParseResponse revalidation)
+    return combine_statements(responses)
+
+
+def replay_upload(idempotency_key: str) -> Optional[Dict[str, Any]]:
+    """
+    Response of an earlier upload with this Idempotency-Key, or None
+    
+    Built from the stored rows and the fields stored with them, so it
+    matches the original response. In queue mode a job still waiting or
+    running is returned instead.
+    """
+    replay = stored_upload_response(ParsedStatement.idempotency_key == idempotency_key)
+    if replay is not None or not settings.JOB_QUEUE_ENABLED:
+        return replay
+    
+    db = SessionLocal()
+    try:
+        job = find_job_by_key(db, idempotency_key)
+        return job_status(job) if job is not None else None
+    finally:
+        db.close()
+
+
+def stored_upload_response(criterion) -> Optional[Dict[str, Any]]:
+    """
+    ParseResponse body of the earliest stored upload with a statement
+    matching criterion (all its statements), or None
+    """
+    db = SessionLocal()
+    try:
+        with_text = db.query(ParsedStatement, StatementText).join(
+            StatementText, StatementText.statement_id == ParsedStatement.id
         )
+        first = with_text.filter(criterion).order_by(
+            ParsedStatement.created_at, ParsedStatement.first_page
+        ).first()
+        if first is None:
+            return None
         
-    except Exception as e:
-        logger.error(f"Error processing file: {str(e)}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"Processing error: {str(e)}")
+        upload_id = first[0].upload_id
+        rows = with_text.filter(ParsedStatement.upload_id == upload_id).order_by(
+            ParsedStatement.first_page
+        ).all() if upload_id else [first]
+    finally:
+        db.close()
+    
+    responses = []
+    for statement, stored in rows:
+        issuer, extracted_data, confidence_score = statement.issuer, load_fields(stored), statement.confidence_score
+        if extracted_data is None:
+            # Stored before extracted fields were kept: re-extract, with the matching confidence
+            issuer, extracted_data = parse_text(load_text(stored), page_ends(load_pages(stored)) or None)
+            confidence_score = statement_columns(issuer, extracted_data)["confidence_score"]
+        responses.append(upload_response(
+            statement.id, statement.filename, issuer, extracted_data, confidence_score,
+            pages=(statement.first_page, statement.last_page) if len(rows) > 1 else None
+        ))
+    return combine_statements(responses)
 
 
-@app.get("/results/{session_id}")
-async def get_results(session_id: str):
-    """Retrieve parsed results by session ID"""
+def queue_upload(
+    filename: str,
+    content: bytes,
+    file_hash: str,
+    idempotency_key: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Enqueue an upload for a worker (raises Saturated when the queue is full)
+    
+    Returns:
+        Job status body (status "queued")
+    """
     db = SessionLocal()
     try:
-        result = db.query(ParsedStatement).filter(ParsedStatement.id == session_id).first()
-        if not result:
-            raise HTTPException(status_code=404, detail="Result not found")
-        
-        return {
-            "id": result.id,
-            "filename": result.filename,
-            "issuer": result.issuer,
-            "card_last_four": result.card_last_four,
-            "billing_cycle": result.billing_cycle,
-            "due_date": result.due_date,
-            "total_amount_due": result.total_amount_due,
-            "confidence_score": result.confidence_score,
-            "created_at": result.created_at.isoformat()
-        }
+        job = enqueue_job(db, str(uuid.uuid4()), filename, content, file_hash, idempotency_key)
+        logger.info(f"Queued job {job.id} for {filename}")
+        return job_status(job)
     finally:
         db.close()
 
 
-@app.get("/history")
-async def get_history():
-    """Get all parsed statements history"""
+def upload_response(session_id, filename, issuer, extracted_data, confidence_score, pages=None) -> Dict[str, Any]:
+    """ParseResponse body for a stored statement (pages: its page range in a multi-statement file)"""
+    body = {
+        "id": session_id,
+        "filename": filename,
+        "issuer": issuer,
+        "extracted_fields": extracted_data,
+        "confidence_score": confidence_score,
+        "status": "success"
+    }
+    if pages is not None:
+        body["pages"] = list(pages)
+    return body
+
+
+def combine_statements(responses: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Response for all statements of one upload: unchanged for a single
+    statement, otherwise the first one's fields plus "statements"
+    """
+    if len(responses) == 1:
+        return responses[0]
+    return {**responses[0], "statements": responses}
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Status of a queued upload; includes the parse result once done"""
     db = SessionLocal()
     try:
-        statements = db.query(ParsedStatement).order_by(
-            ParsedStatement.created_at.desc()
-        ).limit(50).all()
-        
-        return [
-            {
-                "id": s.id,
-                "filename": s.filename,
-                "issuer": s.issuer,
-                "confidence_score": s.confidence_score,
-                "created_at": s.created_at.isoformat()
-            }
-            for s in statements
-        ]
+        job = db.get(ParseJob, job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+        return job_status(job)
+    finally:
+        db.close()
+
+
+@app.get("/admin/jobs")
+async def get_job_queue():
+    """Queue depth, oldest waiting job, stuck (lease expired) jobs and recent failures"""
+    db = SessionLocal()
+    try:
+        return {"enabled": settings.JOB_QUEUE_ENABLED, **queue_stats(db)}
     finally:
         db.close()
 
 
+@app.get("/results/{session_id}")
+async def get_results(
+    session_id: str,
+    if_none_match: Optional[str] = Header(None),
+    read_primary: Optional[str] = Cookie(None)
+):
+    """
+    Retrieve parsed results by session ID
+    
+    Results change when re-extracted and disappear under retention, so
+    responses carry a strong ETag that clients revalidate (no-cache, or a
+    short RESULT_MAX_AGE_SECONDS), and are served from memory when
+    possible. Otherwise they are read from the replica, if one is configured.
+    """
+    result_cache = get_result_cache()
+    cached = result_cache.get(session_id) if result_cache is not None else None
+    
+    if cached is None:
+        result = read_router.run(
+            lambda db: db.query(ParsedStatement).filter(ParsedStatement.id == session_id).first(),
+            use_primary=read_primary is not None,
+            retry_on_primary=lambda row: row is None  # May be too new to have replicated
+        )
+        if not result:
+            raise HTTPException(status_code=404, detail="Result not found")
+        cached = serialize_result(result)
+        if result_cache is not None:
+            result_cache.put(session_id, cached)
+    
+    body, etag = cached
+    headers = {
+        "ETag": etag,
+        "Cache-Control": (
+            f"private, max-age={settings.RESULT_MAX_AGE_SECONDS}" if settings.RESULT_MAX_AGE_SECONDS
+            else "private, no-cache"
+        )
+    }
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@app.get("/history", response_model=List[HistoryItem])
+async def get_history(
+    limit: int = Query(50, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    read_primary: Optional[str] = Cookie(None)
+):
+    """Get parsed statements history, newest first (from the replica, if configured)"""
+    def query(db):
+        # Only the listed columns; raw_text and typed fields are never loaded
+        return db.query(
+            ParsedStatement.id,
+            ParsedStatement.filename,
+            ParsedStatement.issuer,
+            ParsedStatement.confidence_score,
+            ParsedStatement.created_at
+        ).order_by(
+            ParsedStatement.created_at.desc()
+        ).offset(offset).limit(limit).all()
+    
+    rows = read_router.run(query, use_primary=read_primary is not None)
+    # Rows are already typed; serialize directly instead of revalidating as HistoryItem
+    return FastJSONResponse([row._asdict() for row in rows])
+
+
+@app.get("/statements/due")
+async def get_due_statements(
+    within_days: int = Query(7, ge=0, le=366),
+    min_amount: Optional[Decimal] = Query(None, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    read_primary: Optional[str] = Cookie(None)
+):
+    """
+    Statements due between today and today + within_days,
+    optionally above min_amount (range scan on due_on/amount_due)
+    """
+    today = date.today()
+    
+    def query(db):
+        statements = db.query(ParsedStatement).filter(
+            ParsedStatement.due_on >= today,
+            ParsedStatement.due_on <= today + timedelta(days=within_days)
+        )
+        if min_amount is not None:
+            statements = statements.filter(ParsedStatement.amount_due > min_amount)
+        
+        return statements.order_by(ParsedStatement.due_on).limit(limit).all()
+    
+    return [
+        {
+            "id": s.id,
+            "filename": s.filename,
+            "issuer": s.issuer,
+            "card_last_four": s.card_last_four,
+            "due_date": s.due_on.isoformat(),
+            "total_amount_due": str(s.amount_due) if s.amount_due is not None else None,
+            "confidence_score": s.confidence_score
+        }
+        for s in read_router.run(query, use_primary=read_primary is not None)
+    ]
+
+
+@app.get("/search")
+async def search(
+    card_last_four: Optional[str] = Query(None, pattern=r"^\d{4}$"),
+    issuer: Optional[str] = Query(None, max_length=100),
+    min_amount: Optional[Decimal] = Query(None, ge=0),
+    max_amount: Optional[Decimal] = Query(None, ge=0),
+    due_from: Optional[date] = None,
+    due_to: Optional[date] = None,
+    created_from: Optional[date] = None,
+    created_to: Optional[date] = None,
+    q: Optional[str] = Query(None, min_length=1, max_length=200),
+    limit: int = Query(50, ge=1, le=200),
+    read_primary: Optional[str] = Cookie(None)
+):
+    """
+    Search stored statements, newest first
+    
+    Every given filter must match: card and issuer exactly, amounts and
+    dates as inclusive ranges, q as words that all occur in the
+    statement text. At least one filter is required.
+    """
+    filters = {
+        "card_last_four": card_last_four,
+        "issuer": issuer,
+        "min_amount": min_amount,
+        "max_amount": max_amount,
+        "due_from": due_from,
+        "due_to": due_to,
+        "created_from": created_from,
+        "created_to": created_to,
+        "text": q,
+    }
+    if all(value is None for value in filters.values()):
+        raise HTTPException(status_code=400, detail="Give at least one search filter")
+    
+    # In the threadpool: the in-process text index may load every stored text
+    rows = await run_in_threadpool(
+        read_router.run,
+        lambda db: search_statements(db, limit=limit, **filters),
+        use_primary=read_primary is not None
+    )
+    return FastJSONResponse([row._asdict() for row in rows])
+
+
 if __name__ == "__main__":
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
@@ -0,0 +1,197 @@
+"""
+Process memory accounting and recycling
+Records RSS high-water marks per parsing stage (text layer, rasterizing,
+OCR, whole parse) for node sizing, and recycles a process that has parsed
+WORKER_MAX_JOBS statements or grown past WORKER_MAX_RSS_MB: it stops
+taking uploads (503 with Retry-After, /ready 503), lets the parses in
+flight finish, then sends itself SIGTERM for a graceful shutdown. The
+container or process manager starts a fresh one, so the limits only
+apply with PROCESS_SUPERVISED set. RSS is read from
+/proc (Linux); elsewhere only the peak from getrusage is available.
+"""
+import os
+import resource
+import signal
+import sys
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+import logging
+
+from app.admission import Saturated
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+# Retry-After while a process drains before recycling
+RECYCLE_RETRY_AFTER = 5
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def rss_bytes() -> Optional[int]:
+    """Current resident set size of this process, or None where /proc is unavailable"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def peak_rss_bytes() -> int:
+    """Highest RSS this process has reached"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # bytes on macOS, KiB on Linux
+
+
+def to_mb(value: Optional[float]) -> Optional[float]:
+    return round(value / MB, 1) if value is not None else None
+
+
+class StageMemory:
+    """
+    RSS high-water mark and growth per named stage
+
+    RSS is process-wide, so concurrent parses blur per-stage growth; the
+    high-water mark (RSS at the stage's end, or the process peak if the
+    stage raised it) is what sizes nodes.
+    """
+
+    def __init__(self):
+        self._stages: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def track(self, stage: str) -> Iterator[None]:
+        rss_before, peak_before = rss_bytes() or 0, peak_rss_bytes()
+        try:
+            yield
+        finally:
+            rss_after, peak_after = rss_bytes() or 0, peak_rss_bytes()
+            high_water = max(rss_before, rss_after, peak_after if peak_after > peak_before else 0)
+            self.record(stage, high_water, rss_after - rss_before)
+
+    def record(self, stage: str, high_water: float, growth: float = 0.0):
+        with self._lock:
+            entry = self._stages.setdefault(stage, {"calls": 0, "high_water": 0, "max_growth": 0, "total_growth": 0})
+            entry["calls"] += 1
+            entry["high_water"] = max(entry["high_water"], high_water)
+            entry["max_growth"] = max(entry["max_growth"], growth)
+            entry["total_growth"] += growth
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {
+                stage: {
+                    "calls": entry["calls"],
+                    "high_water_mb": to_mb(entry["high_water"]),
+                    "max_growth_mb": to_mb(entry["max_growth"]),
+                    "avg_growth_mb": to_mb(entry["total_growth"] / entry["calls"]),
+                }
+                for stage, entry in self._stages.items()
+            }
+
+
+class MemoryGuard:
+    """
+    Counts parses in this process and decides when to recycle it
+
+    Once a limit is passed the guard drains: job() refuses new work with
+    Saturated, and on_recycle runs when the last parse in flight ends.
+    A limit of 0 is off.
+    """
+
+    def __init__(self, max_jobs: int = 0, max_rss_mb: int = 0, on_recycle: Optional[Callable[[], None]] = None):
+        self.max_jobs = max_jobs
+        self.max_rss_mb = max_rss_mb
+        self.on_recycle = on_recycle or _terminate_self
+        self.jobs = 0
+        self.active = 0
+        self.reason: Optional[str] = None
+        self._recycled = False
+        self._lock = threading.Lock()
+
+    @property
+    def draining(self) -> bool:
+        return self.reason is not None
+
+    @contextmanager
+    def job(self) -> Iterator[None]:
+        """Wraps one parse; raises Saturated while the process is draining"""
+        with self._lock:
+            if self.draining:
+                raise Saturated("memory_guard", 503, RECYCLE_RETRY_AFTER, "process recycling")
+            self.active += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.active -= 1
+                self.jobs += 1
+                if not self.draining:
+                    self.reason = self._limit_reached()
+                    if self.draining:
+                        logger.warning(f"Recycling process {os.getpid()}: {self.reason}; draining {self.active} parses")
+                recycle = self.draining and self.active == 0 and not self._recycled
+                if recycle:
+                    self._recycled = True
+            if recycle:
+                self.on_recycle()
+
+    def _limit_reached(self) -> Optional[str]:
+        if self.max_jobs and self.jobs >= self.max_jobs:
+            return f"{self.jobs} parses (limit {self.max_jobs})"
+        if self.max_rss_mb:
+            rss = rss_bytes()
+            if rss is not None and rss > self.max_rss_mb * MB:
+                return f"RSS {to_mb(rss)} MB (limit {self.max_rss_mb} MB)"
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "jobs": self.jobs,
+            "active": self.active,
+            "max_jobs": self.max_jobs,
+            "max_rss_mb": self.max_rss_mb,
+            "recycling": self.reason,
+        }
+
+
+def _terminate_self():
+    logger.warning(f"Process {os.getpid()} drained, shutting down for recycling")
+    os.kill(os.getpid(), signal.SIGTERM)
+
+
+_stages = StageMemory()
+_guard: Optional[MemoryGuard] = None
+_guard_lock = threading.Lock()
+
+
+def track_memory(stage: str):
+    """Context manager recording the RSS high-water mark of a stage"""
+    return _stages.track(stage)
+
+
+def get_memory_guard() -> MemoryGuard:
+    """Process-wide guard configured from settings"""
+    global _guard
+    with _guard_lock:
+        if _guard is None:
+            max_jobs, max_rss_mb = settings.WORKER_MAX_JOBS, settings.WORKER_MAX_RSS_MB
+            if (max_jobs or max_rss_mb) and not settings.PROCESS_SUPERVISED:
+                # A recycled process would not come back
+                logger.warning("WORKER_MAX_JOBS/WORKER_MAX_RSS_MB ignored: PROCESS_SUPERVISED is not set")
+                max_jobs = max_rss_mb = 0
+            _guard = MemoryGuard(max_jobs, max_rss_mb)
+        return _guard
+
+
+def memory_stats() -> Dict[str, Any]:
+    """Current and peak RSS, per-stage high-water marks and recycling state"""
+    return {
+        "rss_mb": to_mb(rss_bytes()),
+        "peak_rss_mb": to_mb(peak_rss_bytes()),
+        "stages": _stages.stats(),
+        "guard": get_memory_guard().stats(),
+    }
@@ -1,14 +1,21 @@
 """
 SQLAlchemy ORM models and Pydantic schemas
 """
-from sqlalchemy import Column, String, Float, Text, DateTime
+from sqlalchemy import Column, String, Float, Text, DateTime, Date, Numeric, Index, Integer, LargeBinary
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import deferred
 from pydantic import BaseModel
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 from datetime import datetime
 
 from app.database import Base
 
 
+def _unpartitioned(ddl, target, bind, dialect, **kw) -> bool:
+    """DDL condition: parsed_statements is range-partitioned on PostgreSQL only"""
+    return dialect.name != "postgresql"
+
+
 # SQLAlchemy ORM Model
 class ParsedStatement(Base):
     __tablename__ = "parsed_statements"
@@ -20,9 +27,110 @@ class ParsedStatement(Base):
     billing_cycle = Column(String, nullable=True)
     due_date = Column(String, nullable=True)
     total_amount_due = Column(String, nullable=True)
+    
+    # Typed copies of the display strings above, for indexed range queries
+    cycle_start = Column(Date, nullable=True)
+    cycle_end = Column(Date, nullable=True, index=True)
+    due_on = Column(Date, nullable=True)
+    amount_due = Column(Numeric(14, 2), nullable=True, index=True)
+    
     confidence_score = Column(Float, nullable=False)
     raw_text = Column(Text, nullable=True)
+    # Partition key on PostgreSQL, so part of the table's primary key there
+    created_at = Column(DateTime, primary_key=True, default=datetime.utcnow)
+    
+    # Upload deduplication: sha256 of the PDF bytes and the client's Idempotency-Key.
+    # Plain indexes, not unique: lookups only, duplicates are tolerated.
+    file_hash = Column(String(64), nullable=True, index=True)
+    idempotency_key = Column(String(128), nullable=True, index=True)
+    
+    # Upload the statement came from and its pages there (a PDF may hold several statements)
+    upload_id = Column(String, nullable=True, index=True)
+    first_page = Column(Integer, nullable=True)
+    last_page = Column(Integer, nullable=True)
+    
+    __table_args__ = (
+        # "Due in the next N days above X" is a range scan on this index
+        Index("ix_parsed_statements_due_on_amount_due", "due_on", "amount_due"),
+        # Newest-first history reads the latest partitions only
+        Index("ix_parsed_statements_created_at", "created_at"),
+        # Support lookups (/search): a card or issuer, newest first
+        Index("ix_parsed_statements_card_last_four_created_at", "card_last_four", "created_at"),
+        Index("ix_parsed_statements_issuer_created_at", "issuer", "created_at"),
+        # The primary key includes created_at for partitioning, so where the
+        # table is not partitioned a unique index keeps id unique (as the
+        # migrations do, by keeping the original primary key there)
+        Index("uq_parsed_statements_id", "id", unique=True).ddl_if(callable_=_unpartitioned),
+        # Monthly partitions (app/retention.py); ignored by other databases
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+    # Rows are still identified by id alone
+    __mapper_args__ = {"primary_key": [id]}
+
+
+class StatementText(Base):
+    """Full extracted text of a statement, compressed, for re-extraction"""
+    __tablename__ = "statement_texts"
+    
+    # Same id as ParsedStatement; kept apart so history queries never load the blobs
+    statement_id = Column(String, primary_key=True)
+    content_hash = Column(String(64), nullable=False, index=True)  # sha256 of the text
+    codec = Column(String(16), nullable=False)  # "zlib" or "zstd"
+    text_blob = Column(LargeBinary, nullable=False)
+    pages_blob = Column(LargeBinary, nullable=True)  # JSON list of {page, source, text}
+    fields_json = Column(Text, nullable=True)  # Extracted fields as returned by the upload, for replays
+    text_length = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class StatementSearch(Base):
+    """
+    Full-text search document of a statement (PostgreSQL tsvector, GIN indexed)
+    Other databases leave this table empty and search in-process (app/search.py).
+    """
+    __tablename__ = "statement_search"
+    
+    statement_id = Column(String, primary_key=True)
+    document = Column(TSVECTOR().with_variant(Text(), "sqlite"), nullable=False)
+    
+    __table_args__ = (
+        Index("ix_statement_search_document", "document", postgresql_using="gin").ddl_if(dialect="postgresql"),
+    )
+
+
+class ParseJob(Base):
+    """
+    Queued upload, parsed by a worker (python -m app.worker)
+    Workers claim jobs with SELECT ... FOR UPDATE SKIP LOCKED and hold a
+    lease while parsing; a job whose lease expires is picked up again.
+    """
+    __tablename__ = "parse_jobs"
+    
+    # Also the id of the ParsedStatement the job produces
+    id = Column(String, primary_key=True)
+    filename = Column(String, nullable=False)
+    file_hash = Column(String(64), nullable=False, index=True)
+    idempotency_key = Column(String(128), nullable=True, index=True)
+    # PDF bytes travel through the database so any node can parse them; cleared when done
+    content = deferred(Column(LargeBinary, nullable=True))
+    
+    status = Column(String(16), nullable=False)  # queued, running, done, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    available_at = Column(DateTime, nullable=False)  # Not claimed before this (retry backoff)
+    lease_owner = Column(String(128), nullable=True)
+    lease_expires_at = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
+    result = Column(Text, nullable=True)  # ParseResponse body (JSON) once done
+    
     created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    
+    __table_args__ = (
+        # Claim scans queued jobs by availability; the reaper scans running jobs by lease
+        Index("ix_parse_jobs_status_available_at", "status", "available_at"),
+        Index("ix_parse_jobs_status_lease_expires_at", "status", "lease_expires_at"),
+    )
 
 
 # Pydantic Response Models
@@ -39,6 +147,9 @@ class ParseResponse(BaseModel):
     extracted_fields: Dict[str, Dict[str, Any]]
     confidence_score: float
     status: str
+    # Files holding several statements: every statement, each with its "pages";
+    # the fields above are those of the first one
+    statements: Optional[List[Dict[str, Any]]] = None
     
     class Config:
         from_attributes = True
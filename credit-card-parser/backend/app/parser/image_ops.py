@@ -0,0 +1,157 @@
+"""
+NumPy image operations for OCR preprocessing
+All functions work on 2-D arrays: uint8 grayscale in, bool "ink" masks out
+"""
+from typing import Tuple
+
+import numpy as np
+
+# Bradley-Roth adaptive threshold: a pixel is ink when it is this much
+# darker than the mean of its window
+BINARIZE_WINDOW = 31
+BINARIZE_SENSITIVITY = 0.15
+
+# Skew search range and resolution in degrees
+MAX_SKEW_DEGREES = 5.0
+SKEW_STEP_DEGREES = 0.2
+# Ink pixels sampled for skew estimation (keeps it fast on 300-DPI pages)
+SKEW_SAMPLE_SIZE = 50000
+
+# Ink pixels with fewer ink neighbours (of 8) are treated as scanner noise
+MIN_INK_NEIGHBOURS = 2
+# Rows/columns with fewer ink pixels than this count as blank
+MIN_INK_PER_LINE = 3
+
+MARGIN_PADDING = 12
+# Blank row runs longer than this are collapsed to this height
+MAX_BLANK_ROWS = 40
+
+
+def adaptive_binarize(gray: np.ndarray, window: int = BINARIZE_WINDOW,
+                      sensitivity: float = BINARIZE_SENSITIVITY) -> np.ndarray:
+    """
+    Local-mean thresholding using cumulative-sum box filters
+
+    Handles uneven lighting and scanner shading that a global threshold
+    or contrast boost cannot.
+
+    Returns:
+        Boolean mask, True where the pixel is ink
+    """
+    height, width = gray.shape
+    half = window // 2
+
+    # Separable box sums from cumulative sums; int32 is enough for 8-bit
+    # pixels and keeps a 300-DPI page at ~35 MB per temporary array
+    top = np.clip(np.arange(height) - half, 0, height)
+    bottom = np.clip(np.arange(height) + half + 1, 0, height)
+    left = np.clip(np.arange(width) - half, 0, width)
+    right = np.clip(np.arange(width) + half + 1, 0, width)
+
+    column_cumsum = np.zeros((height + 1, width), dtype=np.int32)
+    np.cumsum(gray, axis=0, dtype=np.int32, out=column_cumsum[1:])
+    vertical = column_cumsum[bottom] - column_cumsum[top]
+    del column_cumsum
+
+    row_cumsum = np.zeros((height, width + 1), dtype=np.int32)
+    np.cumsum(vertical, axis=1, dtype=np.int32, out=row_cumsum[:, 1:])
+    del vertical
+    window_sum = row_cumsum[:, right] - row_cumsum[:, left]
+    del row_cumsum
+
+    window_area = (bottom - top).astype(np.int32)[:, None] * (right - left).astype(np.int32)[None, :]
+    threshold_percent = int(round(100 * (1 - sensitivity)))
+
+    return gray.astype(np.int32) * window_area * 100 < window_sum * threshold_percent
+
+
+def estimate_skew(ink: np.ndarray, max_degrees: float = MAX_SKEW_DEGREES,
+                  step: float = SKEW_STEP_DEGREES) -> float:
+    """
+    Estimate page skew from the horizontal projection profile
+
+    Text lines produce the sharpest row histogram when they are level,
+    so the angle maximising the sum of squared row counts wins.
+
+    Returns:
+        Skew angle in degrees (counter-clockwise positive); 0.0 for blank pages
+    """
+    ys, xs = np.nonzero(ink)
+    if len(ys) < 100:
+        return 0.0
+
+    if len(ys) > SKEW_SAMPLE_SIZE:
+        choice = np.random.default_rng(0).choice(len(ys), SKEW_SAMPLE_SIZE, replace=False)
+        ys, xs = ys[choice], xs[choice]
+
+    ys = ys.astype(np.float64)
+    xs = xs.astype(np.float64)
+    angles = np.arange(-max_degrees, max_degrees + step / 2, step)
+    best_angle, best_score = 0.0, -1.0
+
+    for angle in angles:
+        theta = np.deg2rad(angle)
+        projected = ys * np.cos(theta) + xs * np.sin(theta)
+        histogram = np.bincount((projected - projected.min()).astype(np.int64))
+        score = float(np.dot(histogram, histogram))
+        if score > best_score:
+            best_angle, best_score = float(angle), score
+
+    return best_angle
+
+
+def remove_specks(ink: np.ndarray, min_neighbours: int = MIN_INK_NEIGHBOURS) -> np.ndarray:
+    """Drop isolated ink pixels (sensor noise, dust) using a 3x3 neighbour count"""
+    padded = np.pad(ink, 1).astype(np.uint8)
+    height, width = ink.shape
+    neighbours = np.zeros((height, width), dtype=np.uint8)
+    for dy in (0, 1, 2):
+        for dx in (0, 1, 2):
+            if dy == 1 and dx == 1:
+                continue
+            neighbours += padded[dy:dy + height, dx:dx + width]
+    return ink & (neighbours >= min_neighbours)
+
+
+def ink_bounding_box(ink: np.ndarray, padding: int = MARGIN_PADDING) -> Tuple[int, int, int, int]:
+    """
+    Bounding box of all ink plus padding, as (top, bottom, left, right) slice bounds
+
+    Returns the full image for blank pages.
+    """
+    height, width = ink.shape
+    rows = np.flatnonzero(ink.sum(axis=1) >= MIN_INK_PER_LINE)
+    cols = np.flatnonzero(ink.sum(axis=0) >= MIN_INK_PER_LINE)
+    if len(rows) == 0:
+        return 0, height, 0, width
+
+    return (
+        max(rows[0] - padding, 0),
+        min(rows[-1] + padding + 1, height),
+        max(cols[0] - padding, 0),
+        min(cols[-1] + padding + 1, width),
+    )
+
+
+def crop_margins(ink: np.ndarray, padding: int = MARGIN_PADDING) -> np.ndarray:
+    """Drop blank margins around the ink"""
+    top, bottom, left, right = ink_bounding_box(ink, padding)
+    return ink[top:bottom, left:right]
+
+
+def collapse_blank_rows(ink: np.ndarray, max_blank: int = MAX_BLANK_ROWS) -> np.ndarray:
+    """
+    Shrink tall blank bands (gaps between blocks, empty table areas)
+    to max_blank rows, so Tesseract scans fewer empty pixels
+    """
+    blank = ink.sum(axis=1) < MIN_INK_PER_LINE
+    if not blank.any():
+        return ink
+
+    # Position of each row within its run of blank rows
+    index = np.arange(len(blank))
+    run_starts = blank & ~np.concatenate(([False], blank[:-1]))
+    run_start_index = np.maximum.accumulate(np.where(run_starts, index, 0))
+    position = index - run_start_index
+
+    return ink[~blank | (position < max_blank)]
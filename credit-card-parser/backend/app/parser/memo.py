@@ -0,0 +1,112 @@
+"""
+Memoized issuer detection and field extraction keyed on text fingerprints
+Identical text (retries, re-extraction, batch re-scoring) is only
+regex-scanned once per process
+"""
+import copy
+import hashlib
+import threading
+from typing import Optional, Sequence, Tuple
+import logging
+
+from app.config import settings
+from app.parser.extractors import extract_fields
+from app.parser.issuer_detector import detect_issuer
+from app.parser.results import StatementResult
+from app.utils.lru import LRUCache
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever patterns or extractor logic change, so memoized results
+# from the old parser are never returned
+PARSER_VERSION = "3"
+
+
+def text_fingerprint(text: str) -> str:
+    """Fast hash of statement text and the parser version"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(PARSER_VERSION.encode())
+    digest.update(text.encode("utf-8", "surrogatepass"))
+    return digest.hexdigest()
+
+
+_memo: Optional[LRUCache] = None
+_memo_lock = threading.Lock()
+
+
+def get_parse_memo() -> Optional[LRUCache]:
+    """Process-wide parse memo, or None when PARSE_MEMO_SIZE is 0"""
+    global _memo
+    if settings.PARSE_MEMO_SIZE <= 0:
+        return None
+    with _memo_lock:
+        if _memo is None:
+            _memo = LRUCache(settings.PARSE_MEMO_SIZE, settings.PARSE_MEMO_TTL_SECONDS)
+        return _memo
+
+
+def detect_issuer_cached(text: str) -> str:
+    """detect_issuer, memoized on the text fingerprint"""
+    memo = get_parse_memo()
+    if memo is None:
+        return detect_issuer(text)
+
+    key = ("issuer", text_fingerprint(text))
+    issuer = memo.get(key)
+    if issuer is None:
+        issuer = detect_issuer(text)
+        memo.put(key, issuer)
+    return issuer
+
+
+def extract_fields_cached(
+    text: str,
+    issuer: str,
+    page_ends: Optional[Sequence[int]] = None
+) -> StatementResult:
+    """
+    extract_fields, memoized on the text fingerprint, issuer and page offsets
+
+    Returns:
+        A fresh copy of the result, so callers may modify it
+    """
+    memo = get_parse_memo()
+    if memo is None:
+        return extract_fields(text, issuer, page_ends)
+
+    key = _fields_key(text_fingerprint(text), issuer, page_ends)
+    fields = memo.get(key)
+    if fields is None:
+        fields = extract_fields(text, issuer, page_ends)
+        memo.put(key, copy.deepcopy(fields))
+        return fields
+    return copy.deepcopy(fields)
+
+
+def _fields_key(text_key: str, issuer: str, page_ends: Optional[Sequence[int]]) -> tuple:
+    return ("fields", text_key, issuer, tuple(page_ends) if page_ends else None)
+
+
+def lookup_parse(text: str, page_ends: Optional[Sequence[int]] = None) -> Optional[Tuple[str, StatementResult]]:
+    """Memoized issuer and a copy of the fields for text, or None if either is not memoized"""
+    memo = get_parse_memo()
+    if memo is None:
+        return None
+
+    text_key = text_fingerprint(text)
+    issuer = memo.get(("issuer", text_key))
+    if issuer is None:
+        return None
+    fields = memo.get(_fields_key(text_key, issuer, page_ends))
+    return (issuer, copy.deepcopy(fields)) if fields is not None else None
+
+
+def remember_parse(text: str, page_ends: Optional[Sequence[int]], issuer: str, fields: StatementResult):
+    """Memoize a parse done elsewhere (segment worker processes)"""
+    memo = get_parse_memo()
+    if memo is None:
+        return
+
+    text_key = text_fingerprint(text)
+    memo.put(("issuer", text_key), issuer)
+    memo.put(_fields_key(text_key, issuer, page_ends), copy.deepcopy(fields))
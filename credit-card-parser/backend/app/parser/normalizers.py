@@ -0,0 +1,135 @@
+"""
+Convert extracted display strings into typed values
+(dates and decimal amounts) for indexed storage
+"""
+import re
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from typing import Dict, Any, Optional, Tuple
+import logging
+
+from app.parser.results import StatementResult
+
+logger = logging.getLogger(__name__)
+
+# Statements are Indian-issued, so numeric dates are always day-first
+DATE_FORMATS = [
+    "%d-%m-%Y",
+    "%d-%m-%y",
+    "%d-%b-%Y",
+    "%d-%b-%y",
+    "%d-%B-%Y",
+    "%d-%B-%y",
+]
+
+# Fields that have a typed counterpart
+NORMALIZED_FIELDS = ("billing_cycle", "due_date", "total_amount_due")
+
+AMOUNT_PATTERN = re.compile(r"\d[\d,]*(?:\.\d+)?")
+
+
+def parse_statement_date(value: Optional[str]) -> Optional[date]:
+    """
+    Parse a date string as emitted by the extractors
+
+    Handles "15/02/2024", "27-08-2025", "03-Aug-25", "22 Sep 2025"
+    and "1-January-2024" style values.
+
+    Args:
+        value: Display date string
+
+    Returns:
+        date or None if the string cannot be parsed
+    """
+    if not value:
+        return None
+
+    # Unify separators so one format list covers "/", "-" and spaces
+    normalized = re.sub(r"[\s/\-]+", "-", value.strip())
+
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(normalized, fmt).date()
+        except ValueError:
+            continue
+
+    logger.debug(f"Could not parse date: {value}")
+    return None
+
+
+def parse_amount(value: Optional[str]) -> Optional[Decimal]:
+    """
+    Parse an amount string such as "₹1234.00" or "Rs. 5,000"
+
+    Returns:
+        Decimal rounded to 2 places, or None if no number is present
+    """
+    if not value:
+        return None
+
+    match = AMOUNT_PATTERN.search(value)
+    if not match:
+        return None
+
+    try:
+        return Decimal(match.group(0).replace(",", "")).quantize(Decimal("0.01"))
+    except InvalidOperation:
+        logger.debug(f"Could not parse amount: {value}")
+        return None
+
+
+def parse_billing_cycle(value: Optional[str]) -> Tuple[Optional[date], Optional[date]]:
+    """
+    Split "26-Jul-2025 to 25-Aug-2025" into (start, end) dates
+    """
+    if not value:
+        return None, None
+
+    parts = re.split(r"\s+to\s+", value.strip(), maxsplit=1, flags=re.IGNORECASE)
+    if len(parts) != 2:
+        return None, None
+
+    return parse_statement_date(parts[0]), parse_statement_date(parts[1])
+
+
+def normalize_field(field_name: str, value: Optional[str]) -> Any:
+    """
+    Typed counterpart of a single extracted field value
+
+    Returns:
+        {"start", "end"} dates for billing_cycle, a date for due_date,
+        a Decimal for total_amount_due and None for anything else
+    """
+    if field_name == "billing_cycle":
+        start, end = parse_billing_cycle(value)
+        return {"start": start, "end": end}
+    if field_name == "due_date":
+        return parse_statement_date(value)
+    if field_name == "total_amount_due":
+        return parse_amount(value)
+    return None
+
+
+def typed_columns(extracted_data: StatementResult) -> Dict[str, Any]:
+    """
+    Build the typed ParsedStatement column values from extract_fields output
+
+    Returns:
+        Dictionary with cycle_start, cycle_end, due_on and amount_due
+    """
+    def normalized(field_name: str) -> Any:
+        field = extracted_data.get(field_name)
+        if field is None:
+            return normalize_field(field_name, None)
+        if field.normalized is not None:
+            return field.normalized
+        return normalize_field(field_name, field.value)
+
+    cycle = normalized("billing_cycle")
+
+    return {
+        "cycle_start": cycle["start"],
+        "cycle_end": cycle["end"],
+        "due_on": normalized("due_date"),
+        "amount_due": normalized("total_amount_due"),
+    }
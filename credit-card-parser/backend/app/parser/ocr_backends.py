@@ -0,0 +1,270 @@
+"""
+OCR backends and a pool of long-lived recognizers
+tesserocr binds the Tesseract C API once per worker and keeps the
+traineddata loaded; pytesseract (one tesseract process per page) is
+the fallback when tesserocr is not installed or fails
+"""
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple, Type
+import logging
+import os
+
+from app.config import settings
+from app.memory import MB, rss_bytes, to_mb
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+OCR_LANG = 'eng'
+OCR_PSM = 6  # Assume uniform block of text
+
+
+def load_pytesseract():
+    """Import pytesseract on first use (OCR dependencies are not loaded at startup)"""
+    import pytesseract
+    
+    # Configure Tesseract path (adjust based on system)
+    if os.name == 'nt':  # Windows
+        pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
+    return pytesseract
+
+
+class OCRBackend(ABC):
+    """Recognizes text in a preprocessed page image"""
+    name = "base"
+
+    @abstractmethod
+    def recognize(self, image: "Image.Image") -> str:
+        ...
+
+    def close(self):
+        pass
+
+
+class PytesseractBackend(OCRBackend):
+    """Runs the tesseract CLI per image (temp files, model reload every call)"""
+    name = "pytesseract"
+
+    def __init__(self):
+        self._pytesseract = load_pytesseract()
+
+    def recognize(self, image: "Image.Image") -> str:
+        return self._pytesseract.image_to_string(image, lang=OCR_LANG, config=f'--psm {OCR_PSM}')
+
+
+class TesserocrBackend(OCRBackend):
+    """Keeps one Tesseract API instance (and loaded model) alive; images stay in memory"""
+    name = "tesserocr"
+
+    def __init__(self):
+        import tesserocr
+        self._api = tesserocr.PyTessBaseAPI(lang=OCR_LANG, psm=tesserocr.PSM.SINGLE_BLOCK)
+
+    def recognize(self, image: "Image.Image") -> str:
+        self._api.SetImage(image)
+        return self._api.GetUTF8Text()
+
+    def close(self):
+        self._api.End()
+
+
+BACKENDS: Dict[str, Type[OCRBackend]] = {
+    "tesserocr": TesserocrBackend,
+    "pytesseract": PytesseractBackend,
+}
+
+
+def create_backend(name: str = "auto") -> OCRBackend:
+    """
+    Instantiate an OCR backend by name
+
+    "auto" prefers tesserocr and falls back to pytesseract when it is
+    not installed or cannot load the language data.
+    """
+    if name != "auto":
+        return BACKENDS[name]()
+
+    try:
+        return TesserocrBackend()
+    except Exception as e:
+        logger.info(f"tesserocr unavailable ({e}), using pytesseract")
+        return PytesseractBackend()
+
+
+# Per-process state of pool workers
+_worker_backend: Optional[OCRBackend] = None
+
+
+def _init_worker(backend_name: str):
+    global _worker_backend
+    _worker_backend = create_backend(backend_name)
+    logger.info(f"OCR worker {os.getpid()} ready ({_worker_backend.name})")
+
+
+def _recognize_in_worker(mode: str, size, data: bytes) -> Tuple[str, Optional[int]]:
+    """Page text and the worker's RSS afterwards (for recycling)"""
+    from PIL import Image
+    image = Image.frombytes(mode, size, data)
+    try:
+        text = _worker_backend.recognize(image)
+    except Exception as e:
+        if isinstance(_worker_backend, PytesseractBackend):
+            raise
+        logger.warning(f"{_worker_backend.name} failed ({e}), falling back to pytesseract")
+        text = PytesseractBackend().recognize(image)
+    return text, rss_bytes()
+
+
+class OCRWorkerPool:
+    """
+    Pool of worker processes, each holding one long-lived backend
+
+    With workers=0 recognition runs in the calling thread, using one
+    backend per thread (Tesseract API handles are not thread-safe).
+    
+    Workers grow over long runs (PIL buffers, Tesseract state), so the
+    pool is replaced after max_tasks pages per worker, or as soon as a
+    worker reports an RSS above max_rss_mb: new pages go to a fresh pool
+    while the old one finishes its queued pages and exits. (The
+    executor's own max_tasks_per_child would force the slower spawn
+    start method.) A limit of 0 is off.
+    """
+
+    def __init__(self, backend_name: str = "auto", workers: int = 2, max_tasks: int = 0, max_rss_mb: int = 0):
+        self.backend_name = backend_name
+        self.workers = workers
+        self.max_tasks = max_tasks
+        self.max_rss_mb = max_rss_mb
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._tasks = 0  # Pages submitted to the current executor
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.recycled = 0
+        self.worker_peak_rss = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    initializer=_init_worker,
+                    initargs=(self.backend_name,)
+                )
+                self._tasks = 0
+            self._tasks += 1
+            return self._executor
+
+    def submit(self, image: "Image.Image") -> Future:
+        """Queue an image for recognition; the result is the OCR text"""
+        if self.workers <= 0:
+            future = Future()
+            try:
+                future.set_result(self._local_backend().recognize(image))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+
+        try:
+            executor = self._get_executor()
+            inner = executor.submit(_recognize_in_worker, image.mode, image.size, image.tobytes())
+        except BrokenProcessPool:
+            logger.error("OCR pool broken, restarting it")
+            self.shutdown(wait=False)
+            executor = self._get_executor()
+            inner = executor.submit(_recognize_in_worker, image.mode, image.size, image.tobytes())
+        
+        future = Future()
+        inner.add_done_callback(lambda done: self._finished(executor, done, future))
+        return future
+
+    def _finished(self, executor: ProcessPoolExecutor, done: Future, future: Future):
+        """Resolve the caller's future with the text; recycle the pool if a limit was passed"""
+        if done.exception() is not None:
+            future.set_exception(done.exception())
+            return
+        text, rss = done.result()
+        
+        # Recycle before resolving, so the caller's next page goes to the fresh pool
+        reason = None
+        if rss is not None:
+            self.worker_peak_rss = max(self.worker_peak_rss, rss)
+            if self.max_rss_mb and rss > self.max_rss_mb * MB:
+                reason = f"worker RSS {to_mb(rss)} MB (limit {self.max_rss_mb} MB)"
+        if reason is None and self.max_tasks and self._tasks >= self.max_tasks * self.workers:
+            reason = f"{self._tasks} pages"
+        if reason is not None:
+            self.recycle(executor, reason)
+        future.set_result(text)
+
+    def recycle(self, executor: ProcessPoolExecutor, reason: str):
+        """Route new pages to a fresh pool; the old one drains its queue and exits"""
+        with self._lock:
+            if self._executor is not executor:
+                return  # Already replaced
+            self._executor = None
+            self.recycled += 1
+        logger.info(f"Recycling OCR pool: {reason}")
+        # Not from this thread: it is the executor's own result thread
+        threading.Thread(target=executor.shutdown, name="ocr-pool-drain", daemon=True).start()
+
+    def recognize(self, image: "Image.Image") -> str:
+        """Recognize one image and wait for the text"""
+        return self.submit(image).result()
+
+    def _local_backend(self) -> OCRBackend:
+        backend = getattr(self._local, "backend", None)
+        if backend is None:
+            backend = self._local.backend = create_backend(self.backend_name)
+        return backend
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "pages_since_recycle": self._tasks,
+            "recycled": self.recycled,
+            "worker_peak_rss_mb": to_mb(self.worker_peak_rss),
+        }
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+
+_pool: Optional[OCRWorkerPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_ocr_pool() -> OCRWorkerPool:
+    """Process-wide OCR pool configured from settings (workers start on first use)"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = OCRWorkerPool(
+                settings.OCR_BACKEND,
+                settings.OCR_WORKERS,
+                settings.OCR_WORKER_MAX_TASKS,
+                settings.OCR_WORKER_MAX_RSS_MB
+            )
+        return _pool
+
+
+def ocr_pool_stats() -> Optional[Dict[str, Any]]:
+    """Recycling counters of the OCR pool, or None before it was first used"""
+    with _pool_lock:
+        return _pool.stats() if _pool is not None else None
+
+
+def shutdown_ocr_pool():
+    """Stop OCR worker processes (application shutdown)"""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown()
@@ -0,0 +1,158 @@
+"""
+Page-level OCR result cache on local disk
+Keyed by a hash of the preprocessed page image plus OCR settings,
+with size-bounded LRU eviction
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Any, Optional
+import logging
+
+from app.config import settings
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+CACHE_SUFFIX = ".txt"
+RESCAN_SECONDS = 60.0  # How stale the size of a shared directory may get
+
+
+def ocr_cache_key(image: "Image.Image", dpi: int, psm: int, lang: str) -> str:
+    """
+    Cache key for a preprocessed page image and the OCR settings used on it
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(f"{image.mode}:{image.size[0]}x{image.size[1]}:{dpi}:{psm}:{lang}".encode())
+    digest.update(image.tobytes())
+    return digest.hexdigest()
+
+
+class OCRCache:
+    """
+    Disk cache of OCR text with LRU eviction once max_bytes is exceeded
+
+    Recency is kept in memory and mirrored to file mtimes, so the LRU
+    order survives restarts. Several processes may share one directory;
+    each keeps its own index and reconciles it with the files it finds
+    on lookup. Writes rescan the directory at most every rescan_seconds,
+    so files from other processes count towards max_bytes and the total
+    stays within it, give or take what is written between rescans.
+    """
+
+    def __init__(self, directory: str, max_bytes: int, rescan_seconds: float = RESCAN_SECONDS):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.rescan_seconds = rescan_seconds
+        self._scanned_at = 0.0
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, int]" = OrderedDict()  # key -> size, oldest first
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._scan()
+        logger.info(f"OCR cache loaded: {len(self._entries)} entries, {self._size} bytes")
+        self._evict()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}{CACHE_SUFFIX}"
+
+    def _scan(self):
+        """Rebuild the LRU index from the files on disk, from all processes"""
+        files = []
+        for path in self.directory.glob(f"*/*{CACHE_SUFFIX}"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, path.stem, stat.st_size))
+
+        self._entries.clear()
+        self._size = 0
+        for _, key, size in sorted(files):
+            self._entries[key] = size
+            self._size += size
+        self._scanned_at = time.monotonic()
+
+    def get(self, key: str) -> Optional[str]:
+        """Cached OCR text for key, or None on a miss"""
+        path = self._path(key)
+        with self._lock:
+            try:
+                text = path.read_text(encoding="utf-8")
+                os.utime(path)
+            except FileNotFoundError:
+                if key in self._entries:
+                    # Evicted by another process sharing the directory
+                    self._size -= self._entries.pop(key)
+                self.misses += 1
+                return None
+
+            if key not in self._entries:
+                # Written by another process sharing the directory
+                self._entries[key] = len(text.encode("utf-8"))
+                self._size += self._entries[key]
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return text
+
+    def put(self, key: str, text: str):
+        """Store OCR text for key, evicting least recently used entries"""
+        path = self._path(key)
+        data = text.encode("utf-8")
+        with self._lock:
+            path.parent.mkdir(exist_ok=True)
+            tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, path)
+
+            self._size -= self._entries.pop(key, 0)
+            self._entries[key] = len(data)
+            self._size += len(data)
+            if time.monotonic() - self._scanned_at >= self.rescan_seconds:
+                self._scan()
+            self._evict()
+
+    def _evict(self):
+        while self._size > self.max_bytes and self._entries:
+            key, size = self._entries.popitem(last=False)
+            self._size -= size
+            self.evictions += 1
+            self._path(key).unlink(missing_ok=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "size_bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+_cache: Optional[OCRCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_ocr_cache() -> Optional[OCRCache]:
+    """Process-wide OCR cache, or None when disabled in settings"""
+    global _cache
+    if not settings.OCR_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = OCRCache(settings.OCR_CACHE_DIR, settings.OCR_CACHE_MAX_MB * 1024 * 1024)
+        return _cache
@@ -1,17 +1,25 @@
 """
 OCR fallback for scanned PDFs using Tesseract
 """
-import pytesseract
+from concurrent.futures import Future
 from pdf2image import convert_from_path
-from PIL import Image, ImageEnhance
+from PIL import Image
+import numpy as np
 import logging
-import os
+from typing import List, Optional, Tuple
+
+from app.config import settings
+from app.memory import track_memory
+from app.parser.ocr_cache import get_ocr_cache, ocr_cache_key
+from app.parser.ocr_backends import get_ocr_pool, OCR_LANG, OCR_PSM
+from app.parser.image_ops import (
+    adaptive_binarize, remove_specks, estimate_skew, crop_margins, collapse_blank_rows
+)
 
 logger = logging.getLogger(__name__)
 
-# Configure Tesseract path (adjust based on system)
-if os.name == 'nt':  # Windows
-    pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
+# Smaller estimated skews are left alone (rotation costs more than it gains)
+MIN_DESKEW_DEGREES = 0.3
 
 
 def extract_text_with_ocr(file_path: str) -> str:
@@ -24,51 +32,128 @@ def extract_text_with_ocr(file_path: str) -> str:
     Returns:
         Extracted text as string
     """
+    pages = extract_pages_with_ocr(file_path)
+    return "\n".join(pages).strip()
+
+
+def extract_pages_with_ocr(file_path: str, page_numbers: Optional[List[int]] = None) -> List[str]:
+    """
+    OCR pages of a scanned PDF
+    
+    Args:
+        file_path: Path to PDF file
+        page_numbers: 1-based pages to OCR; defaults to the first MAX_PAGES_OCR pages.
+            Only these pages are rasterized.
+        
+    Returns:
+        List with the OCR text of each processed page, in page_numbers order
+    """
     try:
         logger.info("Starting OCR extraction...")
         
-        # Convert PDF to images
-        images = convert_from_path(
-            file_path,
-            dpi=300,  # Higher DPI = better quality
-            first_page=1,
-            last_page=3  # Only process first 3 pages for performance
-        )
-        
-        logger.info(f"Converted to {len(images)} images")
+        if page_numbers is None:
+            ranges = [(1, settings.MAX_PAGES_OCR)]
+        else:
+            ranges = _page_ranges(page_numbers)
         
-        # OCR each image
-        text = ""
-        for i, image in enumerate(images):
-            # Preprocess image for better OCR
-            image = preprocess_image(image)
-            
-            page_text = pytesseract.image_to_string(
-                image,
-                lang='eng',
-                config='--psm 6'  # Assume uniform block of text
-            )
-            text += page_text + "\n"
-            logger.debug(f"OCR Page {i + 1}: {len(page_text)} chars")
+        cache = get_ocr_cache()
+        pages = []
+        for first_page, last_page in ranges:
+            # Convert PDF to images (full-page 300 DPI bitmaps: the memory peak of a parse)
+            with track_memory("rasterize"):
+                images = convert_from_path(
+                    file_path,
+                    dpi=settings.OCR_DPI,  # Higher DPI = better quality
+                    first_page=first_page,
+                    last_page=last_page
+                )
+                logger.info(f"Converted pages {first_page}-{last_page} to {len(images)} images")
+                
+                # Preprocess each image here while the OCR pool works on earlier pages
+                for image in images:
+                    pages.append(submit_ocr(preprocess_image(image), cache))
+            del images  # Release the bitmaps before the next range is rasterized
         
-        return text.strip()
+        texts = [future.result() for future in pages]
+        for i, page_text in enumerate(texts):
+            logger.debug(f"OCR page {i + 1} of {len(texts)}: {len(page_text)} chars")
+        return texts
         
     except Exception as e:
         logger.error(f"OCR failed: {e}")
-        return ""
+        return []
+
+
+def _page_ranges(page_numbers: List[int]) -> List[Tuple[int, int]]:
+    """Group sorted page numbers into (first, last) runs so each run is rasterized in one call"""
+    ranges = []
+    for number in page_numbers:
+        if ranges and number == ranges[-1][1] + 1:
+            ranges[-1] = (ranges[-1][0], number)
+        else:
+            ranges.append((number, number))
+    return ranges
+
+
+def ocr_image(image: Image.Image, cache=None) -> str:
+    """
+    Run Tesseract on a preprocessed page image, using the OCR cache if given
+    
+    Identical pages (boilerplate terms, retried uploads) skip Tesseract.
+    """
+    return submit_ocr(image, cache).result()
+
+
+def submit_ocr(image: Image.Image, cache=None) -> Future:
+    """
+    Queue a preprocessed page image on the OCR pool
+    
+    Returns:
+        Future with the page text; already resolved on a cache hit
+    """
+    cache_key = None
+    if cache is not None:
+        cache_key = ocr_cache_key(image, settings.OCR_DPI, OCR_PSM, OCR_LANG)
+        cached_text = cache.get(cache_key)
+        if cached_text is not None:
+            logger.debug(f"OCR cache hit: {cache_key}")
+            future = Future()
+            future.set_result(cached_text)
+            return future
+    
+    future = get_ocr_pool().submit(image)
+    if cache is not None:
+        future.add_done_callback(
+            lambda done: cache.put(cache_key, done.result()) if done.exception() is None else None
+        )
+    return future
 
 
 def preprocess_image(image: Image.Image) -> Image.Image:
     """
     Preprocess image for better OCR accuracy
     - Convert to grayscale
-    - Increase contrast
+    - Adaptive (local mean) binarization and speck removal
+    - Deskew
+    - Crop blank margins and collapse tall blank bands
+    
+    Returns:
+        1-bit image, black text on white, usually much smaller than the input
     """
-    # Convert to grayscale
-    image = image.convert('L')
+    gray = np.asarray(image.convert('L'))
+    ink = remove_specks(adaptive_binarize(gray))
+    
+    if settings.OCR_DESKEW:
+        angle = estimate_skew(ink)
+        if abs(angle) >= MIN_DESKEW_DEGREES:
+            logger.debug(f"Deskewing page by {angle:.1f} degrees")
+            rotated = Image.fromarray(ink).rotate(
+                -angle, resample=Image.NEAREST, expand=True, fillcolor=0
+            )
+            ink = np.asarray(rotated)
     
-    # Enhance contrast
-    enhancer = ImageEnhance.Contrast(image)
-    image = enhancer.enhance(2.0)
+    ink = crop_margins(ink)
+    if settings.OCR_COLLAPSE_BLANK_ROWS:
+        ink = collapse_blank_rows(ink)
     
-    return image
\ No newline at end of file
+    return Image.fromarray(~ink)
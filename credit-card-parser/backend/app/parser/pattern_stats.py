@@ -0,0 +1,190 @@
+"""
+Per-issuer pattern win statistics
+Counts which pattern produced each extracted field, per issuer, to show
+which patterns the traffic relies on. Extractors always try patterns in
+the hand-written order: the patterns search the whole text, so no two of
+them are safe to swap without changing some result
+"""
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional, Pattern, Sequence
+import logging
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# field name -> issuer -> pattern source -> wins
+Counts = Dict[str, Dict[str, Dict[str, int]]]
+
+
+class PatternStats:
+    """
+    Win counts per (field, issuer, pattern), persisted as JSON
+
+    Counts are keyed by pattern source rather than list position, so
+    editing a pattern list does not shift the learned statistics. Several
+    processes may share one file; each saves only its own new wins,
+    merged into whatever is on disk.
+    """
+
+    def __init__(self, path: Optional[str] = None, save_every: int = 100):
+        self.path = Path(path) if path else None
+        self.save_every = save_every
+        self._lock = threading.Lock()
+        self._counts: Counts = {}
+        self._unsaved: Counts = {}
+        self._unsaved_wins = 0
+
+        if self.path is not None:
+            self._merge(self._counts, self._read())
+
+    def record(self, field_name: str, issuer: str, pattern: Pattern):
+        """Count a win for the pattern that produced a field value"""
+        with self._lock:
+            for counts in (self._counts, self._unsaved):
+                by_pattern = counts.setdefault(field_name, {}).setdefault(issuer, {})
+                by_pattern[pattern.pattern] = by_pattern.get(pattern.pattern, 0) + 1
+
+            self._unsaved_wins += 1
+            should_save = self.path is not None and self._unsaved_wins >= self.save_every
+
+        if should_save:
+            self.save()
+
+    def merge(self, counts: Counts):
+        """Add win counts recorded elsewhere (segment worker processes)"""
+        total = sum(count for by_issuer in counts.values() for wins in by_issuer.values() for count in wins.values())
+        if not total:
+            return
+
+        with self._lock:
+            self._merge(self._counts, counts)
+            self._merge(self._unsaved, counts)
+            self._unsaved_wins += total
+            should_save = self.path is not None and self._unsaved_wins >= self.save_every
+
+        if should_save:
+            self.save()
+
+    def counts(self) -> Dict[str, Dict[str, Dict[str, int]]]:
+        """Copy of all win counts"""
+        with self._lock:
+            return {
+                field_name: {issuer: dict(wins) for issuer, wins in by_issuer.items()}
+                for field_name, by_issuer in self._counts.items()
+            }
+
+    def save(self):
+        """Merge unsaved wins into the stats file"""
+        if self.path is None:
+            return
+
+        with self._lock:
+            if not self._unsaved_wins:
+                return
+            merged = self._read()
+            self._merge(merged, self._unsaved)
+
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+            tmp_path.write_text(json.dumps(merged, indent=2, sort_keys=True), encoding="utf-8")
+            os.replace(tmp_path, self.path)
+
+            # Pick up wins saved by other processes as well
+            self._counts = {}
+            self._merge(self._counts, merged)
+            self._unsaved = {}
+            self._unsaved_wins = 0
+
+        logger.info(f"Pattern stats saved to {self.path}")
+
+    def _read(self) -> Counts:
+        try:
+            return json.loads(self.path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return {}
+        except (ValueError, OSError) as e:
+            logger.warning(f"Ignoring unreadable pattern stats {self.path}: {e}")
+            return {}
+
+    @staticmethod
+    def _merge(target: Counts, source: Counts):
+        for field_name, by_issuer in source.items():
+            for issuer, wins in by_issuer.items():
+                by_pattern = target.setdefault(field_name, {}).setdefault(issuer, {})
+                for pattern, count in wins.items():
+                    by_pattern[pattern] = by_pattern.get(pattern, 0) + count
+
+
+_stats: Optional[PatternStats] = None
+_stats_lock = threading.Lock()
+
+
+def get_pattern_stats() -> Optional[PatternStats]:
+    """Process-wide pattern statistics, or None when disabled in settings"""
+    global _stats
+    if not settings.PATTERN_STATS_ENABLED:
+        return None
+    with _stats_lock:
+        if _stats is None:
+            _stats = PatternStats(settings.PATTERN_STATS_PATH, settings.PATTERN_STATS_SAVE_EVERY)
+        return _stats
+
+
+def reset_process_stats() -> Optional[PatternStats]:
+    """
+    Replace this process's statistics with empty in-memory ones that are
+    never saved; segment worker processes count each task's wins this way
+    and hand them back to the parent
+    """
+    global _stats
+    if not settings.PATTERN_STATS_ENABLED:
+        return None
+    with _stats_lock:
+        _stats = PatternStats()
+        return _stats
+
+
+def merge_wins(counts: Counts):
+    """Add wins counted by another process to this process's statistics"""
+    stats = get_pattern_stats()
+    if stats is not None:
+        stats.merge(counts)
+
+
+def record_win(field_name: str, issuer: str, pattern: Pattern):
+    """Record that pattern produced the value of field_name for issuer"""
+    stats = get_pattern_stats()
+    if stats is not None:
+        stats.record(field_name, issuer, pattern)
+
+
+def describe_wins(pattern_lists: Dict[str, Sequence[Pattern]]) -> Dict[str, Any]:
+    """
+    Win counts of every tracked pattern list, per issuer
+
+    Returns:
+        {field: {"patterns": [...], "issuers": {issuer: [...]}}} where each
+        issuer list holds {pattern, wins} in evaluation order
+    """
+    stats = get_pattern_stats()
+    counts = stats.counts() if stats is not None else {}
+    view = {}
+
+    for field_name, patterns in pattern_lists.items():
+        by_issuer = counts.get(field_name, {})
+        view[field_name] = {
+            "patterns": [pattern.pattern for pattern in patterns],
+            "issuers": {
+                issuer: [
+                    {"pattern": pattern.pattern, "wins": by_issuer[issuer].get(pattern.pattern, 0)}
+                    for pattern in patterns
+                ]
+                for issuer in sorted(by_issuer)
+            },
+        }
+
+    return view
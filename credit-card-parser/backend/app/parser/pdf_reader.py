@@ -1,15 +1,26 @@
 """
-Extract text from PDF files using PyPDF2
+Extract text from PDF files
+The text layer is read by the backends in text_backends (PyPDF2 by default)
 """
-import PyPDF2
 import logging
+from typing import Any, Dict, Iterator, List
+
+from app.parser.text_backends import get_text_backends
 
 logger = logging.getLogger(__name__)
 
+# A page needs OCR when it carries images and its text layer is thinner than this
+MIN_PAGE_CHARS = 40
+# Text layer characters per 10,000 square points (a Letter page is ~48 units)
+MIN_TEXT_DENSITY = 2.0
+# Below this share of letters/digits the text layer is treated as garbage
+# (e.g. fonts without a ToUnicode map)
+MIN_ALNUM_RATIO = 0.3
+
 
 def extract_text_from_pdf(file_path: str) -> str:
     """
-    Extract text from PDF using PyPDF2 (for digital PDFs)
+    Extract text from PDF using the configured text backend (for digital PDFs)
     
     Args:
         file_path: Path to PDF file
@@ -17,20 +28,75 @@ def extract_text_from_pdf(file_path: str) -> str:
     Returns:
         Extracted text as string
     """
+    pages = extract_pages_from_pdf(file_path)
+    return "\n".join(page for page in pages if page).strip()
+
+
+def extract_pages_from_pdf(file_path: str) -> List[str]:
+    """
+    Extract text per page
+    
+    Args:
+        file_path: Path to PDF file
+        
+    Returns:
+        List with one string per page ("" for pages without a text layer)
+    """
     try:
-        text = ""
-        with open(file_path, 'rb') as file:
-            pdf_reader = PyPDF2.PdfReader(file)
-            logger.info(f"PDF has {len(pdf_reader.pages)} pages")
-            
-            for page_num, page in enumerate(pdf_reader.pages):
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text + "\n"
-                    logger.debug(f"Page {page_num + 1}: {len(page_text)} chars")
+        pages = [layer["text"] for layer in get_text_backends().read_pages(file_path)]
+        logger.info(f"PDF has {len(pages)} pages")
+        return pages
         
-        return text.strip()
+    except Exception as e:
+        logger.error(f"Error reading PDF: {e}")
+        return []
+
+
+def iter_page_analysis(file_path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Read the text layer of each page and decide whether it needs OCR
+    
+    Args:
+        file_path: Path to PDF file
         
+    Yields:
+        {page, text, chars, has_images, needs_ocr} per page (1-based page numbers)
+    """
+    try:
+        layers = get_text_backends().read_pages(file_path)
     except Exception as e:
         logger.error(f"Error reading PDF: {e}")
-        return ""
\ No newline at end of file
+        return
+    
+    for page_num, layer in enumerate(layers, start=1):
+        page_text = layer["text"]
+        info = {
+            "page": page_num,
+            "text": page_text,
+            "chars": sum(1 for c in page_text if not c.isspace()),
+            "has_images": layer["has_images"],
+        }
+        info["needs_ocr"] = page_needs_ocr(info, layer["area"])
+        logger.debug(f"Page {page_num}: {info['chars']} chars, images={info['has_images']}, ocr={info['needs_ocr']}")
+        yield info
+
+
+def page_needs_ocr(info: Dict[str, Any], area: float) -> bool:
+    """
+    Per-page text-vs-OCR decision
+    
+    Pages without images are never OCR'd - there is nothing to recognise.
+    Pages with images are OCR'd when their text layer is missing, sparse
+    for the page size, or mostly non-alphanumeric.
+    """
+    if not info["has_images"]:
+        return False
+    
+    chars = info["chars"]
+    if chars < MIN_PAGE_CHARS:
+        return True
+    if area > 0 and chars / (area / 10000.0) < MIN_TEXT_DENSITY:
+        return True
+    
+    alnum = sum(1 for c in info["text"] if c.isalnum())
+    return alnum / chars < MIN_ALNUM_RATIO
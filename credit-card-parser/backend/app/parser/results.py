@@ -0,0 +1,104 @@
+"""
+Compact extraction result types
+Slotted dataclasses instead of nested dicts: one small object per field,
+no per-instance __dict__, serialized directly by orjson
+"""
+from dataclasses import dataclass, fields
+from enum import Enum
+from typing import Any, Iterator, Optional, Tuple
+
+
+class Method(str, Enum):
+    """How a field value was found (compares equal to its string value)"""
+    REGEX = "regex"
+    FALLBACK = "fallback"
+    PATTERN_MATCHING = "pattern_matching"
+    NOT_FOUND = "not_found"
+    ERROR = "error"
+
+
+@dataclass(slots=True)
+class FieldResult:
+    """
+    One extracted field
+
+    Supports result["value"] / result.get("value") so code written
+    against the old dict results keeps working.
+    """
+    value: Optional[str]
+    confidence: float
+    method: Method
+    normalized: Any = None  # dates / Decimal / {"start", "end"} for typed fields
+
+    @classmethod
+    def not_found(cls) -> "FieldResult":
+        return cls(None, 0.0, Method.NOT_FOUND)
+
+    @classmethod
+    def error(cls) -> "FieldResult":
+        return cls(None, 0.0, Method.ERROR)
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key, default)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.__slots__
+
+
+@dataclass(slots=True)
+class StatementResult:
+    """
+    All fields extracted from one statement, in reporting order
+
+    Behaves as a read-only mapping of field name -> FieldResult.
+    """
+    issuer: Optional[FieldResult] = None
+    card_last_four: Optional[FieldResult] = None
+    billing_cycle: Optional[FieldResult] = None
+    due_date: Optional[FieldResult] = None
+    total_amount_due: Optional[FieldResult] = None
+
+    @classmethod
+    def field_names(cls) -> Tuple[str, ...]:
+        return tuple(f.name for f in fields(cls))
+
+    def overall_confidence(self) -> float:
+        """Average confidence across all extracted fields"""
+        scores = [field.confidence for field in self.values()]
+        return sum(scores) / len(scores) if scores else 0
+
+    def __getitem__(self, field_name: str) -> FieldResult:
+        field = getattr(self, field_name, None) if field_name in self.field_names() else None
+        if field is None:
+            raise KeyError(field_name)
+        return field
+
+    def get(self, field_name: str, default: Any = None) -> Any:
+        try:
+            return self[field_name]
+        except KeyError:
+            return default
+
+    def __contains__(self, field_name: object) -> bool:
+        return self.get(field_name) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.keys())
+
+    def __len__(self) -> int:
+        return len(self.keys())
+
+    def keys(self) -> Tuple[str, ...]:
+        return tuple(name for name in self.field_names() if getattr(self, name) is not None)
+
+    def values(self) -> Tuple[FieldResult, ...]:
+        return tuple(getattr(self, name) for name in self.keys())
+
+    def items(self) -> Tuple[Tuple[str, FieldResult], ...]:
+        return tuple((name, getattr(self, name)) for name in self.keys())
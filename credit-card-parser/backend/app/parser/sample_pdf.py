@@ -0,0 +1,73 @@
+"""
+Minimal PDF builder - no PDF library needed
+Used by the text backend micro-benchmark at startup, the benchmarks and the tests
+"""
+from typing import List, Optional
+
+
+def make_pdf(pages: List[List[str]], image_pages: Optional[List[int]] = None) -> bytes:
+    """
+    Build a PDF with one Helvetica text line per list entry
+    
+    Args:
+        pages: Text lines for each page ([] for a page without text)
+        image_pages: 0-based indexes of pages that also draw an image XObject
+    """
+    image_pages = image_pages or []
+    objects = [
+        None,  # catalog, filled in below
+        None,  # page tree
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+        b"<< /Type /XObject /Subtype /Image /Width 1 /Height 1 /ColorSpace /DeviceGray "
+        b"/BitsPerComponent 8 /Length 1 >>\nstream\n\x80\nendstream",
+    ]
+    page_ids = []
+    for index, lines in enumerate(pages):
+        content = "BT /F1 10 Tf 50 750 Td 12 TL " + " ".join(f"({line}) Tj T*" for line in lines) + " ET"
+        resources = "/Font << /F1 3 0 R >>"
+        if index in image_pages:
+            content = "q 612 0 0 792 0 0 cm /Im1 Do Q " + content
+            resources += " /XObject << /Im1 4 0 R >>"
+        
+        objects.append(f"<< /Length {len(content)} >>\nstream\n{content}\nendstream".encode())
+        content_id = len(objects)
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << {resources} >> /Contents {content_id} 0 R >>".encode()
+        )
+        page_ids.append(len(objects))
+    
+    kids = " ".join(f"{page_id} 0 R" for page_id in page_ids)
+    objects[0] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    objects[1] = f"<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>".encode()
+    
+    output = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+    
+    xref_offset = len(output)
+    output += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    for offset in offsets:
+        output += f"{offset:010d} 00000 n \n".encode()
+    output += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode()
+    return output
+
+
+def statement_pdf(page_count: int, lines_per_page: int = 40) -> bytes:
+    """Synthetic multi-page statement (header page, then transaction pages)"""
+    header = [
+        "HDFC Bank Credit Card Statement",
+        "Card Number: XXXX XXXX XXXX 1234",
+        "Statement Period: 01/01/2025 to 31/01/2025",
+        "Payment Due Date: 20/02/2025",
+        "Total Amount Due: Rs. 12,345.67",
+    ]
+    pages = [header]
+    for page in range(1, page_count):
+        pages.append([
+            f"{(line % 28) + 1:02d}/01/2025  MERCHANT {page:03d}-{line:03d} BANGALORE IN  {100 + line * 7}.{line % 100:02d}"
+            for line in range(lines_per_page)
+        ])
+    return make_pdf(pages)
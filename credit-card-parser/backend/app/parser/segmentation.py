@@ -0,0 +1,232 @@
+"""
+Split PDFs that hold several statements back to back
+Archival exports and some issuers put several months, or several cards,
+in one file. Each page's header is reduced to a signature (issuer, card
+last four, statement period), read from labeled fields only; a page
+whose labeled card number or statement period differs from the
+statement so far starts a new one. Segments are parsed independently,
+in a process pool when there are enough of them to pay for it.
+"""
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+import re
+
+from app.config import settings
+from app.parser.extractors import BILLING_CYCLE_PATTERNS, CARD_PATTERNS, extract_fields
+from app.parser.issuer_detector import ISSUER_PATTERNS, detect_issuer
+from app.parser.memo import detect_issuer_cached, extract_fields_cached, lookup_parse, remember_parse
+from app.parser.pattern_stats import merge_wins, reset_process_stats
+from app.parser.results import StatementResult
+
+logger = logging.getLogger(__name__)
+
+# Characters at the top of a page searched for its header
+HEADER_CHARS = 600
+# A page needs this many signature fields to count as a statement header
+# (a lone period or card number in a summary box does not split)
+MIN_SIGNATURE_FIELDS = 2
+SIGNATURE_FIELDS = ("issuer", "card", "period")
+# Fields whose change starts a new statement; an issuer name alone does not
+SPLIT_FIELDS = ("card", "period")
+
+# Issuer names and labeled fields only; unlabeled card numbers ("*1234",
+# "XXXX XXXX 1234") and bare date ranges (EMI schedules, transaction
+# tables) turn up on continuation pages too
+HEADER_ISSUER_PATTERNS = [
+    (issuer, re.compile(pattern, re.IGNORECASE))
+    for issuer, patterns in ISSUER_PATTERNS.items()
+    for pattern in patterns
+    if ".*" not in pattern
+]
+HEADER_CARD_PATTERNS = [CARD_PATTERNS[i] for i in (0, 1, 5, 6)] + [
+    re.compile(r"Card\s+(?:Number|No\.?)[:\s]+X+\s+X+\s+X+\s+X*(\d{2,4})", re.IGNORECASE),
+]
+HEADER_PERIOD_PATTERNS = [BILLING_CYCLE_PATTERNS[i] for i in (1, 2, 3, 4, 10, 11)]
+
+
+def page_signature(text: str) -> Dict[str, Optional[str]]:
+    """Issuer, card last four and statement period named in a page's header, if any"""
+    header = " ".join(text[:HEADER_CHARS].split())
+    signature = {field: None for field in SIGNATURE_FIELDS}
+
+    for issuer, pattern in HEADER_ISSUER_PATTERNS:
+        if pattern.search(header):
+            signature["issuer"] = issuer
+            break
+    for pattern in HEADER_CARD_PATTERNS:
+        match = pattern.search(header)
+        if match:
+            signature["card"] = match.group(match.lastindex)
+            break
+    for pattern in HEADER_PERIOD_PATTERNS:
+        match = pattern.search(header)
+        if match:
+            signature["period"] = " ".join(match.group(1, 2)).lower()
+            break
+    return signature
+
+
+def starts_statement(current: Dict[str, Optional[str]], signature: Dict[str, Optional[str]]) -> bool:
+    """True if a page with this signature begins a statement other than current"""
+    if sum(value is not None for value in signature.values()) < MIN_SIGNATURE_FIELDS:
+        return False
+    return any(
+        current[field] is not None and signature[field] is not None and current[field] != signature[field]
+        for field in SPLIT_FIELDS
+    )
+
+
+def segment_pages(pages: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+    """
+    Group page records into statements
+
+    Pages without a conflicting header (continuation pages, repeated
+    headers of the same statement) stay with the statement before them.
+
+    Args:
+        pages: {page, source, text} records in page order
+
+    Returns:
+        One list of page records per statement (a single list for an
+        ordinary PDF)
+    """
+    segments: List[List[Dict[str, Any]]] = []
+    current: Dict[str, Optional[str]] = {}
+    for page in pages:
+        signature = page_signature(page["text"] or "")
+        if segments and not starts_statement(current, signature):
+            segments[-1].append(page)
+            # Continuation pages may name what the first page did not
+            current.update({k: v for k, v in signature.items() if current[k] is None})
+            continue
+        segments.append([page])
+        current = signature
+
+    if len(segments) > 1:
+        logger.info(f"Split {len(pages)} pages into {len(segments)} statements at pages "
+                    f"{[segment[0]['page'] for segment in segments]}")
+    return segments
+
+
+def _parse_segment(text: str, page_ends: List[int]) -> Tuple[str, StatementResult]:
+    issuer = detect_issuer_cached(text)
+    return issuer, extract_fields_cached(text, issuer, page_ends)
+
+
+def _parse_in_worker(text: str, page_ends: List[int]) -> Tuple[str, StatementResult, Dict[str, Any]]:
+    """
+    Runs in a pool process: an uncached parse, plus the pattern wins it
+    counted, which the parent records (the worker's own statistics and
+    memo die with it)
+    """
+    stats = reset_process_stats()
+    issuer = detect_issuer(text)
+    fields = extract_fields(text, issuer, page_ends)
+    return issuer, fields, stats.counts() if stats is not None else {}
+
+
+class SegmentParser:
+    """
+    Parses statement segments, in worker processes when at least
+    parallel_min of them are not memoized (field extraction is
+    pure-Python regex work, so threads would not run it in parallel)
+
+    The wins and results of workers are recorded in this process's
+    pattern statistics and memo.
+    """
+
+    def __init__(self, workers: int = 2, parallel_min: int = 4):
+        self.workers = workers
+        self.parallel_min = parallel_min
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.parallel_documents = 0
+        self.serial_documents = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            return self._executor
+
+    def parse(self, segments: List[Tuple[str, List[int]]]) -> List[Tuple[str, StatementResult]]:
+        """
+        Issuer and fields of each (text, page_ends) segment, in order
+        """
+        if self.workers <= 0 or len(segments) < self.parallel_min:
+            self.serial_documents += 1
+            return [_parse_segment(text, ends) for text, ends in segments]
+
+        results = [lookup_parse(text, ends) for text, ends in segments]
+        missing = [i for i, result in enumerate(results) if result is None]
+        if len(missing) < self.parallel_min:
+            self.serial_documents += 1
+            return [result or _parse_segment(text, ends) for result, (text, ends) in zip(results, segments)]
+
+        self.parallel_documents += 1
+        texts = [segments[i][0] for i in missing]
+        ends = [segments[i][1] for i in missing]
+        try:
+            parsed = list(self._get_executor().map(_parse_in_worker, texts, ends))
+        except BrokenProcessPool:
+            logger.error("Segment pool broken, restarting it")
+            self.shutdown(wait=False)
+            parsed = list(self._get_executor().map(_parse_in_worker, texts, ends))
+
+        for i, (issuer, fields, wins) in zip(missing, parsed):
+            merge_wins(wins)
+            remember_parse(segments[i][0], segments[i][1], issuer, fields)
+            results[i] = (issuer, fields)
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "parallel_min": self.parallel_min,
+            "parallel_documents": self.parallel_documents,
+            "serial_documents": self.serial_documents,
+        }
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+
+def available_cpus() -> int:
+    """CPUs this process may run on (its affinity mask where supported)"""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+_parser: Optional[SegmentParser] = None
+_parser_lock = threading.Lock()
+
+
+def get_segment_parser() -> SegmentParser:
+    """
+    Process-wide segment parser (worker processes start on first parallel
+    parse); at most one worker per available CPU, and none on a single CPU,
+    where the pool only adds pickling and IPC
+    """
+    global _parser
+    with _parser_lock:
+        if _parser is None:
+            workers = min(settings.SEGMENT_WORKERS, available_cpus())
+            _parser = SegmentParser(workers if workers > 1 else 0, settings.SEGMENT_PARALLEL_MIN)
+        return _parser
+
+
+def shutdown_segment_parser():
+    """Stop segment worker processes (application shutdown)"""
+    global _parser
+    with _parser_lock:
+        parser, _parser = _parser, None
+    if parser is not None:
+        parser.shutdown()
@@ -0,0 +1,309 @@
+"""
+PDF text layer backends
+PyPDF2 (pure Python) is always available; pypdfium2 and pdfminer.six are
+used when installed. "auto" picks the fastest working backend with a
+micro-benchmark at startup, and every document falls back to the next
+backend if the chosen one fails on it
+"""
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Type
+import logging
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# One page of text layer: {text, has_images, area}; area in square points
+PageLayer = Dict[str, Any]
+
+# Pages in the startup micro-benchmark PDF
+BENCHMARK_PAGES = 8
+# Timed runs per backend (the best run counts)
+BENCHMARK_RUNS = 3
+
+# PDFium keeps global state; only one thread may call into it at a time
+_PDFIUM_LOCK = threading.Lock()
+
+
+class TextExtractor(ABC):
+    """Reads the text layer of each page of a PDF"""
+    name = "base"
+
+    @abstractmethod
+    def iter_pages(self, file_path: str) -> Iterator[PageLayer]:
+        ...
+
+    def read_pages(self, file_path: str) -> List[PageLayer]:
+        return list(self.iter_pages(file_path))
+
+
+class PyPDF2Extractor(TextExtractor):
+    """Pure-Python reader; slow on large statements but always installed"""
+    name = "pypdf2"
+
+    def __init__(self):
+        import PyPDF2
+        self._pypdf2 = PyPDF2
+
+    def iter_pages(self, file_path: str) -> Iterator[PageLayer]:
+        with open(file_path, 'rb') as file:
+            pdf_reader = self._pypdf2.PdfReader(file)
+            for page_num, page in enumerate(pdf_reader.pages, start=1):
+                try:
+                    page_text = page.extract_text() or ""
+                except Exception as e:
+                    logger.warning(f"Page {page_num}: text layer unreadable: {e}")
+                    page_text = ""
+                yield {"text": page_text, "has_images": _page_has_images(page), "area": _page_area(page)}
+
+
+class PdfiumExtractor(TextExtractor):
+    """
+    PDFium (Chrome's PDF engine) through pypdfium2
+
+    PDFium is not thread-safe, so every call into it holds _PDFIUM_LOCK;
+    a page is read under the lock and yielded after it is released.
+    """
+    name = "pypdfium2"
+
+    def __init__(self):
+        import pypdfium2
+        import pypdfium2.raw
+        self._pdfium = pypdfium2
+        self._image_type = pypdfium2.raw.FPDF_PAGEOBJ_IMAGE
+
+    def iter_pages(self, file_path: str) -> Iterator[PageLayer]:
+        with _PDFIUM_LOCK:
+            document = self._pdfium.PdfDocument(file_path)
+        try:
+            with _PDFIUM_LOCK:
+                page_count = len(document)
+            for index in range(page_count):
+                with _PDFIUM_LOCK:
+                    layer = self._read_page(document, index)
+                yield layer
+        finally:
+            with _PDFIUM_LOCK:
+                document.close()
+
+    def _read_page(self, document, index: int) -> PageLayer:
+        page = document[index]
+        textpage = page.get_textpage()
+        try:
+            # max_depth=2 also finds images wrapped in a form XObject
+            images = page.get_objects(filter=[self._image_type], max_depth=2)
+            return {
+                "text": textpage.get_text_range(),
+                "has_images": next(iter(images), None) is not None,
+                "area": page.get_width() * page.get_height(),
+            }
+        finally:
+            textpage.close()
+            page.close()
+
+
+class PdfminerExtractor(TextExtractor):
+    """pdfminer.six layout analysis (pure Python, but better text ordering than PyPDF2)"""
+    name = "pdfminer"
+
+    def __init__(self):
+        from pdfminer.high_level import extract_pages
+        from pdfminer.layout import LTContainer, LTImage, LTTextContainer
+        self._extract_pages = extract_pages
+        self._container = LTContainer
+        self._image = LTImage
+        self._text_container = LTTextContainer
+
+    def iter_pages(self, file_path: str) -> Iterator[PageLayer]:
+        for layout in self._extract_pages(file_path):
+            yield {
+                "text": "".join(el.get_text() for el in layout if isinstance(el, self._text_container)),
+                "has_images": self._has_image(layout),
+                "area": layout.width * layout.height,
+            }
+
+    def _has_image(self, element) -> bool:
+        if isinstance(element, self._image):
+            return True
+        if isinstance(element, self._container) and not isinstance(element, self._text_container):
+            return any(self._has_image(child) for child in element)
+        return False
+
+
+BACKENDS: Dict[str, Type[TextExtractor]] = {
+    "pypdfium2": PdfiumExtractor,
+    "pdfminer": PdfminerExtractor,
+    "pypdf2": PyPDF2Extractor,
+}
+
+
+def available_backends() -> List[TextExtractor]:
+    """Instances of every backend whose library is installed, in BACKENDS order"""
+    backends = []
+    for name, backend_class in BACKENDS.items():
+        try:
+            backends.append(backend_class())
+        except ImportError:
+            logger.debug(f"PDF text backend {name} not installed")
+    return backends
+
+
+def benchmark_backends(backends: List[TextExtractor], file_path: str, runs: int = BENCHMARK_RUNS) -> Dict[str, Dict[str, Any]]:
+    """
+    Time each backend on one PDF
+
+    Args:
+        backends: Backends to compare
+        file_path: PDF to read
+        runs: Timed runs per backend; the fastest is reported
+
+    Returns:
+        {name: {seconds, chars}} for backends that read the file, {name: {error}} otherwise
+    """
+    results = {}
+    for backend in backends:
+        try:
+            best = float("inf")
+            for _ in range(runs):
+                started = time.perf_counter()
+                pages = backend.read_pages(file_path)
+                best = min(best, time.perf_counter() - started)
+            chars = sum(len(page["text"].strip()) for page in pages)
+            results[backend.name] = {"seconds": round(best, 6), "chars": chars}
+        except Exception as e:
+            results[backend.name] = {"error": str(e)}
+    return results
+
+
+def rank_backends(backends: List[TextExtractor], timings: Dict[str, Dict[str, Any]]) -> List[TextExtractor]:
+    """Working backends fastest first, then the ones that failed or read no text"""
+    def key(backend: TextExtractor):
+        timing = timings.get(backend.name, {})
+        if "error" in timing or not timing.get("chars"):
+            return (1, 0.0)
+        return (0, timing["seconds"])
+    return sorted(backends, key=key)
+
+
+class TextBackendChain:
+    """
+    Backends in preference order; each document is read by the first
+    one that succeeds
+    """
+
+    def __init__(self, backends: List[TextExtractor], timings: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.backends = backends
+        self.timings = timings or {}
+        self.documents: Dict[str, int] = {backend.name: 0 for backend in backends}
+        self.fallbacks = 0
+
+    def read_pages(self, file_path: str) -> List[PageLayer]:
+        """
+        Read all pages with the preferred backend, falling back on error
+
+        Raises:
+            The last backend's error when none can read the file
+        """
+        error: Optional[Exception] = None
+        for backend in self.backends:
+            try:
+                pages = backend.read_pages(file_path)
+                self.documents[backend.name] += 1
+                return pages
+            except Exception as e:
+                logger.warning(f"PDF text backend {backend.name} failed on {Path(file_path).name}: {e}")
+                self.fallbacks += 1
+                error = e
+        raise error or RuntimeError("No PDF text backend available")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "order": [backend.name for backend in self.backends],
+            "documents": dict(self.documents),
+            "fallbacks": self.fallbacks,
+            "benchmark": self.timings,
+        }
+
+
+def build_chain(name: str = "auto") -> TextBackendChain:
+    """
+    Backend chain for a PDF_TEXT_BACKEND setting
+
+    A named backend comes first and the other installed ones follow as
+    fallbacks; "auto" orders them by a micro-benchmark on a generated
+    statement.
+    """
+    backends = available_backends()
+    if name != "auto":
+        if name not in BACKENDS:
+            raise ValueError(f"Unknown PDF text backend: {name}")
+        preferred = [b for b in backends if b.name == name]
+        if not preferred:
+            logger.warning(f"PDF text backend {name} not installed, using the others")
+        return TextBackendChain(preferred + [b for b in backends if b.name != name])
+
+    if len(backends) < 2:
+        return TextBackendChain(backends)
+
+    from app.parser.sample_pdf import statement_pdf
+    with tempfile.TemporaryDirectory() as workdir:
+        sample = Path(workdir) / "benchmark.pdf"
+        sample.write_bytes(statement_pdf(BENCHMARK_PAGES))
+        timings = benchmark_backends(backends, str(sample))
+
+    ranked = rank_backends(backends, timings)
+    logger.info(f"PDF text backends by speed: {[b.name for b in ranked]} ({timings})")
+    return TextBackendChain(ranked, timings)
+
+
+_chain: Optional[TextBackendChain] = None
+_chain_lock = threading.Lock()
+
+
+def get_text_backends() -> TextBackendChain:
+    """Process-wide backend chain, built (and benchmarked) on first use"""
+    global _chain
+    with _chain_lock:
+        if _chain is None:
+            _chain = build_chain(settings.PDF_TEXT_BACKEND)
+        return _chain
+
+
+def _page_area(page) -> float:
+    try:
+        box = page.mediabox
+        return float(box.width) * float(box.height)
+    except Exception:
+        return 0.0
+
+
+def _page_has_images(page) -> bool:
+    """True if the page (or a form XObject it draws) contains an image XObject"""
+    try:
+        return _resources_have_images(page.get("/Resources"))
+    except Exception as e:
+        logger.debug(f"Could not inspect page resources: {e}")
+        return False
+
+
+def _resources_have_images(resources, depth: int = 0) -> bool:
+    if resources is None:
+        return False
+    xobjects = resources.get_object().get("/XObject")
+    if xobjects is None:
+        return False
+
+    for xobject in xobjects.get_object().values():
+        xobject = xobject.get_object()
+        subtype = xobject.get("/Subtype")
+        if subtype == "/Image":
+            return True
+        # Scanners often wrap the page image in a form XObject
+        if subtype == "/Form" and depth < 2:
+            if _resources_have_images(xobject.get("/Resources"), depth + 1):
+                return True
+    return False
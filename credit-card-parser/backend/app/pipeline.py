@@ -0,0 +1,123 @@
+"""
+Shared parsing steps used by the upload route and background jobs
+"""
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+
+from app.admission import Slot, ocr_admission
+from app.config import settings
+from app.memory import track_memory
+from app.parser.pdf_reader import iter_page_analysis
+from app.parser.memo import detect_issuer_cached, extract_fields_cached
+from app.parser.normalizers import typed_columns
+from app.parser.results import StatementResult
+
+logger = logging.getLogger(__name__)
+
+# Documents with less usable text than this after the per-page pass are OCR'd whole
+MIN_DOCUMENT_CHARS = 50
+
+
+def extract_document_pages(file_path: str, parse_slot: Optional[Slot] = None) -> List[Dict[str, Any]]:
+    """
+    Text of every page, from the text layer where usable and OCR elsewhere
+    
+    Only pages lacking a usable text layer are rasterized, so digital
+    pages never pay the OCR cost. OCR runs under the OCR admission gate;
+    parse_slot, if given, is released before waiting for it.
+    
+    Returns:
+        List of {page, source, text} with source "text" or "ocr"
+    """
+    with track_memory("text"):
+        pages = [
+            {"page": info["page"], "source": "text", "text": info["text"], "needs_ocr": info["needs_ocr"]}
+            for info in iter_page_analysis(file_path)
+        ]
+    ocr_numbers = [p["page"] for p in pages if p["needs_ocr"]][:settings.MAX_PAGES_OCR]
+    
+    if ocr_numbers and settings.OCR_ENABLED:
+        logger.info(f"OCR needed for pages {ocr_numbers} of {len(pages)}")
+        with ocr_admission(parse_slot):
+            ocr_texts = extract_pages_with_ocr(file_path, ocr_numbers)
+        for number, ocr_text in zip(ocr_numbers, ocr_texts):
+            pages[number - 1].update(source="ocr", text=ocr_text)
+    
+    records = [{"page": p["page"], "source": p["source"], "text": p["text"]} for p in pages]
+    
+    # Safety net for unreadable files and image-free pages with no text layer
+    if not ocr_numbers and len(join_pages(records).strip()) < MIN_DOCUMENT_CHARS and settings.OCR_ENABLED:
+        logger.warning("Text extraction failed, trying OCR...")
+        with ocr_admission(parse_slot):
+            ocr_texts = extract_pages_with_ocr(file_path)
+        records = [
+            {"page": number, "source": "ocr", "text": text}
+            for number, text in enumerate(ocr_texts, start=1)
+        ]
+    
+    return records
+
+
+def extract_pages_with_ocr(file_path: str, page_numbers: Optional[List[int]] = None) -> List[str]:
+    """OCR pages of a PDF; the OCR stack (pdf2image, NumPy, PIL) is imported on first use"""
+    from app.parser.ocr_handler import extract_pages_with_ocr as ocr_pages
+    with track_memory("ocr"):
+        return ocr_pages(file_path, page_numbers)
+
+
+def join_pages(pages: List[Dict[str, Any]]) -> str:
+    """Full document text from page records"""
+    return "\n".join(p["text"] for p in pages if p["text"]).strip()
+
+
+def page_ends(pages: List[Dict[str, Any]]) -> List[int]:
+    """Offsets in join_pages(pages) where each non-empty page ends"""
+    texts = [p["text"] for p in pages if p["text"]]
+    if not texts:
+        return []
+    
+    # join_pages strips the joined text; shift offsets by the leading whitespace
+    leading = len(texts[0]) - len(texts[0].lstrip())
+    total_length = len(join_pages(pages))
+    ends, offset = [], -leading
+    for text in texts:
+        offset += len(text)
+        ends.append(max(0, min(offset, total_length)))
+        offset += 1  # newline separator
+    return ends
+
+
+def parse_text(
+    text: str,
+    page_ends: Optional[List[int]] = None
+) -> Tuple[str, StatementResult]:
+    """
+    Detect the issuer and extract all fields from statement text
+    
+    Returns:
+        (issuer, extracted fields)
+    """
+    issuer = detect_issuer_cached(text)
+    return issuer, extract_fields_cached(text, issuer, page_ends)
+
+
+def statement_columns(issuer: str, extracted_data: StatementResult) -> Dict[str, Any]:
+    """
+    ParsedStatement column values derived from an extraction result
+    
+    Returns:
+        Dictionary of column name -> value (excluding id, filename and raw_text)
+    """
+    def value(field_name: str) -> Optional[str]:
+        field = extracted_data.get(field_name)
+        return field.value if field is not None else None
+    
+    return {
+        "issuer": issuer,
+        "card_last_four": value('card_last_four'),
+        "billing_cycle": value('billing_cycle'),
+        "due_date": value('due_date'),
+        "total_amount_due": value('total_amount_due'),
+        "confidence_score": extracted_data.overall_confidence(),
+        **typed_columns(extracted_data),
+    }
@@ -0,0 +1,261 @@
+"""
+On-demand profiling of uploads
+With PROFILING_ENABLED, a PROFILE_SAMPLE_RATE fraction of uploads, and any
+upload sent with an X-Profile header, is parsed under cProfile or a
+stack-sampling profiler. The last PROFILE_BUFFER_SIZE profiles are kept in
+memory per process and downloaded from /admin/profiles: cProfile runs as
+.pstats files (python -m pstats, snakeviz), sampled runs as speedscope
+JSON (https://www.speedscope.app). Disabled, an upload costs one settings
+check. OCR runs in worker processes and is not part of the profiles.
+"""
+import cProfile
+import io
+import marshal
+import pstats
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+import logging
+
+from app.config import settings
+from app.utils.serialization import dumps
+
+logger = logging.getLogger(__name__)
+
+CPROFILE = "cprofile"
+SAMPLE = "sample"
+MODES = (CPROFILE, SAMPLE)
+
+# Profiled requests running at once; further ones run unprofiled
+MAX_CONCURRENT_PROFILES = 2
+# Functions listed by the text summary of a cProfile run
+TEXT_SUMMARY_ROWS = 40
+
+# (filename, first line, function name)
+FrameKey = Tuple[str, int, str]
+
+
+class Profile:
+    """One finished profile: cProfile stats or sampled stacks with their weights (seconds)"""
+
+    def __init__(self, label: str, mode: str, started_at: datetime, duration: float, data):
+        self.id = uuid.uuid4().hex[:12]
+        self.label = label
+        self.mode = mode
+        self.started_at = started_at
+        self.duration = duration
+        self.data = data
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "label": self.label,
+            "mode": self.mode,
+            "format": "pstats" if self.mode == CPROFILE else "speedscope",
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": round(self.duration * 1000, 2),
+            "samples": len(self.data) if self.mode == SAMPLE else None,
+            "url": f"/admin/profiles/{self.id}",
+        }
+
+    def export(self) -> Tuple[bytes, str, str]:
+        """
+        File contents, media type and file name
+
+        cProfile stats are marshalled exactly as Profile.dump_stats writes them.
+        """
+        if self.mode == CPROFILE:
+            return marshal.dumps(self.data), "application/octet-stream", f"{self.id}.pstats"
+        return dumps(self._speedscope()), "application/json", f"{self.id}.speedscope.json"
+
+    def summary(self) -> str:
+        """Plain-text view: top functions by cumulative time, or collapsed stacks"""
+        if self.mode == SAMPLE:
+            return "".join(
+                f"{';'.join(name for _, _, name in stack)} {round(weight * 1e6)}\n"
+                for stack, weight in self.data.most_common()
+            )
+        stats = pstats.Stats(_StatsHolder(self.data), stream=io.StringIO())
+        stats.sort_stats("cumulative").print_stats(TEXT_SUMMARY_ROWS)
+        return stats.stream.getvalue()
+
+    def _speedscope(self) -> Dict[str, Any]:
+        frames: Dict[FrameKey, int] = {}
+        samples, weights = [], []
+        for stack, weight in self.data.items():
+            samples.append([frames.setdefault(frame, len(frames)) for frame in stack])
+            weights.append(weight)
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": self.label,
+            "exporter": "credit-card-parser",
+            "shared": {"frames": [{"name": name, "file": file, "line": line} for file, line, name in frames]},
+            "profiles": [{
+                "type": "sampled",
+                "name": self.label,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights,
+            }],
+        }
+
+
+class _StatsHolder:
+    """Lets pstats.Stats load in-memory cProfile stats"""
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+class StackSampler:
+    """
+    Samples one thread's Python stack every interval seconds from a
+    background thread; each stack is weighted by the time since the
+    previous sample
+    """
+
+    def __init__(self, thread_id: int, interval: float, root: Optional[Any] = None):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.root = root  # Code object: frames above it (thread pool plumbing) are dropped
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def __enter__(self) -> "StackSampler":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            now = time.perf_counter()
+            if frame is not None:
+                self.stacks[self._stack(frame)] += now - last
+            last = now
+
+    def _stack(self, frame) -> Tuple[FrameKey, ...]:
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            if code is self.root:
+                break
+            stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+            frame = frame.f_back
+        stack.reverse()
+        return tuple(stack)
+
+
+class ProfileBuffer:
+    """Ring buffer of the most recent profiles"""
+
+    def __init__(self, size: int):
+        self._profiles: Deque[Profile] = deque(maxlen=size)
+        self._lock = threading.Lock()
+        self.recorded = 0
+
+    def add(self, profile: Profile):
+        with self._lock:
+            self._profiles.append(profile)
+            self.recorded += 1
+
+    def get(self, profile_id: str) -> Optional[Profile]:
+        with self._lock:
+            return next((p for p in self._profiles if p.id == profile_id), None)
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Newest first"""
+        with self._lock:
+            return [profile.describe() for profile in reversed(self._profiles)]
+
+
+_buffer: Optional[ProfileBuffer] = None
+_buffer_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(MAX_CONCURRENT_PROFILES)
+
+
+def get_profile_buffer() -> ProfileBuffer:
+    global _buffer
+    with _buffer_lock:
+        if _buffer is None:
+            _buffer = ProfileBuffer(settings.PROFILE_BUFFER_SIZE)
+        return _buffer
+
+
+def choose_profile_mode(header: Optional[str] = None) -> Optional[str]:
+    """
+    Profiler for this request, or None
+
+    Args:
+        header: X-Profile value: "cprofile" or "sample", anything else
+            non-empty for the default PROFILE_MODE
+    """
+    if not settings.PROFILING_ENABLED:
+        return None
+    if header:
+        mode = header.strip().lower()
+        return mode if mode in MODES else settings.PROFILE_MODE
+    if settings.PROFILE_SAMPLE_RATE > 0 and random.random() < settings.PROFILE_SAMPLE_RATE:
+        return settings.PROFILE_MODE
+    return None
+
+
+def run_profiled(mode: Optional[str], label: str, func: Callable, *args, **kwargs):
+    """
+    Call func, under the given profiler if mode is set; the profile is
+    recorded whether func returns or raises
+    """
+    if mode is None or not _slots.acquire(blocking=False):
+        return func(*args, **kwargs)
+
+    started_at = datetime.utcnow()
+    started = time.perf_counter()
+    try:
+        if mode == CPROFILE:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                # Another profiler already owns the interpreter (sys.monitoring on 3.12+)
+                logger.debug(f"Could not start cProfile for {label}")
+                return func(*args, **kwargs)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profiler.disable()
+                profiler.create_stats()
+                _record(label, mode, started_at, time.perf_counter() - started, profiler.stats)
+
+        sampler = StackSampler(
+            threading.get_ident(),
+            settings.PROFILE_SAMPLE_INTERVAL_MS / 1000,
+            root=run_profiled.__code__
+        )
+        try:
+            with sampler:
+                return func(*args, **kwargs)
+        finally:
+            _record(label, mode, started_at, time.perf_counter() - started, sampler.stacks)
+    finally:
+        _slots.release()
+
+
+def _record(label: str, mode: str, started_at: datetime, duration: float, data):
+    profile = Profile(label, mode, started_at, duration, data)
+    get_profile_buffer().add(profile)
+    logger.info(f"Recorded {mode} profile {profile.id} of {label} ({duration * 1000:.1f} ms)")
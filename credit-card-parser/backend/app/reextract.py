@@ -0,0 +1,136 @@
+"""
+Re-run the current extractors over stored statement text
+No PDFs or OCR needed - text comes from statement_texts
+
+Run with: python -m app.reextract [--batch-size 500] [--workers 4]
+"""
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import logging
+
+from sqlalchemy import bindparam, select, update
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models import ParsedStatement, StatementText
+from app.pipeline import page_ends, parse_text, statement_columns
+from app.result_cache import invalidate_results
+from app.text_store import fields_json, load_pages, load_text
+from app.utils.logger import setup_logger
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 500
+
+
+def iter_stored_texts(
+    db,
+    batch_size: int = DEFAULT_BATCH_SIZE
+) -> Iterator[List[Tuple[str, str, Optional[List[int]]]]]:
+    """
+    Stream stored texts in primary-key order using keyset pagination
+
+    Yields:
+        Batches of (statement_id, text, page_ends); page_ends is None for
+        texts stored without page records
+    """
+    last_id = ""
+    while True:
+        rows = db.execute(
+            select(StatementText.statement_id, StatementText.codec, StatementText.text_blob, StatementText.pages_blob)
+            .where(StatementText.statement_id > last_id)
+            .order_by(StatementText.statement_id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            return
+
+        yield [(row.statement_id, load_text(row), page_ends(load_pages(row)) or None) for row in rows]
+        last_id = rows[-1].statement_id
+
+
+def _init_worker():
+    """
+    Pool initializer: backfills do not count pattern wins, which would
+    outweigh live traffic and have every worker rewrite the stats file
+    """
+    settings.PATTERN_STATS_ENABLED = False
+
+
+def reextract_one(item: Tuple[str, str, Optional[List[int]]]) -> Dict[str, Any]:
+    """
+    Parse one stored text with the same page windows as the upload did;
+    returns the column values to update (fields_json goes to statement_texts)
+    """
+    statement_id, text, ends = item
+    issuer, extracted_data = parse_text(text, ends)
+    return {"id": statement_id, **statement_columns(issuer, extracted_data), "fields_json": fields_json(extracted_data)}
+
+
+def reextract_statements(
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    workers: Optional[int] = None
+) -> Dict[str, int]:
+    """
+    Re-extract every stored statement and bulk-update parsed_statements
+
+    Args:
+        batch_size: Rows read, parsed and updated per round trip
+        workers: Parser processes (defaults to CPU count)
+
+    Returns:
+        Number of statements processed
+    """
+    workers = workers or os.cpu_count() or 1
+    processed = 0
+
+    db = SessionLocal()
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            for batch in iter_stored_texts(db, batch_size):
+                chunksize = max(1, len(batch) // (workers * 4))
+                rows = list(pool.map(reextract_one, batch, chunksize=chunksize))
+
+                # Bulk UPDATE by id (executemany); id alone, since the table's
+                # primary key also holds the partition key
+                statements = ParsedStatement.__table__
+                db.execute(
+                    update(statements)
+                    .where(statements.c.id == bindparam("row_id"))
+                    .values({column: bindparam(column) for column in rows[0] if column not in ("id", "fields_json")}),
+                    [{**row, "row_id": row["id"]} for row in rows]
+                )
+                # Replays return the stored fields, so they follow the new values
+                texts = StatementText.__table__
+                db.execute(
+                    update(texts)
+                    .where(texts.c.statement_id == bindparam("row_id"))
+                    .values(fields_json=bindparam("fields_json")),
+                    [{"row_id": row["id"], "fields_json": row["fields_json"]} for row in rows]
+                )
+                db.commit()
+                invalidate_results(row["id"] for row in rows)
+
+                processed += len(batch)
+                logger.info(f"Re-extracted {processed} statements")
+    finally:
+        db.close()
+
+    return {"processed": processed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-extract fields from stored statement text")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    setup_logger(__name__)
+    stats = reextract_statements(batch_size=args.batch_size, workers=args.workers)
+    logger.info(f"Re-extraction complete: {stats}")
+
+
+if __name__ == "__main__":
+    main()
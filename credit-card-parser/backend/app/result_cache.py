@@ -0,0 +1,80 @@
+"""
+In-process cache of serialized /results responses with strong ETags
+Filled by upload_statement when a result is written, so polling clients
+rarely reach the database. Re-extraction and retention invalidate it in
+the process they run in; other processes see their changes once
+RESULT_CACHE_TTL_SECONDS have passed.
+"""
+import hashlib
+import threading
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from app.config import settings
+from app.models import ParsedStatement
+from app.utils.lru import LRUCache
+from app.utils.serialization import dumps
+
+# Serialized JSON body and its ETag
+CachedResult = Tuple[bytes, str]
+
+
+def result_payload(statement: ParsedStatement) -> Dict[str, Any]:
+    """/results/{session_id} response body for a stored statement"""
+    return {
+        "id": statement.id,
+        "filename": statement.filename,
+        "issuer": statement.issuer,
+        "card_last_four": statement.card_last_four,
+        "billing_cycle": statement.billing_cycle,
+        "due_date": statement.due_date,
+        "total_amount_due": statement.total_amount_due,
+        "confidence_score": statement.confidence_score,
+        "created_at": statement.created_at.isoformat()
+    }
+
+
+def serialize_result(statement: ParsedStatement) -> CachedResult:
+    """
+    JSON body and strong ETag for a stored statement
+
+    The ETag is a hash of the body, so a re-extracted result gets a new one.
+    """
+    body = dumps(result_payload(statement))
+    return body, f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches etag (weak comparison, as for GET)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+_cache: Optional[LRUCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> Optional[LRUCache]:
+    """Process-wide result cache, or None when RESULT_CACHE_SIZE is 0"""
+    global _cache
+    if settings.RESULT_CACHE_SIZE <= 0:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = LRUCache(settings.RESULT_CACHE_SIZE, settings.RESULT_CACHE_TTL_SECONDS)
+        return _cache
+
+
+def invalidate_results(statement_ids: Optional[Iterable[str]] = None):
+    """Drop cached results of these statements (all of them when None)"""
+    cache = get_result_cache()
+    if cache is None:
+        return
+    if statement_ids is None:
+        cache.clear()
+        return
+    for statement_id in statement_ids:
+        cache.discard(statement_id)
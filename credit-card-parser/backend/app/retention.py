@@ -0,0 +1,295 @@
+"""
+Monthly partitions of parsed_statements, retention and archival
+On PostgreSQL parsed_statements is range-partitioned by created_at: one
+partition per month (parsed_statements_y2025m01, ...) plus a default
+partition for rows outside them. Retention detaches partitions older
+than RETENTION_MONTHS, archives them and their statement texts to
+gzipped CSV, and drops them - no row-by-row deletes.
+Other databases (SQLite) have no partitions; there retention archives
+and deletes old rows with one range DELETE per table.
+
+Run with: python -m app.retention [--months 24] [--archive-dir archive] [--dry-run]
+"""
+import argparse
+import csv
+import gzip
+import re
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+
+from sqlalchemy import delete, func, select, text
+from sqlalchemy.engine import Connection
+
+from app.config import settings
+from app.database import engine
+from app.models import ParsedStatement, StatementSearch, StatementText
+from app.result_cache import invalidate_results
+from app.utils.logger import setup_logger
+
+logger = logging.getLogger(__name__)
+
+TABLE = "parsed_statements"
+DEFAULT_PARTITION = f"{TABLE}_default"
+PARTITION_NAME = re.compile(rf"^{TABLE}_y(\d{{4}})m(\d{{2}})$")
+
+# Rows fetched per round trip when archiving without partitions
+ARCHIVE_BATCH_SIZE = 1000
+# Advisory lock serializing partition creation between processes (API
+# workers and queue workers all run ensure_partitions at startup)
+PARTITION_LOCK_KEY = 0x70617274
+
+
+def month_start(value: datetime) -> datetime:
+    return datetime(value.year, value.month, 1)
+
+
+def add_months(month: datetime, count: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + count
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: datetime) -> str:
+    return f"{TABLE}_y{month.year}m{month.month:02d}"
+
+
+def partition_month(name: str) -> Optional[datetime]:
+    match = PARTITION_NAME.match(name)
+    return datetime(int(match.group(1)), int(match.group(2)), 1) if match else None
+
+
+def is_partitioned(connection: Connection) -> bool:
+    """True if parsed_statements is a partitioned PostgreSQL table"""
+    if connection.dialect.name != "postgresql":
+        return False
+    return connection.execute(text(
+        "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+        "WHERE c.relname = :table AND pg_table_is_visible(c.oid)"
+    ), {"table": TABLE}).first() is not None
+
+
+def list_partitions(connection: Connection) -> Dict[datetime, Tuple[str, bool]]:
+    """
+    Monthly partition tables by month
+
+    Returns:
+        {month: (table name, attached)}; detached ones are left over from
+        an interrupted retention run
+    """
+    rows = connection.execute(text(
+        "SELECT c.relname, EXISTS (SELECT 1 FROM pg_inherits i WHERE i.inhrelid = c.oid) "
+        "FROM pg_class c WHERE c.relkind IN ('r', 'p') AND c.relname LIKE :pattern "
+        "AND pg_table_is_visible(c.oid)"
+    ), {"pattern": f"{TABLE}_y%"}).all()
+    partitions = {}
+    for name, attached in rows:
+        month = partition_month(name)
+        if month is not None:
+            partitions[month] = (name, attached)
+    return partitions
+
+
+def ensure_partitions(
+    connection: Connection,
+    now: Optional[datetime] = None,
+    ahead: Optional[int] = None,
+    since: Optional[datetime] = None
+) -> List[str]:
+    """
+    Create the default partition and monthly partitions from since (or
+    this month) to ahead months from now; no-op without partitioning
+
+    Rows already in the default partition for a new month are moved into it.
+    Runs under a transaction-level advisory lock, so processes starting
+    together create each partition once; the caller's transaction must
+    commit to release it.
+
+    Returns:
+        Names of the partitions created
+    """
+    if not is_partitioned(connection):
+        return []
+
+    connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": PARTITION_LOCK_KEY})
+    connection.execute(text(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {TABLE} DEFAULT"))
+
+    current = month_start(now or datetime.utcnow())
+    ahead = settings.PARTITION_PREMAKE_MONTHS if ahead is None else ahead
+    month = month_start(since) if since is not None and since < current else current
+    # Listed after taking the lock, so partitions committed by the previous holder are seen
+    existing = list_partitions(connection)
+    created = []
+    while month <= add_months(current, ahead):
+        if month not in existing:
+            _create_partition(connection, month)
+            created.append(partition_name(month))
+        month = add_months(month, 1)
+
+    if created:
+        logger.info(f"Created partitions {created}")
+    return created
+
+
+def _create_partition(connection: Connection, month: datetime):
+    name = partition_name(month)
+    bounds = {"lower": month, "upper": add_months(month, 1)}
+    connection.execute(text(f"CREATE TABLE IF NOT EXISTS {name} (LIKE {TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    # A default partition holding rows of this month would block ATTACH; move them first
+    connection.execute(text(
+        f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE created_at >= :lower AND created_at < :upper "
+        f"RETURNING *) INSERT INTO {name} SELECT * FROM moved"
+    ), bounds)
+    connection.execute(text(
+        f"ALTER TABLE {TABLE} ATTACH PARTITION {name} "
+        f"FOR VALUES FROM ('{bounds['lower'].isoformat()}') TO ('{bounds['upper'].isoformat()}')"
+    ))
+
+
+def run_retention(
+    months: Optional[int] = None,
+    archive_dir: Optional[str] = None,
+    now: Optional[datetime] = None,
+    dry_run: bool = False
+) -> Dict[str, Any]:
+    """
+    Archive and remove statements older than `months` full months
+
+    Args:
+        months: Months kept before the current one (RETENTION_MONTHS; 0 keeps everything)
+        archive_dir: Where the .csv.gz archives are written (ARCHIVE_DIR)
+        now: Reference time (defaults to the current time)
+        dry_run: Only report what would be archived
+
+    Returns:
+        Cutoff, archive files written and partitions dropped
+    """
+    months = settings.RETENTION_MONTHS if months is None else months
+    if months <= 0:
+        return {"cutoff": None, "partitions": [], "archives": []}
+
+    cutoff = add_months(month_start(now or datetime.utcnow()), -months)
+    archive_path = Path(archive_dir or settings.ARCHIVE_DIR)
+    result = {"cutoff": cutoff.isoformat(), "partitions": [], "archives": []}
+
+    with engine.begin() as connection:
+        partitioned = is_partitioned(connection)
+        expired = sorted(
+            (month, name, attached)
+            for month, (name, attached) in (list_partitions(connection) if partitioned else {}).items()
+            if month < cutoff
+        )
+
+    for month, name, attached in expired:
+        result["partitions"].append(name)
+        if not dry_run:
+            archive_path.mkdir(parents=True, exist_ok=True)
+            result["archives"].extend(archive_partition(name, attached, archive_path))
+
+    # Without partitions (or in the default partition): a range DELETE per table
+    if dry_run:
+        with engine.connect() as connection:
+            result["rows"] = connection.execute(
+                select(func.count()).select_from(ParsedStatement).where(ParsedStatement.created_at < cutoff)
+            ).scalar()
+    else:
+        result["archives"].extend(archive_rows_before(cutoff, archive_path))
+        if result["archives"]:
+            # Partitions are dropped wholesale, so the removed ids are not at hand
+            invalidate_results()
+
+    logger.info(f"Retention: {result}")
+    return result
+
+
+def archive_partition(name: str, attached: bool, archive_dir: Path) -> List[str]:
+    """
+    Detach a monthly partition, archive it and its statement texts, drop it
+
+    Detaching first takes the partition out of every query at once; if
+    archiving fails the detached table is kept and retried next run.
+    """
+    if attached:
+        with engine.begin() as connection:
+            connection.execute(text(f"ALTER TABLE {TABLE} DETACH PARTITION {name}"))
+
+    statements_file = archive_dir / f"{name}.csv.gz"
+    texts_file = archive_dir / f"{name}_texts.csv.gz"
+    _copy_out(f"COPY {name} TO STDOUT WITH CSV HEADER", statements_file)
+    _copy_out(
+        f"COPY (SELECT t.* FROM statement_texts t JOIN {name} s ON t.statement_id = s.id) "
+        f"TO STDOUT WITH CSV HEADER",
+        texts_file
+    )
+
+    with engine.begin() as connection:
+        connection.execute(text(f"DELETE FROM statement_texts t USING {name} s WHERE t.statement_id = s.id"))
+        connection.execute(text(f"DELETE FROM statement_search d USING {name} s WHERE d.statement_id = s.id"))
+        connection.execute(text(f"DROP TABLE {name}"))
+    logger.info(f"Archived and dropped partition {name}")
+    return [str(statements_file), str(texts_file)]
+
+
+def _copy_out(sql: str, path: Path):
+    """Stream a PostgreSQL COPY ... TO STDOUT into a gzip file"""
+    raw = engine.raw_connection()
+    try:
+        with gzip.open(path, "wt", encoding="utf-8", newline="") as archive:
+            raw.cursor().copy_expert(sql, archive)
+        raw.commit()
+    finally:
+        raw.close()
+
+
+def archive_rows_before(cutoff: datetime, archive_dir: Path) -> List[str]:
+    """Archive statements created before cutoff (and their texts), then delete them"""
+    old_ids = select(ParsedStatement.id).where(ParsedStatement.created_at < cutoff)
+    with engine.connect() as connection:
+        if connection.execute(old_ids.limit(1)).first() is None:
+            return []
+
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    stamp = f"before_{cutoff:%Y_%m}_{datetime.utcnow():%Y%m%d%H%M%S}"
+    statements_file = archive_dir / f"{TABLE}_{stamp}.csv.gz"
+    texts_file = archive_dir / f"{TABLE}_{stamp}_texts.csv.gz"
+
+    with engine.begin() as connection:
+        _write_csv(connection, select(ParsedStatement.__table__).where(ParsedStatement.created_at < cutoff), statements_file)
+        _write_csv(connection, select(StatementText.__table__).where(StatementText.statement_id.in_(old_ids)), texts_file)
+        connection.execute(delete(StatementText).where(StatementText.statement_id.in_(old_ids)))
+        connection.execute(delete(StatementSearch).where(StatementSearch.statement_id.in_(old_ids)))
+        deleted = connection.execute(delete(ParsedStatement).where(ParsedStatement.created_at < cutoff)).rowcount
+
+    logger.info(f"Archived and deleted {deleted} statements created before {cutoff:%Y-%m}")
+    return [str(statements_file), str(texts_file)]
+
+
+def _write_csv(connection: Connection, query, path: Path):
+    """Stream query results to a gzipped CSV (binary columns as \\x-hex, like COPY)"""
+    result = connection.execution_options(stream_results=True).execute(query)
+    with gzip.open(path, "wt", encoding="utf-8", newline="") as archive:
+        writer = csv.writer(archive)
+        writer.writerow(result.keys())
+        for rows in iter(lambda: result.fetchmany(ARCHIVE_BATCH_SIZE), []):
+            writer.writerows(
+                ["\\x" + value.hex() if isinstance(value, bytes) else value for value in row]
+                for row in rows
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive and remove old parsed statements")
+    parser.add_argument("--months", type=int, default=None, help="Full months kept before the current one")
+    parser.add_argument("--archive-dir", default=None)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    setup_logger(__name__)
+    with engine.begin() as connection:
+        ensure_partitions(connection)
+    result = run_retention(args.months, args.archive_dir, dry_run=args.dry_run)
+    logger.info(f"Retention complete: {result}")
+
+
+if __name__ == "__main__":
+    main()
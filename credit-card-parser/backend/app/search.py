@@ -0,0 +1,201 @@
+"""
+Search over stored statements
+Card, issuer, amount and date filters use b-tree indexes on
+parsed_statements. Text queries use the GIN-indexed tsvector in
+statement_search on PostgreSQL; other databases (SQLite) fall back to an
+in-process inverted index built from statement_texts
+"""
+import re
+import threading
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import logging
+
+from sqlalchemy import bindparam, func, insert, select
+from sqlalchemy.orm import Session
+
+from app.models import ParsedStatement, StatementSearch, StatementText
+from app.text_store import load_text
+
+logger = logging.getLogger(__name__)
+
+# No stemming or stop words: card digits, merchant names and amounts match as typed
+SEARCH_CONFIG = "simple"
+TOKEN = re.compile(r"\w+")
+
+# Stored texts loaded per round trip when building the in-process index
+INDEX_BATCH_SIZE = 500
+
+SEARCH_COLUMNS = (
+    ParsedStatement.id,
+    ParsedStatement.filename,
+    ParsedStatement.issuer,
+    ParsedStatement.card_last_four,
+    ParsedStatement.due_on,
+    ParsedStatement.amount_due,
+    ParsedStatement.confidence_score,
+    ParsedStatement.created_at,
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased word tokens, the same split as the 'simple' tsvector config"""
+    return TOKEN.findall(text.lower())
+
+
+class InvertedIndex:
+    """
+    Token -> statement ids, for databases without full-text indexes
+
+    Built from statement_texts on first search, then kept current by this
+    process's writes and by loading texts newer than the last load (other
+    processes' writes). Meant for development-sized data.
+    """
+
+    def __init__(self):
+        self._postings: Dict[str, Set[str]] = {}
+        self._documents = 0
+        self._loaded_until: Optional[datetime] = None
+        self._lock = threading.Lock()
+
+    def add(self, statement_id: str, text: str):
+        with self._lock:
+            self._add(statement_id, text)
+
+    def _add(self, statement_id: str, text: str):
+        for token in set(tokenize(text)):
+            self._postings.setdefault(token, set()).add(statement_id)
+        self._documents += 1
+
+    def search(self, tokens: Iterable[str]) -> Set[str]:
+        """Ids of statements containing every token"""
+        with self._lock:
+            postings = sorted((self._postings.get(token, set()) for token in set(tokens)), key=len)
+            if not postings:
+                return set()
+            matches = set(postings[0])
+            for posting in postings[1:]:
+                matches &= posting
+            return matches
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded_until is not None
+
+    def refresh(self, db: Session):
+        """Load stored texts written since the last refresh (all of them the first time)"""
+        with self._lock:
+            # Overlap by a second so rows committed slightly out of order are not missed
+            since = self._loaded_until - timedelta(seconds=1) if self._loaded_until else None
+            started = datetime.utcnow()
+            query = select(StatementText.statement_id, StatementText.codec, StatementText.text_blob)
+            if since is not None:
+                query = query.where(StatementText.created_at >= since)
+
+            result = db.execute(query.execution_options(stream_results=True))
+            for rows in iter(lambda: result.fetchmany(INDEX_BATCH_SIZE), []):
+                for row in rows:
+                    self._add(row.statement_id, load_text(row))
+            self._loaded_until = started
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"documents": self._documents, "tokens": len(self._postings)}
+
+
+_text_index = InvertedIndex()
+
+
+def get_text_index() -> InvertedIndex:
+    """Process-wide in-process text index (used when the database has no full-text search)"""
+    return _text_index
+
+
+def uses_database_fts(db: Session) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+
+def index_texts(db: Session, documents: List[Tuple[str, str]]):
+    """
+    Make newly stored statements searchable, in the caller's transaction
+
+    Args:
+        db: Session that is inserting the statements
+        documents: (statement_id, full text) pairs
+    """
+    if not documents:
+        return
+    if uses_database_fts(db):
+        db.execute(
+            insert(StatementSearch).values(
+                statement_id=bindparam("row_id"),
+                document=func.to_tsvector(SEARCH_CONFIG, bindparam("body"))
+            ),
+            [{"row_id": statement_id, "body": body} for statement_id, body in documents]
+        )
+        return
+
+    text_index = get_text_index()
+    if text_index.loaded:  # Otherwise the first search loads everything anyway
+        for statement_id, body in documents:
+            text_index.add(statement_id, body)
+
+
+def search_statements(
+    db: Session,
+    card_last_four: Optional[str] = None,
+    issuer: Optional[str] = None,
+    min_amount: Optional[Decimal] = None,
+    max_amount: Optional[Decimal] = None,
+    due_from: Optional[date] = None,
+    due_to: Optional[date] = None,
+    created_from: Optional[date] = None,
+    created_to: Optional[date] = None,
+    text: Optional[str] = None,
+    limit: int = 50
+) -> List:
+    """
+    Statements matching every given filter, newest first
+
+    Args:
+        text: Words that must all occur in the statement text
+
+    Returns:
+        Rows with SEARCH_COLUMNS
+    """
+    query = db.query(*SEARCH_COLUMNS)
+    if card_last_four is not None:
+        query = query.filter(ParsedStatement.card_last_four == card_last_four)
+    if issuer is not None:
+        query = query.filter(ParsedStatement.issuer == issuer)
+    if min_amount is not None:
+        query = query.filter(ParsedStatement.amount_due >= min_amount)
+    if max_amount is not None:
+        query = query.filter(ParsedStatement.amount_due <= max_amount)
+    if due_from is not None:
+        query = query.filter(ParsedStatement.due_on >= due_from)
+    if due_to is not None:
+        query = query.filter(ParsedStatement.due_on <= due_to)
+    if created_from is not None:
+        query = query.filter(ParsedStatement.created_at >= datetime.combine(created_from, datetime.min.time()))
+    if created_to is not None:
+        query = query.filter(ParsedStatement.created_at < datetime.combine(created_to + timedelta(days=1), datetime.min.time()))
+
+    if text is not None:
+        tokens = tokenize(text)
+        if not tokens:
+            return []
+        if uses_database_fts(db):
+            query = query.join(StatementSearch, StatementSearch.statement_id == ParsedStatement.id).filter(
+                StatementSearch.document.op("@@")(func.plainto_tsquery(SEARCH_CONFIG, text))
+            )
+        else:
+            text_index = get_text_index()
+            text_index.refresh(db)
+            ids = text_index.search(tokens)
+            if not ids:
+                return []
+            query = query.filter(ParsedStatement.id.in_(ids))
+
+    return query.order_by(ParsedStatement.created_at.desc()).limit(limit).all()
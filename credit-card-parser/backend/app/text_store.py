@@ -0,0 +1,66 @@
+"""
+Compressed storage of full statement text and per-page extraction output
+"""
+import hashlib
+import json
+from typing import Any, Dict, List, Optional
+
+from app.models import StatementText
+from app.utils.compression import compress_text, decompress_text
+from app.utils.serialization import dumps
+
+
+def build_statement_text(
+    statement_id: str,
+    text: str,
+    pages: Optional[List[Dict[str, Any]]] = None,
+    fields: Optional[Any] = None
+) -> StatementText:
+    """
+    Build the StatementText row for a parsed statement
+    
+    Args:
+        statement_id: ParsedStatement id
+        text: Full text that was passed to the extractors
+        pages: Optional {page, source, text} records, source "text" or "ocr"
+        fields: Optional extracted fields (StatementResult) as returned to the client
+    """
+    codec, text_blob = compress_text(text)
+    pages_blob = None
+    if pages:
+        # compress_text picks the same codec for both blobs, so one codec column suffices
+        _, pages_blob = compress_text(json.dumps(pages))
+    
+    return StatementText(
+        statement_id=statement_id,
+        content_hash=hashlib.sha256(text.encode("utf-8")).hexdigest(),
+        codec=codec,
+        text_blob=text_blob,
+        pages_blob=pages_blob,
+        fields_json=fields_json(fields) if fields is not None else None,
+        text_length=len(text)
+    )
+
+
+def load_text(record: StatementText) -> str:
+    """Decompress the full text of a stored statement"""
+    return decompress_text(record.codec, record.text_blob)
+
+
+def load_pages(record: StatementText) -> List[Dict[str, Any]]:
+    """Decompress the per-page records of a stored statement"""
+    if record.pages_blob is None:
+        return []
+    return json.loads(decompress_text(record.codec, record.pages_blob))
+
+
+def fields_json(fields: Any) -> str:
+    """JSON of extracted fields, as the upload response serializes them"""
+    return dumps(fields).decode("utf-8")
+
+
+def load_fields(record: StatementText) -> Optional[Dict[str, Any]]:
+    """Extracted fields stored with a statement, or None for rows stored before they were kept"""
+    if record.fields_json is None:
+        return None
+    return json.loads(record.fields_json)
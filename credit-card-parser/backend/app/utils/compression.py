@@ -0,0 +1,43 @@
+"""
+Text compression for stored statement text
+Uses zstandard when installed, zlib otherwise
+"""
+import zlib
+from typing import Tuple
+
+try:
+    import zstandard
+except ImportError:  # Optional dependency
+    zstandard = None
+
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 10
+
+
+def compress_text(text: str) -> Tuple[str, bytes]:
+    """
+    Compress text with the best available codec
+    
+    Returns:
+        (codec name, compressed bytes) - the codec must be stored with the data
+    """
+    data = text.encode("utf-8")
+    if zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return "zlib", zlib.compress(data, ZLIB_LEVEL)
+
+
+def decompress_text(codec: str, blob: bytes) -> str:
+    """
+    Decompress text written by compress_text
+    
+    Raises:
+        ValueError: Unknown codec, or zstd data without zstandard installed
+    """
+    if codec == "zlib":
+        return zlib.decompress(blob).decode("utf-8")
+    if codec == "zstd":
+        if zstandard is None:
+            raise ValueError("zstd-compressed text requires the zstandard package")
+        return zstandard.ZstdDecompressor().decompress(blob).decode("utf-8")
+    raise ValueError(f"Unknown compression codec: {codec}")
@@ -6,7 +6,6 @@ import sys
 from pathlib import Path
 
 LOG_DIR = Path("logs")
-LOG_DIR.mkdir(exist_ok=True)
 
 
 def setup_logger(name: str) -> logging.Logger:
@@ -30,6 +29,7 @@ def setup_logger(name: str) -> logging.Logger:
     console_handler.setFormatter(console_format)
     
     # File handler
+    LOG_DIR.mkdir(exist_ok=True)
     file_handler = logging.FileHandler(LOG_DIR / f"{name}.log")
     file_handler.setLevel(logging.DEBUG)
     file_format = logging.Formatter(
@@ -0,0 +1,28 @@
+"""
+Fast JSON serialization for API responses
+orjson handles dataclasses (including slotted ones), enums and dates
+natively; Decimal is written as a string
+"""
+from decimal import Decimal
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, Decimal):
+        return str(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """Serialize content to JSON bytes"""
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson, without revalidating the content"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
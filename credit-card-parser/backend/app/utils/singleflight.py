@@ -0,0 +1,51 @@
+"""
+Single-flight execution of async work
+Concurrent callers with the same key share one in-flight call and its result
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls by key
+
+    Only calls that overlap in time are merged; once the leading call
+    finishes, the next caller with that key starts a new one. Must be
+    used from a single event loop.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def run(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """Await func(), or the call already in flight for key"""
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            # shield: a follower that disconnects must not cancel the shared call
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        self.calls += 1
+        try:
+            result = await func()
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # Retrieved here; followers still receive it
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._inflight[key]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "in_flight": len(self._inflight),
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+        }
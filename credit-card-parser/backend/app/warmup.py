@@ -0,0 +1,126 @@
+"""
+Explicit warm-up phase, separate from import
+Importing app.main stays cheap; the heavy work (parser modules, PDF text
+backend selection, OCR stack, Tesseract check, database pool) happens
+here, after startup, and /ready reports when it is done
+"""
+import importlib
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+import logging
+
+from sqlalchemy import text
+
+from app.config import settings
+from app.database import engine, replica_engine, Base
+from app.retention import ensure_partitions
+
+logger = logging.getLogger(__name__)
+
+# Modules whose import compiles the extraction regexes
+PATTERN_MODULES = ("app.parser.extractors", "app.parser.issuer_detector")
+# Heavy OCR dependencies, imported up front when OCR is enabled
+OCR_MODULES = ("numpy", "PIL.Image", "pdf2image", "app.parser.ocr_handler")
+
+_state: Dict[str, Any] = {"ready": False, "checks": {}}
+_state_lock = threading.Lock()
+
+
+def prepare_storage(upload_dir: Path):
+    """Create local directories, (optionally) database tables and upcoming partitions"""
+    upload_dir.mkdir(exist_ok=True)
+    if settings.DB_CREATE_ALL:
+        Base.metadata.create_all(bind=engine)
+    # Monthly partitions for the coming months (PostgreSQL only)
+    with engine.begin() as connection:
+        ensure_partitions(connection)
+
+
+def warm_up() -> Dict[str, Any]:
+    """
+    Load everything the first request would otherwise pay for
+
+    Readiness requires the database; OCR problems are reported but only
+    disable scanned-PDF support, so they do not block readiness.
+
+    Returns:
+        Readiness state with per-check results
+    """
+    started = time.perf_counter()
+    checks = {
+        "patterns": _check(_compile_patterns),
+        "pdf_text": _check(_select_text_backend),
+        "database": _check(_open_database_pool),
+    }
+    if replica_engine is not None:
+        checks["replica"] = _check(_open_replica_pool)
+    if settings.OCR_ENABLED:
+        checks["ocr_modules"] = _check(_import_ocr_modules)
+        checks["tesseract"] = _check(_tesseract_version)
+
+    ready = checks["database"]["ok"]
+    with _state_lock:
+        _state.update(ready=ready, checks=checks, warmup_seconds=round(time.perf_counter() - started, 3))
+
+    logger.info(f"Warm-up finished in {_state['warmup_seconds']}s, ready={ready}")
+    return readiness()
+
+
+def readiness() -> Dict[str, Any]:
+    """Current readiness state (not ready until warm_up has succeeded)"""
+    with _state_lock:
+        return dict(_state)
+
+
+def _check(func) -> Dict[str, Any]:
+    started = time.perf_counter()
+    try:
+        detail = func()
+        ok = True
+    except Exception as e:
+        logger.warning(f"Warm-up check {func.__name__} failed: {e}")
+        detail, ok = str(e), False
+    return {"ok": ok, "detail": detail, "seconds": round(time.perf_counter() - started, 3)}
+
+
+def _compile_patterns() -> int:
+    """Import the parser modules (compiling every pattern); returns the pattern count"""
+    compiled = 0
+    for name in PATTERN_MODULES:
+        module = importlib.import_module(name)
+        for value in vars(module).values():
+            patterns = value if isinstance(value, list) else [value]
+            compiled += sum(1 for p in patterns if hasattr(p, "pattern") and hasattr(p, "search"))
+    return compiled
+
+
+def _select_text_backend() -> List[str]:
+    """Build the PDF text backend chain (benchmarking them in "auto" mode); returns its order"""
+    from app.parser.text_backends import get_text_backends
+    return get_text_backends().stats()["order"]
+
+
+def _open_database_pool() -> str:
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+    return engine.dialect.name
+
+
+def _open_replica_pool() -> str:
+    """Reads fall back to the primary while the replica is down, so this does not block readiness"""
+    with replica_engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+    return replica_engine.dialect.name
+
+
+def _import_ocr_modules() -> int:
+    for name in OCR_MODULES:
+        importlib.import_module(name)
+    return len(OCR_MODULES)
+
+
+def _tesseract_version() -> str:
+    from app.parser.ocr_backends import load_pytesseract
+    return str(load_pytesseract().get_tesseract_version())
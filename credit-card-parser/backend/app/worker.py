@@ -0,0 +1,218 @@
+"""
+Parse worker: pulls queued uploads from parse_jobs and parses them
+Scaled separately from the API nodes (which only enqueue when
+JOB_QUEUE_ENABLED is set); any number of workers can share one database
+
+Run with: python -m app.worker [--concurrency 2] [--once]
+"""
+import argparse
+import os
+import signal
+import socket
+import threading
+import time
+from typing import Optional
+import logging
+
+from fastapi import HTTPException
+
+from app.admission import Saturated
+from app.config import settings
+from app.database import SessionLocal
+from app.jobs import DONE, claim_job, complete_job, fail_job, reap_expired_leases, renew_lease
+from app.main import UPLOAD_DIR, process_upload, stored_upload_response
+from app.memory import get_memory_guard
+from app.models import ParseJob, ParsedStatement
+from app.parser.ocr_backends import shutdown_ocr_pool
+from app.parser.segmentation import shutdown_segment_parser
+from app.utils.logger import setup_logger
+from app.warmup import prepare_storage, warm_up
+from app.write_behind import close_writer
+
+logger = logging.getLogger(__name__)
+
+# Leases are renewed this many times per lease period
+RENEWALS_PER_LEASE = 3
+
+
+class LeaseKeeper:
+    """Renews a job's lease from a background thread while the job runs"""
+
+    def __init__(self, job_id: str, worker_id: str, interval: float):
+        self.job_id = job_id
+        self.worker_id = worker_id
+        self.interval = interval
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"lease-{job_id[:8]}", daemon=True)
+
+    def __enter__(self) -> "LeaseKeeper":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            db = SessionLocal()
+            try:
+                if not renew_lease(db, self.job_id, self.worker_id):
+                    logger.warning(f"Lost the lease on job {self.job_id}")
+                    self.lost = True
+                    return
+            except Exception as e:
+                logger.warning(f"Could not renew lease on job {self.job_id}: {e}")
+            finally:
+                db.close()
+
+
+def run_job(job: ParseJob, worker_id: str) -> Optional[str]:
+    """
+    Parse a claimed job and record the outcome
+
+    Returns:
+        Final job status (done, queued for retry, failed), or None if the
+        lease was lost to another worker meanwhile
+    """
+    retryable = True
+    try:
+        with LeaseKeeper(job.id, worker_id, settings.JOB_LEASE_SECONDS / RENEWALS_PER_LEASE):
+            # An earlier attempt may have stored the statement and died before completing the job
+            result = stored_upload_response(ParsedStatement.id == job.id)
+            if result is None:
+                result = process_upload(job.filename, job.content, job.file_hash, job.idempotency_key, session_id=job.id)
+    except Exception as e:
+        if isinstance(e, HTTPException):
+            # 4xx: the PDF itself is unusable, retrying will not help
+            retryable = e.status_code >= 500
+            error = str(e.detail)
+        else:
+            error = f"{type(e).__name__}: {e}"
+        if not isinstance(e, (HTTPException, Saturated)):
+            logger.error(f"Job {job.id} failed (attempt {job.attempts})", exc_info=True)
+
+        db = SessionLocal()
+        try:
+            status = fail_job(db, job.id, worker_id, error, retryable=retryable)
+        finally:
+            db.close()
+        logger.info(f"Job {job.id}: {error} -> {status}")
+        return status
+
+    db = SessionLocal()
+    try:
+        if not complete_job(db, job.id, worker_id, result):
+            logger.warning(f"Job {job.id} finished after its lease was lost; result already stored")
+            return None
+    finally:
+        db.close()
+    logger.info(f"Job {job.id} done ({job.filename})")
+    return DONE
+
+
+def work_once(worker_id: str) -> Optional[str]:
+    """
+    Claim and run one job
+
+    Returns:
+        The job's final status, or None when no job was available
+    """
+    db = SessionLocal()
+    try:
+        job = claim_job(db, worker_id)
+        if job is None:
+            return None
+        job.content  # Load the deferred PDF bytes before the session closes
+        db.expunge(job)
+    finally:
+        db.close()
+
+    logger.info(f"Claimed job {job.id} ({job.filename}, attempt {job.attempts})")
+    return run_job(job, worker_id)
+
+
+def reap(last_reap: float) -> float:
+    """Requeue expired leases at most every quarter lease period; returns the reap time"""
+    now = time.monotonic()
+    if now - last_reap < settings.JOB_LEASE_SECONDS / 4:
+        return last_reap
+
+    db = SessionLocal()
+    try:
+        reap_expired_leases(db)
+    except Exception as e:
+        logger.warning(f"Could not reap expired leases: {e}")
+    finally:
+        db.close()
+    return now
+
+
+def worker_loop(worker_id: str, stop: threading.Event, once: bool = False):
+    """Claim jobs until stop is set (or, with once, until the queue is empty)"""
+    last_reap = float("-inf")
+    memory_guard = get_memory_guard()
+    while not stop.is_set():
+        if memory_guard.draining:
+            return  # Recycling: claim nothing more; the guard stops the process when parses end
+        last_reap = reap(last_reap)
+        try:
+            status = work_once(worker_id)
+        except Exception as e:
+            logger.error(f"Worker {worker_id}: {e}", exc_info=True)
+            status = None
+        if status is None:
+            if once:
+                return
+            stop.wait(settings.JOB_POLL_INTERVAL_SECONDS)
+
+
+def run_worker(concurrency: int = 1, once: bool = False, stop: Optional[threading.Event] = None):
+    """
+    Run concurrency worker threads until stopped
+
+    The running job of each thread is finished before it exits; jobs of
+    a killed worker are picked up again when their lease expires. A
+    worker past WORKER_MAX_JOBS or WORKER_MAX_RSS_MB stops claiming and
+    exits once its jobs are done (restart it with a process manager and
+    set PROCESS_SUPERVISED).
+    """
+    stop = stop or threading.Event()
+    base_id = f"{socket.gethostname()}:{os.getpid()}"
+    threads = [
+        threading.Thread(target=worker_loop, args=(f"{base_id}:{i}", stop, once), name=f"parse-worker-{i}")
+        for i in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parse queued uploads")
+    parser.add_argument("--concurrency", type=int, default=1, help="Jobs parsed at once by this process")
+    parser.add_argument("--once", action="store_true", help="Exit when the queue is empty")
+    args = parser.parse_args()
+
+    setup_logger(__name__)
+    prepare_storage(UPLOAD_DIR)
+    warm_up()
+
+    stop = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stop.set())
+
+    logger.info(f"Parse worker started (concurrency {args.concurrency})")
+    try:
+        run_worker(args.concurrency, once=args.once, stop=stop)
+    finally:
+        close_writer()
+        shutdown_ocr_pool()
+        shutdown_segment_parser()
+    logger.info("Parse worker stopped")
+
+
+if __name__ == "__main__":
+    main()
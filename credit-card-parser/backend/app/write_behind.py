@@ -0,0 +1,254 @@
+"""
+Storing parse results: synchronous (strict) or group-committed
+In write-behind mode a background thread collects statements from all
+concurrent uploads and inserts them with one executemany and one commit
+per batch; each caller is acknowledged only after its batch committed.
+The statements of one upload always commit, or fail, together
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+
+from sqlalchemy import insert
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models import ParsedStatement, StatementText
+from app.search import index_texts
+from app.text_store import load_text
+
+logger = logging.getLogger(__name__)
+
+# Queue sentinel that stops the flush thread
+_STOP = object()
+
+
+class PendingWrite:
+    """
+    The statements of one upload (statement rows, text rows and plain
+    texts) waiting for a group commit; they are committed as a unit
+    """
+    __slots__ = ("statements", "texts", "bodies", "future")
+
+    def __init__(self, records: List[Tuple[ParsedStatement, StatementText]]):
+        self.statements = [_column_values(statement) for statement, _ in records]
+        self.texts = [_column_values(text) for _, text in records]
+        self.bodies = [load_text(text) for _, text in records]
+        self.future: Future = Future()
+
+    def __len__(self) -> int:
+        return len(self.statements)
+
+
+class WriteBehindWriter:
+    """
+    Batches statement inserts from many threads into group commits
+
+    A batch is flushed when it reaches batch_size rows or flush_interval
+    seconds after its first row arrived. At most max_pending uploads
+    wait; further writers block until there is room. An upload whose
+    future is cancelled before its batch is flushed is never written.
+    """
+
+    def __init__(self, batch_size: int = 100, flush_interval: float = 0.01, max_pending: int = 1000):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_pending)
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+        self.batches = 0
+        self.rows = 0
+        self.largest_batch = 0
+        self.failed_rows = 0
+        self.flush_seconds = 0.0
+
+    def submit(self, statement: ParsedStatement, text: StatementText) -> Future:
+        """Queue a statement; the future resolves once it is committed"""
+        return self.submit_all([(statement, text)])
+
+    def submit_all(self, records: List[Tuple[ParsedStatement, StatementText]]) -> Future:
+        """Queue the statements of one upload; the future resolves once all are committed"""
+        pending = PendingWrite(records)
+        self._queue.put(pending)
+        return pending.future
+
+    def write(self, statement: ParsedStatement, text: StatementText, timeout: Optional[float] = None):
+        """Queue a statement and wait until it is committed (raises its insert error)"""
+        self.submit(statement, text).result(timeout)
+
+    def close(self):
+        """Flush everything queued and stop the flush thread"""
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+
+            batch, rows = [item], len(item)
+            deadline = time.monotonic() + self.flush_interval
+            while rows < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+                rows += len(item)
+
+            # Uploads whose writer gave up waiting are dropped, not written late
+            batch = [pending for pending in batch if pending.future.set_running_or_notify_cancel()]
+            if batch:
+                self._flush(batch)
+
+    def _flush(self, batch: List[PendingWrite]):
+        started = time.perf_counter()
+        rows = sum(len(pending) for pending in batch)
+        db = SessionLocal()
+        try:
+            try:
+                self._insert(db, batch)
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                if len(batch) == 1:
+                    raise
+                # One bad upload must not fail the others: retry them one by one
+                logger.warning(f"Batch insert of {len(batch)} uploads failed ({e}), retrying singly")
+                for pending in batch:
+                    self._flush_one(db, pending)
+                return
+
+            for pending in batch:
+                pending.future.set_result(None)
+            self.batches += 1
+            self.rows += rows
+            self.largest_batch = max(self.largest_batch, rows)
+        except Exception as e:
+            self.failed_rows += rows
+            batch[0].future.set_exception(e)
+        finally:
+            self.flush_seconds += time.perf_counter() - started
+            db.close()
+
+    def _flush_one(self, db, pending: PendingWrite):
+        try:
+            self._insert(db, [pending])
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            self.failed_rows += len(pending)
+            pending.future.set_exception(e)
+        else:
+            self.batches += 1
+            self.rows += len(pending)
+            pending.future.set_result(None)
+
+    @staticmethod
+    def _insert(db, batch: List[PendingWrite]):
+        # executemany; psycopg2 sends these as multi-row VALUES pages
+        db.execute(insert(ParsedStatement), [row for pending in batch for row in pending.statements])
+        db.execute(insert(StatementText), [row for pending in batch for row in pending.texts])
+        index_texts(db, [
+            (statement["id"], body)
+            for pending in batch
+            for statement, body in zip(pending.statements, pending.bodies)
+        ])
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending": self._queue.qsize(),
+            "batches": self.batches,
+            "rows": self.rows,
+            "avg_batch": round(self.rows / self.batches, 2) if self.batches else 0.0,
+            "largest_batch": self.largest_batch,
+            "failed_rows": self.failed_rows,
+            "flush_seconds": round(self.flush_seconds, 3),
+        }
+
+
+def _column_values(record) -> Dict[str, Any]:
+    """All column values of an ORM object (Python-side defaults applied), for executemany"""
+    values = {}
+    for column in record.__table__.columns:
+        value = getattr(record, column.key)
+        if value is None and column.default is not None and column.default.is_callable:
+            value = column.default.arg(None)
+        values[column.key] = value
+    return values
+
+
+_writer: Optional[WriteBehindWriter] = None
+_writer_lock = threading.Lock()
+
+
+def get_writer() -> Optional[WriteBehindWriter]:
+    """Process-wide write-behind writer, or None in strict mode"""
+    global _writer
+    if not settings.WRITE_BEHIND_ENABLED:
+        return None
+    with _writer_lock:
+        if _writer is None:
+            _writer = WriteBehindWriter(
+                settings.WRITE_BEHIND_BATCH_SIZE,
+                settings.WRITE_BEHIND_FLUSH_MS / 1000,
+                settings.WRITE_BEHIND_MAX_PENDING
+            )
+        return _writer
+
+
+def close_writer():
+    """Flush and stop the writer (application shutdown)"""
+    global _writer
+    with _writer_lock:
+        if _writer is not None:
+            _writer.close()
+            _writer = None
+
+
+def store_statement(statement: ParsedStatement, text: StatementText):
+    """
+    Persist a parsed statement and its text; returns once committed
+
+    Strict mode inserts both, and the search document, in a transaction
+    of their own. Either way the objects stay usable afterwards without
+    reloading them.
+    """
+    store_statements([(statement, text)])
+
+
+def store_statements(records: List[Tuple[ParsedStatement, StatementText]]):
+    """
+    Persist the statements of one upload in one transaction; returns once
+    all are committed, and on an error none of them is stored
+    """
+    writer = get_writer()
+    if writer is not None:
+        future = writer.submit_all(records)
+        try:
+            future.result(settings.WRITE_BEHIND_TIMEOUT_SECONDS)
+        except FutureTimeout:
+            if future.cancel():
+                raise  # Still queued: dropped, never committed after the error
+            future.result()  # Already being flushed: report how it ended
+        return
+
+    # expire_on_commit=False: the values we just wrote need no SELECT to read back
+    db = SessionLocal(expire_on_commit=False)
+    try:
+        for statement, text in records:
+            db.add(statement)
+            db.add(text)
+        db.flush()
+        index_texts(db, [(statement.id, load_text(text)) for statement, text in records])
+        db.commit()
+    finally:
+        db.close()
@@ -0,0 +1,64 @@
+"""
+Benchmark cold start: importing app.main, then the warm-up phase
+Each run uses a fresh interpreter, so nothing is cached between runs.
+Reports how long the import takes, which heavy modules it pulled in,
+and how long warm_up() takes afterwards.
+
+Uses a throwaway SQLite database. Run from the backend directory:
+    python -m benchmarks.bench_cold_start [--repeat 5]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+HEAVY_MODULES = ("numpy", "PIL", "PyPDF2", "pytesseract", "pdf2image", "cv2")
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter() - started
+heavy = [m for m in {heavy!r} if m in sys.modules]
+from app.warmup import prepare_storage, warm_up
+prepare_storage(app.main.UPLOAD_DIR)
+started = time.perf_counter()
+state = warm_up()
+print(json.dumps({{
+    "import": imported,
+    "warm_up": time.perf_counter() - started,
+    "heavy": heavy,
+    "ready": state["ready"],
+}}))
+"""
+
+
+def probe() -> dict:
+    workdir = tempfile.mkdtemp()
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{workdir}/bench_cold_start.db")
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE.format(heavy=HEAVY_MODULES)],
+        env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def run(repeat: int):
+    runs = [probe() for _ in range(repeat)]
+    imports = [r["import"] * 1000 for r in runs]
+    warm_ups = [r["warm_up"] * 1000 for r in runs]
+    print(f"Cold start over {repeat} fresh interpreters")
+    print(f"  import app.main: {statistics.median(imports):8.1f} ms median (min {min(imports):.1f})")
+    print(f"  warm_up():       {statistics.median(warm_ups):8.1f} ms median (min {min(warm_ups):.1f})")
+    print(f"  heavy modules loaded by import: {runs[0]['heavy'] or 'none'}")
+    print(f"  ready after warm-up: {runs[0]['ready']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    run(args.repeat)
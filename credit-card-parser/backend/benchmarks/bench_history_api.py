@@ -0,0 +1,131 @@
+"""
+Benchmark /history serialization and payload size
+Compares the original handler (ORM rows -> hand-built dicts -> FastAPI's
+jsonable_encoder + json) with the current one (column rows -> orjson),
+and measures bytes on the wire with and without gzip.
+
+Uses a throwaway SQLite database. Run from the backend directory:
+    python -m benchmarks.bench_history_api [--rows 1000] [--repeat 50]
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+# Must be set before the app (and its engine) is imported
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/bench_history.db"
+
+import httpx
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.database import Base, SessionLocal, engine
+from app.main import app
+from app.models import ParsedStatement
+from app.utils.serialization import FastJSONResponse
+
+ISSUERS = ["HDFC Bank", "SBI Card", "ICICI Bank", "Axis Bank", "Kotak Mahindra"]
+
+
+def seed(rows: int):
+    Base.metadata.create_all(bind=engine)
+    started = datetime(2025, 1, 1)
+    db = SessionLocal()
+    try:
+        db.add_all([
+            ParsedStatement(
+                id=str(uuid.uuid4()),
+                filename=f"statement_{i:05d}.pdf",
+                issuer=ISSUERS[i % len(ISSUERS)],
+                card_last_four=f"{1000 + i % 9000}",
+                billing_cycle="01/01/2025 to 31/01/2025",
+                due_date="20/02/2025",
+                total_amount_due=f"₹{1000 + i}.00",
+                confidence_score=0.9,
+                raw_text="Statement text " * 60,
+                created_at=started + timedelta(minutes=i)
+            )
+            for i in range(rows)
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+
+def legacy_body(limit: int) -> bytes:
+    """/history as it was: full ORM objects, hand-built dicts, standard encoder"""
+    db = SessionLocal()
+    try:
+        statements = db.query(ParsedStatement).order_by(
+            ParsedStatement.created_at.desc()
+        ).limit(limit).all()
+        content = [
+            {
+                "id": s.id,
+                "filename": s.filename,
+                "issuer": s.issuer,
+                "confidence_score": s.confidence_score,
+                "created_at": s.created_at.isoformat()
+            }
+            for s in statements
+        ]
+        return JSONResponse(jsonable_encoder(content)).body
+    finally:
+        db.close()
+
+
+def current_body(limit: int) -> bytes:
+    """/history now: selected columns serialized by orjson"""
+    db = SessionLocal()
+    try:
+        rows = db.query(
+            ParsedStatement.id,
+            ParsedStatement.filename,
+            ParsedStatement.issuer,
+            ParsedStatement.confidence_score,
+            ParsedStatement.created_at
+        ).order_by(ParsedStatement.created_at.desc()).limit(limit).all()
+        return FastJSONResponse([row._asdict() for row in rows]).body
+    finally:
+        db.close()
+
+
+def time_it(func, limit: int, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func(limit)
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+async def wire_sizes(limit: int, repeat: int):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for encoding in ("identity", "gzip"):
+            started = time.perf_counter()
+            for _ in range(repeat):
+                response = await client.get(
+                    "/history", params={"limit": limit}, headers={"Accept-Encoding": encoding}
+                )
+            elapsed = (time.perf_counter() - started) / repeat * 1000
+            wire_bytes = int(response.headers["content-length"])
+            print(f"  GET /history ({encoding:>8}): {elapsed:7.2f} ms/request  {wire_bytes:9d} bytes on the wire")
+
+
+def run(rows: int, repeat: int):
+    seed(rows)
+    print(f"/history with {rows} rows per page")
+    for name, func in (("legacy", legacy_body), ("current", current_body)):
+        body = func(rows)
+        print(f"  {name:>8} handler: {time_it(func, rows, repeat):7.2f} ms/page  {len(body):9d} bytes")
+    asyncio.run(wire_sizes(rows, repeat))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    run(args.rows, args.repeat)
@@ -0,0 +1,85 @@
+"""
+Benchmark the PDF text backends
+For every installed backend (PyPDF2, pypdfium2, pdfminer.six) reports
+throughput in extracted characters per second and peak memory. Each
+backend runs in a fresh interpreter so peak RSS is not shared between them.
+
+Reads a generated multi-page statement, or your own PDF. Run from the
+backend directory:
+    python -m benchmarks.bench_pdf_text [--pages 50] [--pdf statement.pdf] [--repeat 5]
+"""
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from app.parser.sample_pdf import statement_pdf
+from app.parser.text_backends import BACKENDS
+
+PROBE = """
+import json, resource, time, tracemalloc
+from app.parser.text_backends import BACKENDS
+try:
+    backend = BACKENDS[{name!r}]()
+except ImportError as e:
+    print(json.dumps({{"missing": str(e)}}))
+    raise SystemExit
+baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+backend.read_pages({path!r})  # Warm up (imports, font caches)
+best = float("inf")
+for _ in range({repeat}):
+    started = time.perf_counter()
+    pages = backend.read_pages({path!r})
+    best = min(best, time.perf_counter() - started)
+tracemalloc.start()
+backend.read_pages({path!r})
+python_peak = tracemalloc.get_traced_memory()[1]
+tracemalloc.stop()
+print(json.dumps({{
+    "seconds": best,
+    "pages": len(pages),
+    "chars": sum(len(p["text"]) for p in pages),
+    "rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline,
+    "python_peak": python_peak,
+}}))
+"""
+
+
+def probe(name: str, path: str, repeat: int) -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE.format(name=name, path=path, repeat=repeat)],
+        capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def run(path: str, repeat: int):
+    print(f"PDF text backends on {Path(path).name} (best of {repeat})")
+    for name in BACKENDS:
+        result = probe(name, path, repeat)
+        if "missing" in result:
+            print(f"  {name:>10}: not installed ({result['missing']})")
+            continue
+        chars_per_sec = result["chars"] / result["seconds"] if result["seconds"] else 0
+        print(
+            f"  {name:>10}: {result['seconds'] * 1000:8.1f} ms  {chars_per_sec / 1e6:6.2f} M chars/s  "
+            f"{result['pages']:4d} pages  peak RSS +{result['rss_kb'] / 1024:6.1f} MB  "
+            f"Python heap peak {result['python_peak'] / 1e6:6.1f} MB"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--pdf", help="Benchmark this PDF instead of a generated statement")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    if args.pdf:
+        run(args.pdf, args.repeat)
+    else:
+        with tempfile.TemporaryDirectory() as workdir:
+            sample = Path(workdir) / f"statement_{args.pages}p.pdf"
+            sample.write_bytes(statement_pdf(args.pages))
+            run(str(sample), args.repeat)
@@ -0,0 +1,66 @@
+"""
+Benchmark the overhead of upload profiling
+Parses a generated statement (PDF text extraction, issuer detection,
+field extraction) plain, through run_profiled with profiling disabled,
+under the stack sampler and under cProfile.
+
+Run from the backend directory:
+    python -m benchmarks.bench_profiling [--pages 20] [--repeat 20]
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from app.config import settings
+from app.parser.sample_pdf import statement_pdf
+from app.parser.text_backends import build_chain
+from app.pipeline import page_ends, parse_text
+from app.profiling import CPROFILE, SAMPLE, choose_profile_mode, get_profile_buffer, run_profiled
+
+
+def parse(chain, path: str):
+    layers = chain.read_pages(path)
+    pages = [{"text": layer["text"]} for layer in layers]
+    return parse_text("\n".join(page["text"] for page in pages), page_ends(pages))
+
+
+def time_it(func, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def run(pages: int, repeat: int):
+    path = Path(tempfile.mkdtemp()) / "statement.pdf"
+    path.write_bytes(statement_pdf(pages))
+    chain = build_chain("pypdf2")
+    parse(chain, str(path))  # Warm up imports and regex caches
+
+    settings.PROFILING_ENABLED = True
+    settings.PROFILE_SAMPLE_RATE = 0.0
+    cases = {
+        "plain": lambda: parse(chain, str(path)),
+        "disabled": lambda: run_profiled(choose_profile_mode(None), "bench", parse, chain, str(path)),
+        "sample": lambda: run_profiled(SAMPLE, "bench", parse, chain, str(path)),
+        "cprofile": lambda: run_profiled(CPROFILE, "bench", parse, chain, str(path)),
+    }
+
+    print(f"Parse of a {pages}-page statement (best of {repeat})")
+    baseline = None
+    for name, func in cases.items():
+        elapsed = time_it(func, repeat)
+        baseline = baseline or elapsed
+        print(f"  {name:>9}: {elapsed:8.2f} ms  ({(elapsed / baseline - 1) * 100:+6.1f}%)")
+    print(f"  profiles recorded: {get_profile_buffer().recorded}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    run(args.pages, args.repeat)
@@ -0,0 +1,140 @@
+"""
+Benchmark statement search
+Times card/issuer/amount filters (b-tree indexes) and text queries
+(in-process inverted index) against a full scan that decompresses every
+stored text, and prints the SQLite query plan of the filters.
+
+Uses a throwaway SQLite database. Run from the backend directory:
+    python -m benchmarks.bench_search [--rows 20000] [--repeat 20]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+# Must be set before the app (and its engine) is imported
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/bench_search.db"
+
+from sqlalchemy import text
+
+from app.database import Base, SessionLocal, engine
+from app.models import ParsedStatement, StatementText
+from app.search import get_text_index, search_statements, tokenize
+from app.text_store import build_statement_text, load_text
+
+ISSUERS = ["HDFC Bank", "SBI Card", "ICICI Bank", "Axis Bank", "Kotak Mahindra"]
+MERCHANTS = ["Swiggy", "Zomato", "Amazon", "Flipkart", "Uber", "IRCTC", "BigBasket", "Myntra", "Croma", "Nykaa"]
+
+
+def seed(rows: int, batch: int = 1000):
+    Base.metadata.create_all(bind=engine)
+    rng = random.Random(7)
+    started = datetime(2025, 1, 1)
+    db = SessionLocal()
+    try:
+        for first in range(0, rows, batch):
+            for i in range(first, min(first + batch, rows)):
+                statement_id = str(uuid.uuid4())
+                card = f"{1000 + i % 500}"
+                merchants = " ".join(
+                    f"{rng.choice(MERCHANTS)} {rng.randint(100, 9999)}.00" for _ in range(30)
+                )
+                db.add(ParsedStatement(
+                    id=statement_id,
+                    filename=f"statement_{i:06d}.pdf",
+                    issuer=ISSUERS[i % len(ISSUERS)],
+                    card_last_four=card,
+                    due_on=date(2025, 1, 20) + timedelta(days=i % 365),
+                    amount_due=Decimal(rng.randint(500, 200000)),
+                    confidence_score=0.9,
+                    created_at=started + timedelta(minutes=i)
+                ))
+                db.add(build_statement_text(
+                    statement_id,
+                    f"{ISSUERS[i % len(ISSUERS)]} Credit Card Statement\nCard Number: XXXX XXXX XXXX {card}\n{merchants}"
+                ))
+            db.commit()
+    finally:
+        db.close()
+
+
+def scan_text(query: str, limit: int):
+    """Text search without an index: decompress and check every stored text"""
+    tokens = set(tokenize(query))
+    db = SessionLocal()
+    try:
+        matches = [
+            record.statement_id for record in db.query(StatementText).all()
+            if tokens <= set(tokenize(load_text(record)))
+        ]
+        return db.query(ParsedStatement.id).filter(ParsedStatement.id.in_(matches)).order_by(
+            ParsedStatement.created_at.desc()
+        ).limit(limit).all()
+    finally:
+        db.close()
+
+
+def indexed(limit: int, **filters):
+    db = SessionLocal()
+    try:
+        return search_statements(db, limit=limit, **filters)
+    finally:
+        db.close()
+
+
+def time_it(func, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def query_plan(sql: str):
+    with engine.connect() as connection:
+        for row in connection.execute(text(f"EXPLAIN QUERY PLAN {sql}")):
+            print(f"    {row[-1]}")
+
+
+def run(rows: int, repeat: int):
+    seed(rows)
+    print(f"Search over {rows} statements")
+
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        get_text_index().refresh(db)
+    finally:
+        db.close()
+    print(f"  in-process text index built in {(time.perf_counter() - started) * 1000:.0f} ms: {get_text_index().stats()}")
+
+    cases = {
+        "card": {"card_last_four": "1042"},
+        "issuer + amount": {"issuer": "SBI Card", "min_amount": Decimal(150000)},
+        "due range": {"due_from": date(2025, 3, 1), "due_to": date(2025, 3, 7)},
+        "text": {"text": "swiggy 4242.00"},
+        "text + card": {"text": "swiggy", "card_last_four": "1042"},
+    }
+    for name, filters in cases.items():
+        found = indexed(50, **filters)
+        elapsed = time_it(lambda: indexed(50, **filters), repeat)
+        print(f"  {name:>16}: {elapsed:8.2f} ms/query  {len(found):3d} rows")
+
+    scan_repeat = max(1, repeat // 10)
+    print(f"  {'text (full scan)':>16}: {time_it(lambda: scan_text('swiggy 4242.00', 50), scan_repeat):8.2f} ms/query")
+
+    print("  plan for card_last_four = ... ORDER BY created_at DESC:")
+    query_plan("SELECT id FROM parsed_statements WHERE card_last_four = '1042' ORDER BY created_at DESC LIMIT 50")
+    print("  plan for issuer = ... AND amount_due >= ...:")
+    query_plan("SELECT id FROM parsed_statements WHERE issuer = 'SBI Card' AND amount_due >= 150000 ORDER BY created_at DESC LIMIT 50")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    run(args.rows, args.repeat)
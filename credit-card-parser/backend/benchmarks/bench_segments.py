@@ -0,0 +1,80 @@
+"""
+Benchmark parsing of multi-statement PDFs
+Segments a generated archive of back-to-back monthly statements and
+parses the segments serially and in the SegmentParser process pool, for
+a range of statement counts, to pick SEGMENT_PARALLEL_MIN.
+
+Run from the backend directory:
+    python -m benchmarks.bench_segments [--statements 2 4 8 16] [--workers 2] [--repeat 10]
+"""
+import argparse
+import time
+
+from app.config import settings
+from app.parser.segmentation import SegmentParser, segment_pages
+from app.pipeline import page_ends
+
+TRANSACTIONS_PER_STATEMENT = 40
+
+
+def archive_pages(statements: int):
+    pages = []
+    for index in range(statements):
+        month, year = index % 12 + 1, 2020 + index // 12
+        lines = [
+            "HDFC Bank Credit Card Statement",
+            "Card Number: XXXX XXXX XXXX 5678",
+            f"Statement Period: 01/{month:02d}/{year} to 28/{month:02d}/{year}",
+            f"Payment Due Date: 18/{month:02d}/{year + 1}",
+            f"Total Amount Due: Rs. {index + 1},234.56",
+            "Minimum Amount Due: Rs. 500.00",
+        ]
+        lines += [f"{day % 28 + 1:02d}/{month:02d}/{year} MERCHANT {day} BANGALORE {day * 37}.00"
+                  for day in range(TRANSACTIONS_PER_STATEMENT)]
+        pages.append({"page": index + 1, "source": "text", "text": "\n".join(lines)})
+    return pages
+
+
+def parse_all(parser: SegmentParser, pages):
+    segments = [
+        ("\n".join(page["text"] for page in segment), page_ends(segment))
+        for segment in segment_pages(pages)
+    ]
+    return parser.parse(segments)
+
+
+def time_it(func, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def run(counts, workers: int, repeat: int):
+    # Time extraction, not memo hits; set before the workers fork
+    settings.PARSE_MEMO_SIZE = 0
+    settings.PATTERN_STATS_ENABLED = False
+    serial = SegmentParser(workers=0)
+    parallel = SegmentParser(workers=workers, parallel_min=1)  # Not capped at available CPUs
+    try:
+        parse_all(parallel, archive_pages(2))  # Start the worker processes
+        print(f"Segment parsing, serial vs {workers} worker processes (best of {repeat})")
+        for count in counts:
+            pages = archive_pages(count)
+            serial_ms = time_it(lambda: parse_all(serial, pages), repeat)
+            parallel_ms = time_it(lambda: parse_all(parallel, pages), repeat)
+            print(f"  {count:3d} statements: serial {serial_ms:8.2f} ms  "
+                  f"parallel {parallel_ms:8.2f} ms  ({serial_ms / parallel_ms:4.2f}x)")
+    finally:
+        parallel.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--statements", type=int, nargs="+", default=[2, 4, 8, 16])
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+    run(args.statements, args.workers, args.repeat)
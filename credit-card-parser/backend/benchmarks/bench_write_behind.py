@@ -0,0 +1,84 @@
+"""
+Benchmark storing parse results: strict mode vs group commit
+Concurrent threads each store statements (ParsedStatement plus its
+compressed text) the way /upload does, once with one transaction per
+statement and once through the write-behind writer.
+
+Uses a throwaway SQLite database unless DATABASE_URL is set. Run from the
+backend directory:
+    python -m benchmarks.bench_write_behind [--statements 2000] [--threads 16]
+"""
+import argparse
+import os
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+# Must be set before the app (and its engine) is imported
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench_write_behind.db")
+
+from app.database import Base, engine
+from app.models import ParsedStatement
+from app.text_store import build_statement_text
+from app.write_behind import WriteBehindWriter, store_statement
+
+TEXT = "HDFC Bank Credit Card Statement\nTotal Amount Due: Rs. 12,345.67\n" + "Transaction line 100.00\n" * 80
+
+
+def make_rows():
+    statement_id = str(uuid.uuid4())
+    statement = ParsedStatement(
+        id=statement_id,
+        filename="bench.pdf",
+        issuer="HDFC Bank",
+        card_last_four="1234",
+        confidence_score=0.9,
+        raw_text=TEXT[:1000],
+        created_at=datetime.utcnow()
+    )
+    return statement, build_statement_text(statement_id, TEXT)
+
+
+def run_mode(name: str, store, statements: int, threads: int):
+    rows = [make_rows() for _ in range(statements)]
+    started = time.perf_counter()
+    latencies = []
+
+    def timed(pair):
+        begun = time.perf_counter()
+        store(*pair)
+        latencies.append(time.perf_counter() - begun)
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(timed, rows))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[int(len(latencies) * 0.99)] * 1000
+    print(f"  {name:>12}: {statements / elapsed:8.0f} statements/s  p50 {p50:6.1f} ms  p99 {p99:6.1f} ms")
+
+
+def run(statements: int, threads: int, batch_size: int, flush_ms: float):
+    Base.metadata.create_all(bind=engine)
+    print(f"{statements} statements from {threads} threads ({engine.dialect.name})")
+    run_mode("strict", store_statement, statements, threads)
+
+    writer = WriteBehindWriter(batch_size, flush_ms / 1000)
+    try:
+        run_mode("write-behind", writer.write, statements, threads)
+    finally:
+        writer.close()
+    stats = writer.stats()
+    print(f"  {'':>12}  {stats['batches']} batches, {stats['avg_batch']} rows on average")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--statements", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--flush-ms", type=float, default=10)
+    args = parser.parse_args()
+    run(args.statements, args.threads, args.batch_size, args.flush_ms)
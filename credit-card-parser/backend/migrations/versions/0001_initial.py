@@ -0,0 +1,41 @@
+"""
+Initial parsed_statements table
+
+Databases created by Base.metadata.create_all() before migrations existed
+already have this table, so it is only created when missing.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if sa.inspect(op.get_bind()).has_table("parsed_statements"):
+        return
+
+    op.create_table(
+        "parsed_statements",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("filename", sa.String(), nullable=False),
+        sa.Column("issuer", sa.String(), nullable=False),
+        sa.Column("card_last_four", sa.String(), nullable=True),
+        sa.Column("billing_cycle", sa.String(), nullable=True),
+        sa.Column("due_date", sa.String(), nullable=True),
+        sa.Column("total_amount_due", sa.String(), nullable=True),
+        sa.Column("confidence_score", sa.Float(), nullable=False),
+        sa.Column("raw_text", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_parsed_statements_id", "parsed_statements", ["id"])
+
+
+def downgrade():
+    op.drop_table("parsed_statements")
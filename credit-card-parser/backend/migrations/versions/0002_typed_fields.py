@@ -0,0 +1,155 @@
+"""
+Typed billing cycle, due date and amount columns
+
+Adds date/Numeric copies of the display strings, indexes them and
+backfills existing rows. The parsing is a copy of app.parser.normalizers
+as it was when this revision was written, so later changes to the
+application do not change what this revision does.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+import re
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH_SIZE = 1000
+
+# Day-first numeric dates, as on the Indian-issued statements
+DATE_FORMATS = ["%d-%m-%Y", "%d-%m-%y", "%d-%b-%Y", "%d-%b-%y", "%d-%B-%Y", "%d-%B-%y"]
+AMOUNT_PATTERN = re.compile(r"\d[\d,]*(?:\.\d+)?")
+
+TYPED_COLUMNS = [
+    sa.Column("cycle_start", sa.Date(), nullable=True),
+    sa.Column("cycle_end", sa.Date(), nullable=True),
+    sa.Column("due_on", sa.Date(), nullable=True),
+    sa.Column("amount_due", sa.Numeric(14, 2), nullable=True),
+]
+
+INDEXES = {
+    "ix_parsed_statements_cycle_end": ["cycle_end"],
+    "ix_parsed_statements_amount_due": ["amount_due"],
+    "ix_parsed_statements_due_on_amount_due": ["due_on", "amount_due"],
+}
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    existing_columns = {c["name"] for c in inspector.get_columns("parsed_statements")}
+    existing_indexes = {i["name"] for i in inspector.get_indexes("parsed_statements")}
+
+    for column in TYPED_COLUMNS:
+        if column.name not in existing_columns:
+            op.add_column("parsed_statements", column)
+
+    for name, columns in INDEXES.items():
+        if name not in existing_indexes:
+            op.create_index(name, "parsed_statements", columns)
+
+    _backfill()
+
+
+def _backfill():
+    """Parse the display strings of rows written before this migration"""
+    bind = op.get_bind()
+    statements = sa.table(
+        "parsed_statements",
+        sa.column("id", sa.String),
+        sa.column("billing_cycle", sa.String),
+        sa.column("due_date", sa.String),
+        sa.column("total_amount_due", sa.String),
+        sa.column("cycle_start", sa.Date),
+        sa.column("cycle_end", sa.Date),
+        sa.column("due_on", sa.Date),
+        sa.column("amount_due", sa.Numeric(14, 2)),
+    )
+
+    update = (
+        statements.update()
+        .where(statements.c.id == sa.bindparam("row_id"))
+        .values(
+            cycle_start=sa.bindparam("cycle_start"),
+            cycle_end=sa.bindparam("cycle_end"),
+            due_on=sa.bindparam("due_on"),
+            amount_due=sa.bindparam("amount_due"),
+        )
+    )
+
+    last_id = ""
+    while True:
+        rows = bind.execute(
+            sa.select(
+                statements.c.id,
+                statements.c.billing_cycle,
+                statements.c.due_date,
+                statements.c.total_amount_due,
+            )
+            .where(statements.c.id > last_id)
+            .order_by(statements.c.id)
+            .limit(BACKFILL_BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+
+        params = []
+        for row in rows:
+            cycle_start, cycle_end = _parse_billing_cycle(row.billing_cycle)
+            params.append({
+                "row_id": row.id,
+                "cycle_start": cycle_start,
+                "cycle_end": cycle_end,
+                "due_on": _parse_date(row.due_date),
+                "amount_due": _parse_amount(row.total_amount_due),
+            })
+        bind.execute(update, params)
+        last_id = rows[-1].id
+
+
+def _parse_date(value):
+    """"15/02/2024", "27-08-2025", "03-Aug-25", "22 Sep 2025" -> date, else None"""
+    if not value:
+        return None
+    normalized = re.sub(r"[\s/\-]+", "-", value.strip())
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(normalized, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def _parse_amount(value):
+    """"₹1234.00" or "Rs. 5,000" -> Decimal with 2 places, else None"""
+    match = AMOUNT_PATTERN.search(value) if value else None
+    if not match:
+        return None
+    try:
+        return Decimal(match.group(0).replace(",", "")).quantize(Decimal("0.01"))
+    except InvalidOperation:
+        return None
+
+
+def _parse_billing_cycle(value):
+    """"26-Jul-2025 to 25-Aug-2025" -> (start, end) dates"""
+    if not value:
+        return None, None
+    parts = re.split(r"\s+to\s+", value.strip(), maxsplit=1, flags=re.IGNORECASE)
+    if len(parts) != 2:
+        return None, None
+    return _parse_date(parts[0]), _parse_date(parts[1])
+
+
+def downgrade():
+    for name in INDEXES:
+        op.drop_index(name, table_name="parsed_statements")
+    for column in reversed(TYPED_COLUMNS):
+        op.drop_column("parsed_statements", column.name)
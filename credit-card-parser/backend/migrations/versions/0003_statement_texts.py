@@ -0,0 +1,35 @@
+"""
+Compressed full statement text for re-extraction
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if sa.inspect(op.get_bind()).has_table("statement_texts"):
+        return
+
+    op.create_table(
+        "statement_texts",
+        sa.Column("statement_id", sa.String(), primary_key=True),
+        sa.Column("content_hash", sa.String(64), nullable=False),
+        sa.Column("codec", sa.String(16), nullable=False),
+        sa.Column("text_blob", sa.LargeBinary(), nullable=False),
+        sa.Column("pages_blob", sa.LargeBinary(), nullable=True),
+        sa.Column("text_length", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_statement_texts_content_hash", "statement_texts", ["content_hash"])
+
+
+def downgrade():
+    op.drop_table("statement_texts")
@@ -0,0 +1,45 @@
+"""
+File hash and idempotency key on parsed statements
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+COLUMNS = [
+    sa.Column("file_hash", sa.String(64), nullable=True),
+    sa.Column("idempotency_key", sa.String(128), nullable=True),
+]
+
+INDEXES = {
+    "ix_parsed_statements_file_hash": ["file_hash"],
+    "ix_parsed_statements_idempotency_key": ["idempotency_key"],
+}
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    existing_columns = {c["name"] for c in inspector.get_columns("parsed_statements")}
+    existing_indexes = {i["name"] for i in inspector.get_indexes("parsed_statements")}
+
+    for column in COLUMNS:
+        if column.name not in existing_columns:
+            op.add_column("parsed_statements", column)
+
+    for name, columns in INDEXES.items():
+        if name not in existing_indexes:
+            op.create_index(name, "parsed_statements", columns)
+
+
+def downgrade():
+    for name in INDEXES:
+        op.drop_index(name, table_name="parsed_statements")
+    for column in reversed(COLUMNS):
+        op.drop_column("parsed_statements", column.name)
@@ -0,0 +1,53 @@
+"""
+Job queue for parsing uploads on separate worker nodes
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+INDEXES = {
+    "ix_parse_jobs_file_hash": ["file_hash"],
+    "ix_parse_jobs_idempotency_key": ["idempotency_key"],
+    "ix_parse_jobs_status_available_at": ["status", "available_at"],
+    "ix_parse_jobs_status_lease_expires_at": ["status", "lease_expires_at"],
+}
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table("parse_jobs"):
+        op.create_table(
+            "parse_jobs",
+            sa.Column("id", sa.String(), primary_key=True),
+            sa.Column("filename", sa.String(), nullable=False),
+            sa.Column("file_hash", sa.String(64), nullable=False),
+            sa.Column("idempotency_key", sa.String(128), nullable=True),
+            sa.Column("content", sa.LargeBinary(), nullable=True),
+            sa.Column("status", sa.String(16), nullable=False),
+            sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("available_at", sa.DateTime(), nullable=False),
+            sa.Column("lease_owner", sa.String(128), nullable=True),
+            sa.Column("lease_expires_at", sa.DateTime(), nullable=True),
+            sa.Column("last_error", sa.Text(), nullable=True),
+            sa.Column("result", sa.Text(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+            sa.Column("started_at", sa.DateTime(), nullable=True),
+            sa.Column("finished_at", sa.DateTime(), nullable=True),
+        )
+
+    existing_indexes = {i["name"] for i in sa.inspect(op.get_bind()).get_indexes("parse_jobs")}
+    for name, columns in INDEXES.items():
+        if name not in existing_indexes:
+            op.create_index(name, "parse_jobs", columns)
+
+
+def downgrade():
+    op.drop_table("parse_jobs")
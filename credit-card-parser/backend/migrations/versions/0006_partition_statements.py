@@ -0,0 +1,103 @@
+"""
+Monthly range partitions of parsed_statements by created_at
+
+PostgreSQL only: the table is rebuilt as a partitioned table with
+primary key (id, created_at), one partition per month from the oldest
+row to PREMAKE_MONTHS ahead and a default partition. Later months are
+created by the application (app/retention.py). Other databases keep the
+plain table and only get the created_at index.
+
+The DDL is spelled out here rather than imported from app.retention, so
+later changes to the application do not change what this revision does.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+LEGACY_TABLE = "parsed_statements_unpartitioned"
+DEFAULT_PARTITION = "parsed_statements_default"
+# Monthly partitions created past the current month
+PREMAKE_MONTHS = 3
+
+INDEXES = {
+    "ix_parsed_statements_id": ["id"],
+    "ix_parsed_statements_cycle_end": ["cycle_end"],
+    "ix_parsed_statements_amount_due": ["amount_due"],
+    "ix_parsed_statements_due_on_amount_due": ["due_on", "amount_due"],
+    "ix_parsed_statements_file_hash": ["file_hash"],
+    "ix_parsed_statements_idempotency_key": ["idempotency_key"],
+    "ix_parsed_statements_created_at": ["created_at"],
+}
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == "postgresql" and not _is_partitioned(bind):
+        _partition(bind)
+
+    existing_indexes = {i["name"] for i in sa.inspect(bind).get_indexes("parsed_statements")}
+    for name, columns in INDEXES.items():
+        if name not in existing_indexes:
+            op.create_index(name, "parsed_statements", columns)
+
+
+def _is_partitioned(bind) -> bool:
+    return bind.execute(sa.text(
+        "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+        "WHERE c.relname = 'parsed_statements' AND pg_table_is_visible(c.oid)"
+    )).first() is not None
+
+
+def _add_months(month: datetime, count: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + count
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def _create_partitions(since: datetime):
+    """Default partition plus one per month from since to PREMAKE_MONTHS ahead (table still empty)"""
+    op.execute(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF parsed_statements DEFAULT")
+    now = datetime.utcnow()
+    month = datetime(since.year, since.month, 1)
+    last = _add_months(datetime(now.year, now.month, 1), PREMAKE_MONTHS)
+    while month <= last:
+        upper = _add_months(month, 1)
+        op.execute(
+            f"CREATE TABLE parsed_statements_y{month.year}m{month.month:02d} PARTITION OF parsed_statements "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{upper.isoformat()}')"
+        )
+        month = upper
+
+
+def _partition(bind):
+    """Copy the rows into a partitioned table of the same shape"""
+    op.execute("UPDATE parsed_statements SET created_at = now() WHERE created_at IS NULL")
+    op.rename_table("parsed_statements", LEGACY_TABLE)
+    op.execute(
+        f"CREATE TABLE parsed_statements (LIKE {LEGACY_TABLE} INCLUDING DEFAULTS) "
+        f"PARTITION BY RANGE (created_at)"
+    )
+    op.execute("ALTER TABLE parsed_statements ALTER COLUMN created_at SET NOT NULL")
+
+    oldest = bind.execute(sa.text(f"SELECT min(created_at) FROM {LEGACY_TABLE}")).scalar()
+    _create_partitions(min(oldest, datetime.utcnow()) if oldest is not None else datetime.utcnow())
+
+    op.execute(f"INSERT INTO parsed_statements SELECT * FROM {LEGACY_TABLE}")
+    # Drops the old primary key and indexes too, freeing their names
+    op.drop_table(LEGACY_TABLE)
+    op.execute("ALTER TABLE parsed_statements ADD PRIMARY KEY (id, created_at)")
+
+
+def downgrade():
+    # The partitioned table is schema-compatible with 0005; only the index goes.
+    # Partitions are kept (rebuild the table by hand to undo them).
+    op.drop_index("ix_parsed_statements_created_at", table_name="parsed_statements")
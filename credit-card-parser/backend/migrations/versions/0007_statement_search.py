@@ -0,0 +1,109 @@
+"""
+Statement search: card/issuer indexes and full-text documents
+
+Adds (card_last_four, created_at) and (issuer, created_at) indexes and
+the statement_search table. On PostgreSQL the table holds a GIN-indexed
+tsvector per statement, backfilled from statement_texts; other databases
+search in-process and leave it empty. Decoding stored text is copied from
+app.utils.compression, so later codec changes in the application do not
+change what this revision does.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+"""
+import zlib
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH_SIZE = 500
+# Text search configuration of the documents (app.search.SEARCH_CONFIG when written)
+SEARCH_CONFIG = "simple"
+
+INDEXES = {
+    "ix_parsed_statements_card_last_four_created_at": ["card_last_four", "created_at"],
+    "ix_parsed_statements_issuer_created_at": ["issuer", "created_at"],
+}
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    existing_indexes = {i["name"] for i in inspector.get_indexes("parsed_statements")}
+    postgres = bind.dialect.name == "postgresql"
+
+    for name, columns in INDEXES.items():
+        if name not in existing_indexes:
+            op.create_index(name, "parsed_statements", columns)
+
+    if not inspector.has_table("statement_search"):
+        op.create_table(
+            "statement_search",
+            sa.Column("statement_id", sa.String(), primary_key=True),
+            sa.Column("document", postgresql.TSVECTOR() if postgres else sa.Text(), nullable=False),
+        )
+        if postgres:
+            op.create_index("ix_statement_search_document", "statement_search", ["document"], postgresql_using="gin")
+
+    if postgres:
+        _backfill(bind)
+
+
+def _backfill(bind):
+    """Build search documents for statements stored before this migration"""
+    texts = sa.table(
+        "statement_texts",
+        sa.column("statement_id", sa.String),
+        sa.column("codec", sa.String),
+        sa.column("text_blob", sa.LargeBinary),
+    )
+    search = sa.table(
+        "statement_search",
+        sa.column("statement_id", sa.String),
+        sa.column("document", postgresql.TSVECTOR),
+    )
+    insert = search.insert().values(
+        statement_id=sa.bindparam("row_id"),
+        document=sa.func.to_tsvector(SEARCH_CONFIG, sa.bindparam("body"))
+    )
+    indexed = sa.select(search.c.statement_id).where(search.c.statement_id == texts.c.statement_id)
+
+    last_id = ""
+    while True:
+        rows = bind.execute(
+            sa.select(texts.c.statement_id, texts.c.codec, texts.c.text_blob)
+            .where(texts.c.statement_id > last_id, ~indexed.exists())
+            .order_by(texts.c.statement_id)
+            .limit(BACKFILL_BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+
+        bind.execute(insert, [
+            {"row_id": row.statement_id, "body": _decompress_text(row.codec, row.text_blob)}
+            for row in rows
+        ])
+        last_id = rows[-1].statement_id
+
+
+def _decompress_text(codec, blob):
+    """Text of a statement_texts blob, compressed with zlib or zstd"""
+    if codec == "zlib":
+        return zlib.decompress(blob).decode("utf-8")
+    if codec == "zstd":
+        import zstandard  # Only installed where zstd text was written
+        return zstandard.ZstdDecompressor().decompress(blob).decode("utf-8")
+    raise ValueError(f"Unknown compression codec: {codec}")
+
+
+def downgrade():
+    op.drop_table("statement_search")
+    for name in INDEXES:
+        op.drop_index(name, table_name="parsed_statements")
@@ -0,0 +1,49 @@
+"""
+Upload id and page range on parsed statements
+
+A PDF holding several statements is stored as one row per statement;
+upload_id groups them and first_page/last_page locate each in the file.
+Existing rows are single-statement uploads and stay NULL.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+COLUMNS = [
+    sa.Column("upload_id", sa.String(), nullable=True),
+    sa.Column("first_page", sa.Integer(), nullable=True),
+    sa.Column("last_page", sa.Integer(), nullable=True),
+]
+
+INDEXES = {
+    "ix_parsed_statements_upload_id": ["upload_id"],
+}
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    existing_columns = {c["name"] for c in inspector.get_columns("parsed_statements")}
+    existing_indexes = {i["name"] for i in inspector.get_indexes("parsed_statements")}
+
+    for column in COLUMNS:
+        if column.name not in existing_columns:
+            op.add_column("parsed_statements", column)
+
+    for name, columns in INDEXES.items():
+        if name not in existing_indexes:
+            op.create_index(name, "parsed_statements", columns)
+
+
+def downgrade():
+    for name in INDEXES:
+        op.drop_index(name, table_name="parsed_statements")
+    for column in reversed(COLUMNS):
+        op.drop_column("parsed_statements", column.name)
@@ -0,0 +1,28 @@
+"""
+Extracted fields stored with the statement text
+
+Idempotent replays return the fields the upload returned instead of
+re-extracting them. Existing rows stay NULL and are re-extracted on replay.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    existing_columns = {c["name"] for c in inspector.get_columns("statement_texts")}
+    if "fields_json" not in existing_columns:
+        op.add_column("statement_texts", sa.Column("fields_json", sa.Text(), nullable=True))
+
+
+def downgrade():
+    op.drop_column("statement_texts", "fields_json")
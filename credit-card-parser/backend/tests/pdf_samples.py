@@ -0,0 +1,6 @@
+"""
+Minimal PDF builder for tests - no PDF library needed
+"""
+from app.parser.sample_pdf import make_pdf
+
+__all__ = ["make_pdf"]
@@ -4,10 +4,59 @@ API endpoint tests
 import pytest
 from fastapi.testclient import TestClient
 from app.main import app
+from app.database import SessionLocal
+from app.models import ParsedStatement, ParseJob
+from app.config import settings
+from app.worker import work_once
+from app.write_behind import close_writer, get_writer
+from app.database import Base, read_router
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.result_cache import get_result_cache
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+import uuid
+import httpx
+import app.main as main_module
+from tests.pdf_samples import make_pdf
+import threading
+from app import admission
+from app.admission import AdmissionGate, Saturated, get_parse_gate, ocr_admission
+from app.parser import pattern_stats
+from app.parser.pattern_stats import PatternStats
+from app.parser.extractors import CARD_PATTERNS
+from app.profiling import get_profile_buffer
+from app import memory
+from app.memory import MemoryGuard
+import pstats
+
+STATEMENT_PDF = make_pdf([[
+    "HDFC Bank Credit Card Statement",
+    "Card Number: XXXX XXXX XXXX 5678",
+    "Statement Period: 01/01/2024 to 31/01/2024",
+    "Payment Due Date: 20/02/2024",
+    "Total Amount Due: 25,450.00",
+]])
 
 client = TestClient(app)
 
 
+@pytest.fixture(scope="module", autouse=True)
+def running_app():
+    """Run startup (storage, warm-up) and shutdown around the module's tests"""
+    stats = pattern_stats._stats
+    pattern_stats._stats = PatternStats()  # Nothing written to disk at shutdown
+    with client:
+        yield
+    pattern_stats._stats = stats
+
+
 def test_health_check():
     """Test root health check endpoint"""
     response = client.get("/")
@@ -16,6 +65,28 @@ def test_health_check():
     assert "service" in response.json()
 
 
+def test_ready_after_warm_up():
+    """Test readiness endpoint separate from liveness"""
+    for _ in range(100):
+        response = client.get("/ready")
+        if response.status_code == 200:
+            break
+        time.sleep(0.05)
+    assert response.status_code == 200
+    checks = response.json()["checks"]
+    assert checks["database"]["ok"]
+    assert checks["patterns"]["detail"] > 50
+    assert "tesseract" in checks  # Reported even when the binary is missing
+
+
+def test_import_has_no_side_effects(tmp_path):
+    """Test importing the app creates no logs/ or uploads/ directory"""
+    backend = Path(main_module.__file__).resolve().parents[1]
+    env = {**os.environ, "PYTHONPATH": str(backend)}
+    subprocess.run([sys.executable, "-c", "import app.main"], cwd=tmp_path, env=env, check=True)
+    assert list(tmp_path.iterdir()) == []
+
+
 def test_upload_without_file():
     """Test upload endpoint without file"""
     response = client.post("/upload")
@@ -36,8 +107,489 @@ def test_get_nonexistent_result():
     assert response.status_code == 404
 
 
+def test_results_etag_and_cache():
+    """Test conditional GET and in-memory result cache"""
+    statement_id = str(uuid.uuid4())
+    db = SessionLocal()
+    try:
+        db.add(ParsedStatement(
+            id=statement_id,
+            filename="cached.pdf",
+            issuer="HDFC Bank",
+            confidence_score=0.9,
+            created_at=datetime(2025, 1, 1)
+        ))
+        db.commit()
+    finally:
+        db.close()
+    
+    response = client.get(f"/results/{statement_id}")
+    assert response.status_code == 200
+    assert response.json()["filename"] == "cached.pdf"
+    assert response.headers["cache-control"] == "private, no-cache"
+    etag = response.headers["etag"]
+    
+    hits = get_result_cache().stats()["hits"]
+    response = client.get(f"/results/{statement_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    assert get_result_cache().stats()["hits"] == hits + 1
+
+
+def test_upload_idempotency_key_replays_result():
+    """Test that a repeated Idempotency-Key returns the first result"""
+    key = str(uuid.uuid4())
+    files = {"file": ("statement.pdf", STATEMENT_PDF, "application/pdf")}
+    first = client.post("/upload", files=files, headers={"Idempotency-Key": key})
+    assert first.status_code == 200
+    assert first.json()["extracted_fields"]["card_last_four"]["value"] == "5678"
+    
+    second = client.post("/upload", files=files, headers={"Idempotency-Key": key})
+    assert second.status_code == 200
+    assert second.json()["id"] == first.json()["id"]
+    assert second.json()["extracted_fields"] == first.json()["extracted_fields"]
+    
+    # Without the key a finished upload is processed again
+    third = client.post("/upload", files=files)
+    assert third.json()["id"] != first.json()["id"]
+
+
+def test_replay_returns_stored_fields(monkeypatch):
+    """Test that a replay returns the stored fields instead of parsing again"""
+    key = str(uuid.uuid4())
+    files = {"file": ("statement.pdf", STATEMENT_PDF, "application/pdf")}
+    first = client.post("/upload", files=files, headers={"Idempotency-Key": key}).json()
+    
+    def no_parse(*args):
+        raise AssertionError("replay must not re-extract")
+    
+    monkeypatch.setattr(main_module, "parse_text", no_parse)
+    second = client.post("/upload", files=files, headers={"Idempotency-Key": key}).json()
+    assert second == first
+
+
+def test_concurrent_uploads_with_different_keys_are_stored_apart(monkeypatch):
+    """Test single-flight does not merge uploads carrying different Idempotency-Keys"""
+    calls = []
+    
+    def slow_process(filename, content, file_hash, idempotency_key=None):
+        calls.append(idempotency_key)
+        time.sleep(0.2)
+        return {"id": idempotency_key, "status": "success"}
+    
+    monkeypatch.setattr(main_module, "process_upload", slow_process)
+    keys = [str(uuid.uuid4()) for _ in range(2)]
+    
+    async def burst():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            files = {"file": ("statement.pdf", STATEMENT_PDF, "application/pdf")}
+            return await asyncio.gather(*[
+                http.post("/upload", files=files, headers={"Idempotency-Key": key}) for key in keys + keys[:1]
+            ])
+    
+    responses = asyncio.run(burst())
+    assert [r.json()["id"] for r in responses] == keys + keys[:1]
+    assert sorted(calls) == sorted(keys)
+
+
+def test_failed_upload_write_keeps_no_parse_slot(monkeypatch, tmp_path):
+    """Test a temp file that cannot be written does not leak a parse slot"""
+    monkeypatch.setattr(main_module, "UPLOAD_DIR", tmp_path / "missing")
+    active = get_parse_gate().stats()["active"]
+    
+    files = {"file": ("statement.pdf", STATEMENT_PDF, "application/pdf")}
+    assert client.post("/upload", files=files).status_code == 500
+    assert get_parse_gate().stats()["active"] == active
+
+
+def test_concurrent_identical_uploads_share_one_parse(monkeypatch):
+    """Test single-flight coalescing on file content"""
+    calls = []
+    
+    def slow_process(filename, content, file_hash, idempotency_key=None):
+        calls.append(file_hash)
+        time.sleep(0.2)
+        return {"id": "shared", "status": "success"}
+    
+    monkeypatch.setattr(main_module, "process_upload", slow_process)
+    
+    async def burst():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            files = {"file": ("statement.pdf", STATEMENT_PDF, "application/pdf")}
+            return await asyncio.gather(*[http.post("/upload", files=files) for _ in range(3)])
+    
+    responses = asyncio.run(burst())
+    assert [r.json()["id"] for r in responses] == ["shared"] * 3
+    assert len(calls) == 1
+
+
+def test_upload_with_write_behind(monkeypatch):
+    """Test that group-committed uploads are durable when acknowledged"""
+    monkeypatch.setattr(settings, "WRITE_BEHIND_ENABLED", True)
+    try:
+        files = {"file": ("statement.pdf", STATEMENT_PDF, "application/pdf")}
+        response = client.post("/upload", files=files)
+        assert response.status_code == 200
+        assert get_writer().stats()["rows"] == 1
+        assert client.get("/metrics").json()["write_behind"]["batches"] == 1
+    finally:
+        close_writer()
+    
+    db = SessionLocal()
+    try:
+        assert db.get(ParsedStatement, response.json()["id"]) is not None
+    finally:
+        db.close()
+
+
+def test_reads_use_replica_except_after_own_write(monkeypatch, tmp_path):
+    """Test read/write split with read-your-writes stickiness"""
+    replica_engine = create_engine(f"sqlite:///{tmp_path}/replica.db")
+    Base.metadata.create_all(bind=replica_engine)
+    monkeypatch.setattr(read_router, "replica", sessionmaker(bind=replica_engine))
+    
+    files = {"file": ("statement.pdf", STATEMENT_PDF, "application/pdf")}
+    writer_client = TestClient(app)
+    response = writer_client.post("/upload", files=files)
+    assert "read_primary" in response.cookies
+    session_id = response.json()["id"]
+    # The writer sees its upload at once, read from the primary
+    assert writer_client.get("/history").json()[0]["id"] == session_id
+    
+    # Other clients read the (empty, lagging) replica...
+    reader_client = TestClient(app)
+    assert reader_client.get("/history").json() == []
+    # ...except for a result the replica does not have yet
+    get_result_cache().clear()
+    assert reader_client.get(f"/results/{session_id}").status_code == 200
+    
+    stats = client.get("/metrics").json()["read_router"]
+    assert stats["replica"] >= 1 and stats["sticky"] >= 1 and stats["lag_retries"] >= 1
+
+
+def test_queued_upload_parsed_by_worker(monkeypatch):
+    """Test queue mode: upload returns 202, a worker parses, /jobs reports the result"""
+    monkeypatch.setattr(settings, "JOB_QUEUE_ENABLED", True)
+    key = str(uuid.uuid4())
+    files = {"file": ("queued.pdf", STATEMENT_PDF, "application/pdf")}
+    
+    response = client.post("/upload", files=files, headers={"Idempotency-Key": key})
+    assert response.status_code == 202
+    job_id = response.json()["id"]
+    assert response.headers["location"] == f"/jobs/{job_id}"
+    assert client.get(f"/jobs/{job_id}").json()["status"] == "queued"
+    
+    # Retried before a worker got to it: same job
+    retry = client.post("/upload", files=files, headers={"Idempotency-Key": key})
+    assert retry.status_code == 202 and retry.json()["id"] == job_id
+    
+    assert work_once("test-worker") == "done"
+    job = client.get(f"/jobs/{job_id}").json()
+    assert job["status"] == "done"
+    assert job["result"]["extracted_fields"]["card_last_four"]["value"] == "5678"
+    assert client.get(job["result_url"]).json()["card_last_four"] == "5678"
+    
+    # Once parsed, the key replays the stored result
+    replay = client.post("/upload", files=files, headers={"Idempotency-Key": key})
+    assert replay.status_code == 200 and replay.json()["id"] == job_id
+    
+    queue = client.get("/admin/jobs").json()
+    assert queue["enabled"] and queue["counts"]["done"] >= 1
+
+
+def test_worker_fails_unreadable_upload(monkeypatch):
+    """Test that a PDF without text fails without retries"""
+    monkeypatch.setattr(settings, "JOB_QUEUE_ENABLED", True)
+    monkeypatch.setattr(main_module, "extract_document_pages", lambda *args: [])
+    files = {"file": ("empty.pdf", make_pdf([[]]), "application/pdf")}
+    job_id = client.post("/upload", files=files).json()["id"]
+    
+    assert work_once("test-worker") == "failed"
+    job = client.get(f"/jobs/{job_id}").json()
+    assert job["attempts"] == 1 and "Could not extract text" in job["error"]
+
+
+def test_get_unknown_job():
+    assert client.get(f"/jobs/{uuid.uuid4()}").status_code == 404
+
+
+def test_admission_gate_rejects_when_saturated():
+    """Test bounded queue (429) and wait timeout (503)"""
+    gate = AdmissionGate("test", limit=1, max_queue=0, wait_timeout=0.05)
+    held = gate.acquire()
+    with pytest.raises(Saturated) as exc:
+        gate.acquire()
+    assert exc.value.status_code == 429
+    assert exc.value.retry_after >= 1
+    
+    gate.max_queue = 1
+    with pytest.raises(Saturated) as exc:
+        gate.acquire()
+    assert exc.value.status_code == 503
+    
+    held.release()
+    held.release()  # Idempotent
+    gate.acquire().release()
+    assert gate.stats()["rejected_queue_full"] == 1
+    assert gate.stats()["rejected_timeout"] == 1
+    assert gate.stats()["active"] == 0
+
+
+def test_admission_gate_admits_waiters_in_order():
+    """Test that queued callers proceed when a slot frees up"""
+    gate = AdmissionGate("test", limit=1, max_queue=2, wait_timeout=5)
+    held = gate.acquire()
+    admitted = []
+    
+    def waiter(name):
+        with gate.slot():
+            admitted.append(name)
+    
+    threads = []
+    for name in ("first", "second"):
+        thread = threading.Thread(target=waiter, args=(name,))
+        thread.start()
+        threads.append(thread)
+        while gate.stats()["queued"] < len(threads):
+            time.sleep(0.01)
+    
+    held.release()
+    for thread in threads:
+        thread.join()
+    assert admitted == ["first", "second"]
+
+
+def test_ocr_admission_frees_parse_slot(monkeypatch):
+    """Test that OCR work gives its parse slot back to digital uploads"""
+    parse_gate = AdmissionGate("parse", limit=1, max_queue=0, wait_timeout=1)
+    monkeypatch.setitem(admission._gates, "ocr", AdmissionGate("ocr", limit=1, max_queue=0, wait_timeout=1))
+    
+    parse_slot = parse_gate.acquire()
+    with ocr_admission(parse_slot):
+        # A digital upload can be admitted while the OCR job runs
+        parse_gate.acquire().release()
+        assert admission.get_ocr_gate().stats()["active"] == 1
+
+
+def test_upload_rejected_with_retry_after(monkeypatch):
+    """Test load shedding on the upload route"""
+    gate = AdmissionGate("parse", limit=1, max_queue=0, wait_timeout=1)
+    held = gate.acquire()
+    monkeypatch.setitem(admission._gates, "parse", gate)
+    try:
+        files = {"file": ("busy.pdf", STATEMENT_PDF, "application/pdf")}
+        response = client.post("/upload", files=files)
+        assert response.status_code == 429
+        assert int(response.headers["retry-after"]) >= 1
+    finally:
+        held.release()
+
+
 def test_get_history():
     """Test history endpoint"""
     response = client.get("/history")
     assert response.status_code == 200
-    assert isinstance(response.json(), list)
\ No newline at end of file
+    assert isinstance(response.json(), list)
+
+
+def test_history_page_limits():
+    """Test history page size bounds"""
+    assert client.get("/history", params={"limit": 1000, "offset": 10}).status_code == 200
+    assert client.get("/history", params={"limit": 1001}).status_code == 422
+
+
+def test_large_responses_are_gzipped():
+    """Test compression threshold"""
+    response = client.get("/openapi.json", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    
+    response = client.get("/", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+
+
+def test_get_due_statements():
+    """Test due statements range query endpoint"""
+    due_soon, overdue = str(uuid.uuid4()), str(uuid.uuid4())
+    db = SessionLocal()
+    try:
+        db.add(ParsedStatement(
+            id=due_soon, filename="due.pdf", issuer="HDFC Bank", confidence_score=0.9,
+            due_on=date.today() + timedelta(days=3), amount_due=Decimal("1500.00")
+        ))
+        db.add(ParsedStatement(
+            id=overdue, filename="overdue.pdf", issuer="HDFC Bank", confidence_score=0.9,
+            due_on=date.today() - timedelta(days=1), amount_due=Decimal("1500.00")
+        ))
+        db.commit()
+    finally:
+        db.close()
+    
+    def due_ids(**params):
+        response = client.get("/statements/due", params={"limit": 1000, **params})
+        assert response.status_code == 200
+        return {s["id"]: s for s in response.json()}
+    
+    statements = due_ids(within_days=7, min_amount=1000)
+    assert due_soon in statements and overdue not in statements
+    assert statements[due_soon]["total_amount_due"] == "1500.00"
+    assert statements[due_soon]["due_date"] == (date.today() + timedelta(days=3)).isoformat()
+    
+    assert due_soon not in due_ids(within_days=2)
+    assert due_soon not in due_ids(within_days=7, min_amount=2000)
+
+
+def test_search_statements():
+    """Test search by card and statement text"""
+    marker = f"merchant{uuid.uuid4().hex}"
+    pdf = make_pdf([[
+        "HDFC Bank Credit Card Statement",
+        "Card Number: XXXX XXXX XXXX 4321",
+        "Payment Due Date: 20/02/2024",
+        "Total Amount Due: 1,200.00",
+        marker,
+    ]])
+    upload = client.post("/upload", files={"file": ("search.pdf", pdf, "application/pdf")})
+    assert upload.status_code == 200
+    
+    response = client.get("/search", params={"q": marker.upper(), "card_last_four": "4321"})
+    assert response.status_code == 200
+    assert [row["id"] for row in response.json()] == [upload.json()["id"]]
+    assert response.json()[0]["amount_due"] == "1200.00"
+    
+    assert client.get("/search", params={"q": marker, "card_last_four": "9999"}).json() == []
+    assert client.get("/search").status_code == 400
+    assert client.get("/search", params={"card_last_four": "12"}).status_code == 422
+
+
+def test_search_runs_off_the_event_loop(monkeypatch):
+    """Test a search (and a text index load) does not block other requests"""
+    def search_statements(db, **filters):
+        with pytest.raises(RuntimeError):
+            asyncio.get_running_loop()
+        return []
+    
+    monkeypatch.setattr(main_module, "search_statements", search_statements)
+    assert client.get("/search", params={"q": "swiggy"}).json() == []
+
+
+def test_profiled_uploads(monkeypatch, tmp_path):
+    """Test X-Profile uploads land in the profile buffer and download"""
+    files = {"file": ("statement.pdf", STATEMENT_PDF, "application/pdf")}
+    before = get_profile_buffer().recorded
+    client.post("/upload", files=files, headers={"X-Profile": "cprofile"})
+    assert get_profile_buffer().recorded == before  # Ignored while disabled
+    
+    monkeypatch.setattr(settings, "PROFILING_ENABLED", True)
+    monkeypatch.setattr(settings, "PROFILE_SAMPLE_INTERVAL_MS", 0.5)
+    assert client.post("/upload", files=files, headers={"X-Profile": "cprofile"}).status_code == 200
+    assert client.post("/upload", files=files, headers={"X-Profile": "sample"}).status_code == 200
+    
+    sampled, profiled = client.get("/admin/profiles").json()["profiles"][:2]
+    assert (profiled["mode"], sampled["mode"]) == ("cprofile", "sample")
+    
+    download = client.get(profiled["url"])
+    assert download.headers["content-disposition"].endswith('.pstats"')
+    (tmp_path / "upload.pstats").write_bytes(download.content)
+    functions = {name for _, _, name in pstats.Stats(str(tmp_path / "upload.pstats")).stats}
+    assert "process_upload" in functions
+    assert "process_upload" in client.get(profiled["url"], params={"format": "text"}).text
+    
+    speedscope = client.get(sampled["url"]).json()
+    assert speedscope["profiles"][0]["type"] == "sampled"
+    assert len(speedscope["profiles"][0]["samples"]) == len(speedscope["profiles"][0]["weights"])
+    assert client.get("/admin/profiles/missing").status_code == 404
+
+
+def test_memory_guard_drains_before_recycling():
+    """Test the guard recycles only after the parses in flight finish"""
+    recycled = []
+    guard = MemoryGuard(max_jobs=2, on_recycle=lambda: recycled.append(guard.active))
+    with guard.job():
+        with guard.job():
+            pass
+        with guard.job():
+            pass
+        # Limit passed with one parse still running: drain, refuse new work
+        assert guard.draining and recycled == []
+        with pytest.raises(Saturated):
+            with guard.job():
+                pass
+    assert recycled == [0]
+
+
+@pytest.mark.parametrize("supervised, max_jobs", [(True, 100), (False, 0)])
+def test_memory_guard_needs_supervisor(monkeypatch, supervised, max_jobs):
+    """Test recycling limits are ignored when nothing would restart the process"""
+    monkeypatch.setattr(settings, "WORKER_MAX_JOBS", 100)
+    monkeypatch.setattr(settings, "PROCESS_SUPERVISED", supervised)
+    monkeypatch.setattr(memory, "_guard", None)
+    assert memory.get_memory_guard().max_jobs == max_jobs
+
+
+def test_recycling_process_refuses_uploads(monkeypatch):
+    """Test /ready and /upload while the process drains"""
+    guard = MemoryGuard(on_recycle=lambda: None)
+    guard.reason = "test"
+    monkeypatch.setattr(memory, "_guard", guard)
+    
+    assert client.get("/ready").status_code == 503
+    files = {"file": ("statement.pdf", STATEMENT_PDF, "application/pdf")}
+    response = client.post("/upload", files=files)
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == str(memory.RECYCLE_RETRY_AFTER)
+
+
+def test_upload_multi_statement_pdf(monkeypatch):
+    """Test one result (and row) per statement in a multi-statement PDF"""
+    monkeypatch.setattr(settings, "SEGMENTATION_ENABLED", True)
+    pdf = make_pdf([
+        [
+            "HDFC Bank Credit Card Statement",
+            f"Card Number: XXXX XXXX XXXX {card}",
+            f"Statement Period: 01/{month:02d}/2024 to 28/{month:02d}/2024",
+            f"Payment Due Date: 20/{month + 1:02d}/2024",
+            f"Total Amount Due: {month},500.00",
+        ]
+        for month, card in ((1, "1111"), (2, "1111"), (2, "2222"))
+    ])
+    key = str(uuid.uuid4())
+    files = {"file": ("archive.pdf", pdf, "application/pdf")}
+    response = client.post("/upload", files=files, headers={"Idempotency-Key": key})
+    assert response.status_code == 200
+    body = response.json()
+    statements = body["statements"]
+    assert [s["pages"] for s in statements] == [[1, 1], [2, 2], [3, 3]]
+    assert [s["extracted_fields"]["card_last_four"]["value"] for s in statements] == ["1111", "1111", "2222"]
+    assert statements[0]["id"] == body["id"] and statements[2]["id"] == f"{body['id']}-3"
+    assert client.get(f"/results/{statements[1]['id']}").json()["total_amount_due"] == "₹2500.00"
+    
+    replay = client.post("/upload", files=files, headers={"Idempotency-Key": key}).json()
+    assert [s["id"] for s in replay["statements"]] == [s["id"] for s in statements]
+
+
+def test_get_metrics():
+    """Test pipeline metrics endpoint"""
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert "ocr_cache" in response.json()
+    assert "parse_memo" in response.json()
+    assert response.json()["admission"]["parse"]["limit"] >= 1
+    stages = response.json()["memory"]["stages"]
+    assert stages["parse"]["high_water_mb"] > 0 and "text" in stages
+
+
+def test_get_pattern_wins(monkeypatch):
+    """Test pattern win counts admin view"""
+    stats = PatternStats()
+    monkeypatch.setattr(pattern_stats, "_stats", stats)
+    stats.record("card_last_four", "HDFC Bank", CARD_PATTERNS[2])
+    
+    response = client.get("/admin/pattern-wins")
+    assert response.status_code == 200
+    fields = response.json()["fields"]
+    assert set(fields) == {"card_last_four", "due_date", "total_amount_due"}
+    assert fields["card_last_four"]["patterns"][0] == CARD_PATTERNS[0].pattern
+    wins = fields["card_last_four"]["issuers"]["HDFC Bank"]
+    assert [entry["wins"] for entry in wins[:3]] == [0, 0, 1]
@@ -9,8 +9,55 @@ from app.parser.extractors import (
     extract_billing_cycle,
     extract_due_date,
     extract_total_amount_due,
-    extract_fields
+    extract_fields,
+    extraction_windows,
+    FIELD_EXTRACTORS,
+    CARD_PATTERNS
 )
+from app.parser import pattern_stats
+from app.parser.pattern_stats import PatternStats
+from app.parser import memo
+from app.parser.memo import extract_fields_cached, detect_issuer_cached, text_fingerprint
+from app.utils.lru import LRUCache
+from app.parser.results import FieldResult, Method, StatementResult
+from app.utils.serialization import dumps
+import json
+import sys
+import threading
+import time
+import types
+from app.parser.normalizers import (
+    parse_statement_date,
+    parse_amount,
+    parse_billing_cycle,
+    typed_columns
+)
+from app.parser.pdf_reader import iter_page_analysis
+from app.parser.ocr_handler import preprocess_image
+from app.parser.image_ops import adaptive_binarize, estimate_skew, collapse_blank_rows
+from app.parser import ocr_backends
+from app.parser.ocr_backends import OCRBackend, OCRWorkerPool, PytesseractBackend, create_backend
+from app.parser.ocr_cache import OCRCache, ocr_cache_key
+from app.parser import text_backends
+from app.parser.text_backends import PyPDF2Extractor, TextBackendChain, TextExtractor, build_chain
+from app.parser.batch import score_batch, FIELD_NAMES, METHOD_CODES
+from app.parser.segmentation import SegmentParser, page_signature, segment_pages
+from app.config import settings
+from datetime import date
+from decimal import Decimal
+import numpy as np
+from PIL import Image, ImageDraw
+import app.pipeline
+from app.pipeline import extract_document_pages, join_pages, page_ends
+from tests.pdf_samples import make_pdf
+
+STATEMENT_LINES = [
+    "HDFC Bank Credit Card Statement",
+    "Card Number: XXXX XXXX XXXX 5678",
+    "Statement Period: 01/01/2024 to 31/01/2024",
+    "Payment Due Date: 20/02/2024",
+    "Total Amount Due: 25,450.00",
+]
 
 
 class TestIssuerDetection:
@@ -159,6 +206,590 @@ class TestFullExtraction:
             assert "method" in field_data
 
 
+class TestResultTypes:
+    """Test slotted result objects and their JSON form"""
+    
+    def test_results_are_slotted(self):
+        fields = extract_fields("\n".join(STATEMENT_LINES), "HDFC Bank")
+        assert isinstance(fields, StatementResult)
+        assert not hasattr(fields["due_date"], "__dict__")
+        assert fields["due_date"].method is Method.REGEX
+        assert fields["due_date"]["method"] == "regex"
+        assert list(fields) == ["issuer", "card_last_four", "billing_cycle", "due_date", "total_amount_due"]
+    
+    def test_serialized_like_dict_results(self):
+        fields = extract_fields("\n".join(STATEMENT_LINES), "HDFC Bank")
+        data = json.loads(dumps({"extracted_fields": fields}))["extracted_fields"]
+        
+        assert data["card_last_four"] == {
+            "value": "5678", "confidence": 0.9, "method": "regex", "normalized": None
+        }
+        assert data["due_date"]["normalized"] == "2024-02-20"
+        assert data["total_amount_due"]["normalized"] == "25450.00"
+        assert data["billing_cycle"]["normalized"] == {"start": "2024-01-01", "end": "2024-01-31"}
+    
+    def test_missing_field_lookup(self):
+        result = StatementResult(issuer=FieldResult("Unknown", 0.5, Method.PATTERN_MATCHING))
+        assert "due_date" not in result
+        assert result.get("due_date") is None
+        with pytest.raises(KeyError):
+            result["due_date"]
+
+
+class TestNormalization:
+    """Test typed values derived from display strings"""
+    
+    def test_parse_date_formats(self):
+        assert parse_statement_date("15/02/2024") == date(2024, 2, 15)
+        assert parse_statement_date("27-08-2025") == date(2025, 8, 27)
+        assert parse_statement_date("03-Aug-25") == date(2025, 8, 3)
+        assert parse_statement_date("22 Sep 2025") == date(2025, 9, 22)
+        assert parse_statement_date("1-January-2024") == date(2024, 1, 1)
+    
+    def test_parse_invalid_date(self):
+        assert parse_statement_date("Invalid-Date-Format") is None
+        assert parse_statement_date(None) is None
+    
+    def test_parse_amount(self):
+        assert parse_amount("₹1234.00") == Decimal("1234.00")
+        assert parse_amount("Rs. 5,000") == Decimal("5000.00")
+        assert parse_amount(None) is None
+    
+    def test_parse_billing_cycle(self):
+        start, end = parse_billing_cycle("26-Jul-2025 to 25-Aug-2025")
+        assert start == date(2025, 7, 26)
+        assert end == date(2025, 8, 25)
+    
+    def test_extract_fields_emits_typed_columns(self):
+        text = """
+        HDFC Bank Credit Card Statement
+        Statement Period: 01/01/2024 to 31/01/2024
+        Payment Due Date: 20/02/2024
+        Total Amount Due: ₹25,450.00
+        """
+        fields = extract_fields(text, "HDFC Bank")
+        assert fields["due_date"]["normalized"] == date(2024, 2, 20)
+        
+        columns = typed_columns(fields)
+        assert columns["cycle_start"] == date(2024, 1, 1)
+        assert columns["cycle_end"] == date(2024, 1, 31)
+        assert columns["due_on"] == date(2024, 2, 20)
+        assert columns["amount_due"] == Decimal("25450.00")
+
+
+class TestBatchScoring:
+    """Test columnar batch scoring"""
+    
+    def test_batch_shapes_and_values(self):
+        texts = [
+            """HDFC Bank Credit Card Statement
+            Card Number: XXXX XXXX XXXX 5678
+            Statement Period: 01/01/2024 to 31/01/2024
+            Payment Due Date: 20/02/2024
+            Total Amount Due: ₹25,450.00""",
+            "Nothing useful here",
+        ]
+        scores = score_batch(texts)
+        
+        assert len(scores) == 2
+        assert scores.confidence.shape == (2, len(FIELD_NAMES))
+        assert scores.values[0, scores.column("card_last_four")] == "5678"
+        assert scores.method[1, scores.column("due_date")] == METHOD_CODES["not_found"]
+        assert scores.due_on[0] == np.datetime64("2024-02-20")
+        assert np.isnat(scores.due_on[1])
+        assert scores.amount_due[0] == 25450.0
+    
+    def test_batch_checks(self):
+        texts = [
+            "Statement Period: 01/01/2024 to 31/01/2024 Payment Due Date: 20/02/2024 Total Amount Due: 100.00",
+            "Statement Period: 01/01/2024 to 31/01/2024 Payment Due Date: 20/12/2023 Total Amount Due: 100.00",
+        ]
+        scores = score_batch(texts, issuers=["HDFC Bank", "HDFC Bank"])
+        
+        assert scores.checks["due_after_cycle_end"].tolist() == [True, False]
+        assert scores.checks["amount_in_range"].tolist() == [True, True]
+        assert np.allclose(scores.overall_confidence, scores.confidence.mean(axis=1))
+    
+    def test_batch_matches_upload_windows(self):
+        header = "HDFC Bank Credit Card Statement\nTotal Amount Due: 1,000.00\n"
+        text = header + "Total Payment Due 2,000.00 Dr"
+        ends = [len(header), len(text)]
+        scores = score_batch([text], page_ends=[ends])
+        
+        expected = extract_fields(text, "HDFC Bank", ends)["total_amount_due"]["value"]
+        assert scores.values[0, scores.column("total_amount_due")] == expected == "₹1000.00"
+
+
+class TestOCRCache:
+    """Test the page-level OCR result cache"""
+    
+    def test_key_depends_on_image_and_settings(self):
+        blank = Image.new("L", (100, 100), 255)
+        dark = Image.new("L", (100, 100), 0)
+        assert ocr_cache_key(blank, 300, 6, "eng") == ocr_cache_key(blank.copy(), 300, 6, "eng")
+        assert ocr_cache_key(blank, 300, 6, "eng") != ocr_cache_key(dark, 300, 6, "eng")
+        assert ocr_cache_key(blank, 300, 6, "eng") != ocr_cache_key(blank, 200, 6, "eng")
+    
+    def test_hit_miss_and_persistence(self, tmp_path):
+        cache = OCRCache(str(tmp_path), max_bytes=1024)
+        assert cache.get("ab12") is None
+        cache.put("ab12", "Terms and conditions")
+        assert cache.get("ab12") == "Terms and conditions"
+        assert cache.stats()["hit_rate"] == 0.5
+        
+        # A new instance picks up entries already on disk
+        assert OCRCache(str(tmp_path), max_bytes=1024).get("ab12") == "Terms and conditions"
+    
+    def test_lru_eviction(self, tmp_path):
+        cache = OCRCache(str(tmp_path), max_bytes=25)
+        cache.put("aa01", "x" * 10)
+        cache.put("aa02", "y" * 10)
+        cache.get("aa01")  # aa02 is now least recently used
+        cache.put("aa03", "z" * 10)
+        
+        assert cache.get("aa02") is None
+        assert cache.get("aa01") == "x" * 10
+        assert cache.stats()["evictions"] == 1
+    
+    def test_shared_directory_stays_bounded(self, tmp_path):
+        first = OCRCache(str(tmp_path), max_bytes=25, rescan_seconds=0)
+        second = OCRCache(str(tmp_path), max_bytes=25, rescan_seconds=0)
+        for index in range(4):
+            first.put(f"aa{index:02d}", "x" * 10)
+            second.put(f"bb{index:02d}", "y" * 10)
+        
+        on_disk = sum(path.stat().st_size for path in tmp_path.glob("*/*.txt"))
+        assert on_disk <= 25
+        assert second.get("bb03") == "y" * 10
+
+
+class TestPageRouting:
+    """Test the per-page text layer vs OCR decision"""
+    
+    def test_page_analysis(self, tmp_path):
+        pdf_path = tmp_path / "mixed.pdf"
+        pdf_path.write_bytes(make_pdf([STATEMENT_LINES, [], []], image_pages=[1]))
+        pages = list(iter_page_analysis(str(pdf_path)))
+        
+        assert [p["needs_ocr"] for p in pages] == [False, True, False]
+        assert pages[1]["has_images"]
+        assert "HDFC Bank" in pages[0]["text"]
+    
+    def test_only_scanned_pages_are_ocrd(self, tmp_path, monkeypatch):
+        requested = []
+        
+        def fake_ocr(file_path, page_numbers=None):
+            requested.append(page_numbers)
+            return ["Scanned terms page"] * len(page_numbers)
+        
+        monkeypatch.setattr(app.pipeline, "extract_pages_with_ocr", fake_ocr)
+        pdf_path = tmp_path / "mixed.pdf"
+        pdf_path.write_bytes(make_pdf([STATEMENT_LINES, [], STATEMENT_LINES], image_pages=[1]))
+        
+        pages = extract_document_pages(str(pdf_path))
+        assert requested == [[2]]
+        assert [p["source"] for p in pages] == ["text", "ocr", "text"]
+        assert pages[1]["text"] == "Scanned terms page"
+    
+    def test_digital_pdf_skips_ocr(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(app.pipeline, "extract_pages_with_ocr", lambda *a, **k: pytest.fail("OCR called"))
+        pdf_path = tmp_path / "digital.pdf"
+        pdf_path.write_bytes(make_pdf([STATEMENT_LINES]))
+        
+        pages = extract_document_pages(str(pdf_path))
+        assert pages[0]["source"] == "text"
+
+
+class BrokenExtractor(TextExtractor):
+    """Text backend that cannot read anything"""
+    name = "broken"
+    
+    def iter_pages(self, file_path):
+        raise ValueError("unsupported PDF")
+
+
+class SlowExtractor(PyPDF2Extractor):
+    """PyPDF2 with a fixed delay, so the benchmark ranks it last"""
+    name = "slow"
+    
+    def iter_pages(self, file_path):
+        time.sleep(0.01)
+        yield from super().iter_pages(file_path)
+
+
+class TestTextBackends:
+    """Test PDF text backend selection and per-document fallback"""
+    
+    def test_pypdf2_reads_layers(self, tmp_path):
+        pdf_path = tmp_path / "mixed.pdf"
+        pdf_path.write_bytes(make_pdf([STATEMENT_LINES, []], image_pages=[1]))
+        layers = PyPDF2Extractor().read_pages(str(pdf_path))
+        
+        assert "HDFC Bank" in layers[0]["text"]
+        assert [layer["has_images"] for layer in layers] == [False, True]
+        assert layers[0]["area"] == 612 * 792
+    
+    def test_backend_must_iter_pages(self):
+        class Incomplete(TextExtractor):
+            name = "incomplete"
+        with pytest.raises(TypeError):
+            Incomplete()
+    
+    def test_pdfium_calls_are_serialized(self, monkeypatch):
+        active, overlaps = [0], []
+        
+        class Fake:
+            """Stands in for pypdfium2 documents, pages and text pages"""
+            def __init__(self, *args):
+                pass
+            def __len__(self):
+                return 3
+            def __getitem__(self, index):
+                if index >= 3:
+                    raise IndexError(index)
+                return Fake()
+            def get_textpage(self):
+                return self
+            def get_objects(self, **kwargs):
+                return []
+            def get_text_range(self):
+                active[0] += 1
+                overlaps.append(active[0] > 1)
+                time.sleep(0.01)
+                active[0] -= 1
+                return "text"
+            def get_width(self):
+                return 612
+            def get_height(self):
+                return 792
+            def close(self):
+                pass
+        
+        raw = types.SimpleNamespace(FPDF_PAGEOBJ_IMAGE=3)
+        monkeypatch.setitem(sys.modules, "pypdfium2", types.SimpleNamespace(PdfDocument=Fake, raw=raw))
+        monkeypatch.setitem(sys.modules, "pypdfium2.raw", raw)
+        extractor = text_backends.PdfiumExtractor()
+        
+        threads = [threading.Thread(target=extractor.read_pages, args=("statement.pdf",)) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(overlaps) == 12 and not any(overlaps)
+    
+    def test_falls_back_per_document(self, tmp_path):
+        pdf_path = tmp_path / "digital.pdf"
+        pdf_path.write_bytes(make_pdf([STATEMENT_LINES]))
+        chain = TextBackendChain([BrokenExtractor(), PyPDF2Extractor()])
+        
+        assert "HDFC Bank" in chain.read_pages(str(pdf_path))[0]["text"]
+        assert chain.stats()["documents"] == {"broken": 0, "pypdf2": 1}
+        assert chain.fallbacks == 1
+    
+    def test_auto_ranks_by_benchmark(self, monkeypatch):
+        monkeypatch.setattr(
+            text_backends, "available_backends", lambda: [SlowExtractor(), BrokenExtractor(), PyPDF2Extractor()]
+        )
+        chain = build_chain("auto")
+        
+        assert chain.stats()["order"] == ["pypdf2", "slow", "broken"]
+        assert "error" in chain.timings["broken"]
+    
+    def test_named_backend_first(self, monkeypatch):
+        monkeypatch.setattr(text_backends, "available_backends", lambda: [SlowExtractor(), PyPDF2Extractor()])
+        assert build_chain("pypdf2").stats()["order"] == ["pypdf2", "slow"]
+        with pytest.raises(ValueError):
+            build_chain("nonexistent")
+
+
+def _text_like_page(skew: float = 0.0) -> Image.Image:
+    """Grey page with dark bars standing in for text lines"""
+    page = Image.new("L", (1275, 1650), 235)
+    draw = ImageDraw.Draw(page)
+    for i in range(10):
+        draw.rectangle([150, 200 + i * 40, 1100, 212 + i * 40], fill=30)
+    return page.rotate(skew, fillcolor=235)
+
+
+class TestOCRPreprocessing:
+    """Test NumPy OCR preprocessing"""
+    
+    def test_binarize_handles_shading(self):
+        gray = np.full((100, 200), 200, dtype=np.uint8)
+        gray[:, 100:] = 120  # darker half of the page, no text
+        gray[40:50, 20:80] = 20
+        gray[40:50, 120:180] = 20
+        ink = adaptive_binarize(gray)
+        assert ink[45, 50] and ink[45, 150]
+        assert not ink[10, 150]
+    
+    def test_estimate_skew(self):
+        ink = ~np.asarray(_text_like_page(3.0).convert("1"))
+        assert abs(estimate_skew(ink) - 3.0) < 0.5
+    
+    def test_preprocess_deskews_and_crops(self):
+        result = preprocess_image(_text_like_page(3.0).convert("RGB"))
+        assert result.mode == "1"
+        assert result.size[0] < 1275 and result.size[1] < 1650
+        assert abs(estimate_skew(~np.asarray(result))) < 0.5
+    
+    def test_collapse_blank_rows(self):
+        ink = np.zeros((200, 10), dtype=bool)
+        ink[0:5] = True
+        ink[150:155] = True
+        assert collapse_blank_rows(ink, max_blank=20).shape == (50, 10)
+
+
+class SizeBackend(OCRBackend):
+    """Test backend that 'recognizes' the image size and its worker pid"""
+    name = "size"
+    
+    def recognize(self, image):
+        import os
+        return f"{image.mode} {image.size[0]}x{image.size[1]} {os.getpid()}"
+
+
+class TestOCRBackends:
+    """Test OCR backend selection and the worker pool"""
+    
+    def test_auto_falls_back_to_pytesseract(self, monkeypatch):
+        def unavailable():
+            raise ImportError("No module named 'tesserocr'")
+        monkeypatch.setitem(ocr_backends.BACKENDS, "tesserocr", unavailable)
+        monkeypatch.setattr(ocr_backends, "TesserocrBackend", unavailable)
+        assert isinstance(create_backend("auto"), PytesseractBackend)
+    
+    def test_backend_must_recognize(self):
+        class Incomplete(OCRBackend):
+            name = "incomplete"
+        with pytest.raises(TypeError):
+            Incomplete()
+    
+    def test_in_process_pool(self, monkeypatch):
+        monkeypatch.setitem(ocr_backends.BACKENDS, "size", SizeBackend)
+        pool = OCRWorkerPool("size", workers=0)
+        assert pool.recognize(Image.new("1", (30, 20))).startswith("1 30x20")
+    
+    def test_worker_processes_keep_backend(self, monkeypatch):
+        monkeypatch.setitem(ocr_backends.BACKENDS, "size", SizeBackend)
+        pool = OCRWorkerPool("size", workers=1)
+        try:
+            first = pool.recognize(Image.new("L", (30, 20)))
+            second = pool.recognize(Image.new("1", (7, 5)))
+        finally:
+            pool.shutdown()
+        assert first.startswith("L 30x20") and second.startswith("1 7x5")
+        # Same long-lived worker process served both images
+        assert first.split()[-1] == second.split()[-1]
+    
+    def test_pool_recycled_after_max_tasks(self, monkeypatch):
+        monkeypatch.setitem(ocr_backends.BACKENDS, "size", SizeBackend)
+        pool = OCRWorkerPool("size", workers=1, max_tasks=2)
+        try:
+            pids = [pool.recognize(Image.new("1", (7, 5))).split()[-1] for _ in range(3)]
+        finally:
+            pool.shutdown()
+        # The first worker served two pages, then a fresh one took over
+        assert pids[0] == pids[1] != pids[2]
+        assert pool.stats()["recycled"] == 1 and pool.stats()["worker_peak_rss_mb"] > 0
+
+
+class TestHeaderWindow:
+    """Test header-first extraction with escalation"""
+    
+    def test_windows_without_pages(self):
+        short = "\n".join(STATEMENT_LINES)
+        assert extraction_windows(short, header_chars=4000) == [len(short)]
+        
+        long_text = "x" * 50 + "\n" + "y" * 100
+        assert extraction_windows(long_text, header_chars=10) == [50, len(long_text)]
+    
+    def test_windows_double_page_count(self):
+        assert extraction_windows("a" * 50, page_ends=[10, 20, 30, 40, 50]) == [10, 20, 40, 50]
+    
+    def test_page_ends_match_joined_text(self):
+        pages = [
+            {"page": 1, "source": "text", "text": "  first"},
+            {"page": 2, "source": "ocr", "text": ""},
+            {"page": 3, "source": "text", "text": "second"},
+        ]
+        text = join_pages(pages)
+        ends = page_ends(pages)
+        assert text[:ends[0]] == "first"
+        assert text[ends[0] + 1:ends[1]] == "second"
+    
+    def test_low_confidence_fields_escalate(self):
+        header = "\n".join(STATEMENT_LINES[:4])
+        padding = "\n".join(f"Transaction {i} 100.00" for i in range(200))
+        text = f"{header}\n{padding}\nTotal Amount Due: 1,234.00"
+        
+        fields = extract_fields(text, "HDFC Bank")
+        assert fields["card_last_four"]["value"] == "5678"
+        assert fields["total_amount_due"]["value"] == "₹1234.00"
+    
+    def test_confident_fields_stop_at_header(self, monkeypatch):
+        scanned = []
+        
+        def recording(text, issuer):
+            scanned.append(len(text))
+            return extract_card(text, issuer)
+        
+        extract_card = FIELD_EXTRACTORS["card_last_four"]
+        monkeypatch.setitem(FIELD_EXTRACTORS, "card_last_four", recording)
+        
+        text = "\n".join(STATEMENT_LINES) + "\n" + "z" * 10000
+        fields = extract_fields(text, "HDFC Bank", page_ends=[len(text) - 10001, len(text)])
+        assert fields["card_last_four"]["value"] == "5678"
+        assert scanned == [len(text) - 10001]
+
+
+class TestPatternStats:
+    """Test pattern win statistics"""
+    
+    def test_extractor_records_wins(self, monkeypatch):
+        stats = PatternStats()
+        monkeypatch.setattr(pattern_stats, "_stats", stats)
+        
+        extract_fields("Card Number: 4147 XXXX XXXX 1420", "Kotak Mahindra")
+        wins = stats.counts()["card_last_four"]["Kotak Mahindra"]
+        assert sum(wins.values()) == 1
+    
+    def test_only_final_window_win_is_recorded(self, monkeypatch):
+        stats = PatternStats()
+        monkeypatch.setattr(pattern_stats, "_stats", stats)
+        monkeypatch.setattr(settings, "EXTRACT_CONFIDENCE_THRESHOLD", 0.9)
+        
+        # A pattern finds an amount on the header page, but the search widens
+        # and the Axis summary on page 2 replaces it
+        header = "Card Number: 4147 XXXX XXXX 1420\nTotal Amount Due: 1,000.00\n"
+        text = header + "Total Payment Due 2,000.00 Dr\n"
+        fields = extract_fields(text, "Axis Bank", page_ends=[len(header), len(text)])
+        assert fields["total_amount_due"]["value"] == "₹2000.00"
+        
+        counts = stats.counts()
+        assert "total_amount_due" not in counts
+        assert sum(counts["card_last_four"]["Axis Bank"].values()) == 1
+    
+    def test_persistence_merges_processes(self, tmp_path):
+        path = tmp_path / "stats.json"
+        first = PatternStats(str(path), save_every=1000)
+        second = PatternStats(str(path), save_every=1000)
+        first.record("due_date", "HDFC Bank", CARD_PATTERNS[0])
+        second.record("due_date", "HDFC Bank", CARD_PATTERNS[0])
+        first.save()
+        second.save()
+        
+        reloaded = PatternStats(str(path))
+        assert reloaded.counts()["due_date"]["HDFC Bank"][CARD_PATTERNS[0].pattern] == 2
+
+
+class TestParseMemo:
+    """Test memoized parsing and the LRU cache behind it"""
+    
+    def test_lru_eviction_and_ttl(self, monkeypatch):
+        cache = LRUCache(max_entries=2, ttl_seconds=10)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        assert cache.get("a") == 1
+        cache.put("c", 3)  # evicts "b", the least recently used
+        assert cache.get("b") is None
+        
+        now = [1000.0]
+        monkeypatch.setattr("app.utils.lru.time.monotonic", lambda: now[0])
+        cache.put("d", 4)
+        now[0] += 11
+        assert cache.get("d") is None
+        assert cache.stats()["expirations"] == 1
+    
+    def test_identical_text_is_scanned_once(self, monkeypatch):
+        monkeypatch.setattr(memo, "_memo", LRUCache(16))
+        calls = []
+        monkeypatch.setattr(memo, "extract_fields", lambda *args: calls.append(args) or {"x": {"value": 1}})
+        
+        text = "\n".join(STATEMENT_LINES)
+        first = extract_fields_cached(text, "HDFC Bank")
+        first["x"]["value"] = 2  # Callers get their own copy
+        second = extract_fields_cached(text, "HDFC Bank")
+        
+        assert len(calls) == 1
+        assert second == {"x": {"value": 1}}
+        assert detect_issuer_cached(text) == detect_issuer_cached(text) == "HDFC Bank"
+        assert memo._memo.stats()["hits"] == 2
+    
+    def test_fingerprint_includes_parser_version(self, monkeypatch):
+        before = text_fingerprint("statement")
+        monkeypatch.setattr(memo, "PARSER_VERSION", "next")
+        assert text_fingerprint("statement") != before
+
+
+def statement_lines(month: int, card: str) -> list:
+    return [
+        "HDFC Bank Credit Card Statement",
+        f"Card Number: XXXX XXXX XXXX {card}",
+        f"Statement Period: 01/{month:02d}/2024 to 28/{month:02d}/2024",
+        f"Payment Due Date: 20/{month + 1:02d}/2024",
+        f"Total Amount Due: {month},000.00",
+    ]
+
+
+class TestSegmentation:
+    """Test splitting multi-statement PDFs"""
+    
+    def test_page_signature(self):
+        assert page_signature("\n".join(STATEMENT_LINES)) == {
+            "issuer": "HDFC Bank", "card": "5678", "period": "01/01/2024 31/01/2024"
+        }
+        assert page_signature("05/01/2024 SWIGGY BANGALORE 450.00") == {"issuer": None, "card": None, "period": None}
+    
+    def test_splits_on_new_period_or_card(self):
+        texts = [
+            statement_lines(1, "1111"),
+            ["05/01/2024 SWIGGY BANGALORE 450.00"],
+            statement_lines(1, "1111")[:2],  # Repeated header of the same statement
+            statement_lines(2, "1111"),
+            statement_lines(2, "2222"),
+            ["Reward points period 01/04/2023 to 31/03/2024"],  # One field only: no split
+        ]
+        pages = [{"page": i, "source": "text", "text": "\n".join(lines)} for i, lines in enumerate(texts, start=1)]
+        assert [[p["page"] for p in segment] for segment in segment_pages(pages)] == [[1, 2, 3], [4], [5, 6]]
+    
+    def test_single_statement_is_one_segment(self):
+        pages = [{"page": 1, "text": "\n".join(STATEMENT_LINES)}, {"page": 2, "text": "Transactions"}]
+        assert len(segment_pages(pages)) == 1
+    
+    def test_unlabeled_ranges_do_not_split(self):
+        pages = [
+            {"page": 1, "text": "HDFC Bank Credit Card Statement\n"
+                                "Statement Period 01/01/2024 - 31/01/2024\nCard No: 4514****5541"},
+            # Repeated issuer header, an EMI schedule range and a masked add-on card
+            {"page": 2, "text": "HDFC Bank Page 2\nSmartEMI booked 15/12/2023 - 15/06/2024\n"
+                                "Add-on XXXX XXXX XXXX 1234"},
+        ]
+        assert page_signature(pages[1]["text"]) == {"issuer": "HDFC Bank", "card": None, "period": None}
+        assert [[p["page"] for p in segment] for segment in segment_pages(pages)] == [[1, 2]]
+    
+    def test_parallel_parse_matches_serial(self, monkeypatch):
+        stats = PatternStats()
+        monkeypatch.setattr(pattern_stats, "_stats", stats)  # Forked workers write nothing to disk
+        monkeypatch.setattr(memo, "_memo", LRUCache(64))
+        segments = [("\n".join(statement_lines(month, "1111")), []) for month in range(1, 6)]
+        parallel = SegmentParser(workers=2, parallel_min=2)
+        try:
+            results = parallel.parse(segments)
+            # Worker wins and results land in this process
+            assert sum(stats.counts()["total_amount_due"]["HDFC Bank"].values()) == 5
+            again = parallel.parse(segments)
+        finally:
+            parallel.shutdown()
+        serial = SegmentParser(workers=0).parse(segments)
+        
+        assert parallel.stats()["parallel_documents"] == 1
+        assert parallel.stats()["serial_documents"] == 1  # Second parse served from the memo
+        assert [r["total_amount_due"]["value"] for _, r in results] == [f"₹{m}000.00" for m in range(1, 6)]
+        assert [(i, dumps(r)) for i, r in results] == [(i, dumps(r)) for i, r in serial]
+        assert [(i, dumps(r)) for i, r in again] == [(i, dumps(r)) for i, r in serial]
+
+
 class TestEdgeCases:
     """Test edge cases and error handling"""
     
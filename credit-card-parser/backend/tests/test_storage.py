@@ -0,0 +1,480 @@
+"""
+Stored statement text, re-extraction, write-behind, read routing,
+retention and job queue tests
+"""
+import csv
+import gzip
+import uuid
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+
+from app.admission import Saturated
+from app.config import settings
+from app.database import engine, SessionLocal, Base, ReadRouter
+from app.jobs import (
+    claim_job, complete_job, enqueue_job, fail_job, queue_stats, reap_expired_leases, renew_lease
+)
+from app.models import ParsedStatement, ParseJob, StatementText
+from app.parser import pattern_stats
+from app.pipeline import join_pages, page_ends, parse_text
+from app.reextract import reextract_statements
+from app.result_cache import get_result_cache, serialize_result
+from app.search import InvertedIndex, get_text_index, search_statements, tokenize
+from app.retention import add_months, ensure_partitions, partition_month, partition_name, run_retention
+from app.text_store import build_statement_text, load_fields, load_text, load_pages
+from app.write_behind import WriteBehindWriter, close_writer, store_statement, store_statements
+from app.utils.compression import compress_text, decompress_text
+
+Base.metadata.create_all(bind=engine)
+
+SAMPLE_TEXT = """
+HDFC Bank Credit Card Statement
+Card Number: XXXX XXXX XXXX 5678
+Statement Period: 01/01/2024 to 31/01/2024
+Payment Due Date: 20/02/2024
+Total Amount Due: ₹25,450.00
+"""
+
+
+def test_compression_round_trip():
+    codec, blob = compress_text(SAMPLE_TEXT * 20)
+    assert len(blob) < len(SAMPLE_TEXT * 20)
+    assert decompress_text(codec, blob) == SAMPLE_TEXT * 20
+
+
+def test_statement_text_round_trip():
+    pages = [
+        {"page": 1, "source": "text", "text": "page one"},
+        {"page": 2, "source": "ocr", "text": "page two"},
+    ]
+    record = build_statement_text("abc", SAMPLE_TEXT, pages)
+    assert record.text_length == len(SAMPLE_TEXT)
+    assert load_text(record) == SAMPLE_TEXT
+    assert load_pages(record)[1] == {"page": 2, "source": "ocr", "text": "page two"}
+
+
+def test_reextract_updates_rows_from_stored_text():
+    statement_id = str(uuid.uuid4())
+    db = SessionLocal()
+    try:
+        # Row as written by an older, worse extractor
+        db.add(ParsedStatement(
+            id=statement_id,
+            filename="old.pdf",
+            issuer="Unknown",
+            confidence_score=0.1
+        ))
+        db.add(build_statement_text(statement_id, SAMPLE_TEXT))
+        db.commit()
+    finally:
+        db.close()
+
+    stats = reextract_statements(batch_size=2, workers=1)
+    assert stats["processed"] >= 1
+
+    db = SessionLocal()
+    try:
+        row = db.get(ParsedStatement, statement_id)
+        assert row.issuer == "HDFC Bank"
+        assert row.card_last_four == "5678"
+        assert row.due_on == date(2024, 2, 20)
+        assert row.confidence_score > 0.8
+    finally:
+        db.close()
+
+
+def test_reextract_uses_stored_page_windows():
+    """Re-extraction searches the same page windows as the upload did"""
+    pages = [
+        {"page": 1, "source": "text", "text": "HDFC Bank Credit Card Statement\nTotal Amount Due: 1,000.00"},
+        {"page": 2, "source": "text", "text": "Total Payment Due 2,000.00 Dr"},
+    ]
+    text = join_pages(pages)
+    assert parse_text(text, page_ends(pages))[1]["total_amount_due"]["value"] == "₹1000.00"
+
+    statement_id = str(uuid.uuid4())
+    db = SessionLocal()
+    try:
+        db.add(ParsedStatement(id=statement_id, filename="paged.pdf", issuer="Unknown", confidence_score=0.1))
+        db.add(build_statement_text(statement_id, text, pages))
+        db.commit()
+    finally:
+        db.close()
+
+    get_result_cache().put(statement_id, (b"{}", '"stale"'))
+    reextract_statements(batch_size=50, workers=1)
+    assert get_result_cache().get(statement_id) is None
+
+    db = SessionLocal()
+    try:
+        assert db.get(ParsedStatement, statement_id).amount_due == 1000
+        # Replays follow the re-extracted values
+        assert load_fields(db.get(StatementText, statement_id))["total_amount_due"]["value"] == "₹1000.00"
+    finally:
+        db.close()
+
+
+def test_reextract_records_no_pattern_wins(tmp_path, monkeypatch):
+    """Backfills leave the pattern statistics of live traffic alone"""
+    statement_id = str(uuid.uuid4())
+    db = SessionLocal()
+    try:
+        db.add(ParsedStatement(id=statement_id, filename="wins.pdf", issuer="Unknown", confidence_score=0.1))
+        db.add(build_statement_text(statement_id, f"HDFC Bank\nCard Number: XXXX XXXX XXXX 5678\n{statement_id}"))
+        db.commit()
+    finally:
+        db.close()
+
+    stats_path = tmp_path / "pattern_stats.json"
+    monkeypatch.setattr(settings, "PATTERN_STATS_PATH", str(stats_path))
+    monkeypatch.setattr(settings, "PATTERN_STATS_SAVE_EVERY", 1)
+    monkeypatch.setattr(pattern_stats, "_stats", None)
+    reextract_statements(batch_size=50, workers=1)
+    assert not stats_path.exists()
+
+
+def _statement(statement_id: str) -> ParsedStatement:
+    return ParsedStatement(
+        id=statement_id,
+        filename="batched.pdf",
+        issuer="HDFC Bank",
+        confidence_score=0.9,
+        created_at=datetime.utcnow()
+    )
+
+
+def test_write_behind_group_commits():
+    writer = WriteBehindWriter(batch_size=4, flush_interval=0.05)
+    ids = [str(uuid.uuid4()) for _ in range(10)]
+    try:
+        futures = [writer.submit(_statement(i), build_statement_text(i, SAMPLE_TEXT)) for i in ids]
+        for future in futures:
+            future.result(timeout=5)
+    finally:
+        writer.close()
+
+    stats = writer.stats()
+    assert stats["rows"] == 10
+    assert stats["largest_batch"] == 4 and stats["batches"] < 10
+
+    db = SessionLocal()
+    try:
+        assert db.query(ParsedStatement).filter(ParsedStatement.id.in_(ids)).count() == 10
+        stored = db.get(StatementText, ids[0])
+        assert load_text(stored) == SAMPLE_TEXT and stored.created_at is not None
+    finally:
+        db.close()
+
+
+def test_write_behind_isolates_failing_rows():
+    existing = str(uuid.uuid4())
+    store_statement(_statement(existing), build_statement_text(existing, SAMPLE_TEXT))
+
+    writer = WriteBehindWriter(batch_size=3, flush_interval=0.05)
+    fresh = str(uuid.uuid4())
+    try:
+        duplicate = writer.submit(_statement(existing), build_statement_text(existing, SAMPLE_TEXT))
+        ok = writer.submit(_statement(fresh), build_statement_text(fresh, SAMPLE_TEXT))
+        assert ok.result(timeout=5) is None
+        with pytest.raises(Exception):
+            duplicate.result(timeout=5)
+    finally:
+        writer.close()
+    assert writer.stats()["failed_rows"] == 1
+
+
+@pytest.mark.parametrize("write_behind", [False, True])
+def test_upload_statements_commit_together(monkeypatch, write_behind):
+    """One failing segment keeps every statement of its upload out"""
+    existing, first = str(uuid.uuid4()), str(uuid.uuid4())
+    store_statement(_statement(existing), build_statement_text(existing, SAMPLE_TEXT))
+    monkeypatch.setattr(settings, "WRITE_BEHIND_ENABLED", write_behind)
+
+    records = [
+        (_statement(first), build_statement_text(first, SAMPLE_TEXT)),
+        (_statement(existing), build_statement_text(existing, SAMPLE_TEXT)),  # Duplicate key
+    ]
+    try:
+        with pytest.raises(IntegrityError):
+            store_statements(records)
+    finally:
+        close_writer()
+
+    db = SessionLocal()
+    try:
+        assert db.get(ParsedStatement, first) is None
+        assert db.get(StatementText, first) is None
+    finally:
+        db.close()
+
+
+def test_write_behind_isolates_failing_uploads():
+    existing, first, other = (str(uuid.uuid4()) for _ in range(3))
+    store_statement(_statement(existing), build_statement_text(existing, SAMPLE_TEXT))
+
+    writer = WriteBehindWriter(batch_size=10, flush_interval=0.05)
+    try:
+        failing = writer.submit_all([
+            (_statement(first), build_statement_text(first, SAMPLE_TEXT)),
+            (_statement(existing), build_statement_text(existing, SAMPLE_TEXT)),
+        ])
+        ok = writer.submit(_statement(other), build_statement_text(other, SAMPLE_TEXT))
+        assert ok.result(timeout=5) is None
+        with pytest.raises(IntegrityError):
+            failing.result(timeout=5)
+    finally:
+        writer.close()
+    assert writer.stats()["failed_rows"] == 2
+
+    db = SessionLocal()
+    try:
+        assert db.get(ParsedStatement, first) is None
+        assert db.get(ParsedStatement, other) is not None
+    finally:
+        db.close()
+
+
+def test_write_behind_drops_cancelled_uploads():
+    statement_id = str(uuid.uuid4())
+    writer = WriteBehindWriter(batch_size=10, flush_interval=0.5)
+    try:
+        future = writer.submit(_statement(statement_id), build_statement_text(statement_id, SAMPLE_TEXT))
+        assert future.cancel()  # What store_statements does when it stops waiting
+    finally:
+        writer.close()
+
+    db = SessionLocal()
+    try:
+        assert db.get(ParsedStatement, statement_id) is None
+    finally:
+        db.close()
+
+
+def test_strict_store_needs_no_reload():
+    statement_id = str(uuid.uuid4())
+    statement = _statement(statement_id)
+    store_statement(statement, build_statement_text(statement_id, SAMPLE_TEXT))
+    # Still readable after its session closed (no refresh, no lazy load)
+    assert statement.created_at is not None and statement.issuer == "HDFC Bank"
+
+
+def test_inverted_index_matches_all_words():
+    index = InvertedIndex()
+    index.add("a", "Swiggy order, Card 5678")
+    index.add("b", "SWIGGY refund")
+    assert tokenize("Card No: 5678") == ["card", "no", "5678"]
+    assert index.search(["swiggy"]) == {"a", "b"}
+    assert index.search(["swiggy", "5678"]) == {"a"}
+    assert index.search(["swiggy", "zomato"]) == set()
+    assert index.stats() == {"documents": 2, "tokens": 5}
+
+
+def test_search_statements_filters_and_text():
+    marker = f"merchant{uuid.uuid4().hex}"
+    ids = [str(uuid.uuid4()) for _ in range(3)]
+    for i, (statement_id, card, amount) in enumerate(zip(ids, ["1111", "1111", "2222"], ["500.00", "5000.00", "500.00"])):
+        statement = _statement(statement_id)
+        statement.card_last_four = card
+        statement.amount_due = amount
+        statement.due_on = date(2026, 3, 10 + i)
+        statement.created_at = datetime(2026, 2, 1 + i)
+        text = f"{SAMPLE_TEXT}\n{marker}" if i < 2 else SAMPLE_TEXT
+        store_statement(statement, build_statement_text(statement_id, text))
+
+    db = SessionLocal()
+    try:
+        get_text_index().refresh(db)
+        # Newest first; text and structured filters combine
+        found = search_statements(db, text=marker)
+        assert [row.id for row in found] == [ids[1], ids[0]]
+        assert [row.id for row in search_statements(db, text=f"{marker} hdfc", min_amount=1000)] == [ids[1]]
+        assert search_statements(db, text=marker, card_last_four="2222") == []
+        # Other tests' rows may match the structured filters; only ours are checked
+        mine = lambda rows: [row.id for row in rows if row.id in ids]
+        assert mine(search_statements(db, card_last_four="2222", due_from=date(2026, 3, 12))) == [ids[2]]
+        assert mine(search_statements(db, created_from=date(2026, 2, 2), created_to=date(2026, 2, 2))) == [ids[1]]
+        assert search_statements(db, text="  ,, ") == []
+    finally:
+        db.close()
+
+
+def _sessions(url: str) -> sessionmaker:
+    sessions_engine = create_engine(url)
+    Base.metadata.create_all(bind=sessions_engine)
+    return sessionmaker(bind=sessions_engine)
+
+
+def _find(statement_id: str):
+    return lambda db: db.get(ParsedStatement, statement_id)
+
+
+def test_read_router_prefers_replica(tmp_path):
+    replica = _sessions(f"sqlite:///{tmp_path}/replica.db")
+    router = ReadRouter(SessionLocal, replica)
+    statement_id = str(uuid.uuid4())
+    store_statement(_statement(statement_id), build_statement_text(statement_id, SAMPLE_TEXT))
+
+    # Not replicated yet: the replica's miss is retried on the primary
+    assert router.run(_find(statement_id)) is None
+    assert router.run(_find(statement_id), retry_on_primary=lambda row: row is None).id == statement_id
+    assert router.run(_find(statement_id), use_primary=True).id == statement_id
+
+    stats = router.stats()
+    assert (stats["replica"], stats["lag_retries"], stats["sticky"], stats["primary"]) == (1, 1, 1, 2)
+
+
+def test_read_router_falls_back_when_replica_fails(tmp_path):
+    broken = sessionmaker(bind=create_engine(f"sqlite:///{tmp_path}/missing/replica.db"))
+    router = ReadRouter(SessionLocal, broken, retry_seconds=60)
+    statement_id = str(uuid.uuid4())
+    store_statement(_statement(statement_id), build_statement_text(statement_id, SAMPLE_TEXT))
+
+    assert router.run(_find(statement_id)).id == statement_id
+    assert router.run(_find(statement_id)).id == statement_id
+    stats = router.stats()
+    # The replica is skipped after its first failure
+    assert stats["replica_errors"] == 1 and stats["primary"] == 2
+    assert not stats["replica_available"]
+
+
+def test_partition_months():
+    month = datetime(2024, 11, 1)
+    assert add_months(month, 2) == datetime(2025, 1, 1)
+    assert add_months(month, -11) == datetime(2023, 12, 1)
+    assert partition_name(month) == "parsed_statements_y2024m11"
+    assert partition_month("parsed_statements_y2024m11") == month
+    assert partition_month("parsed_statements_default") is None
+
+
+def test_statement_id_unique_without_partitions():
+    """Test the (id, created_at) key does not allow duplicate ids on SQLite"""
+    statement_id = str(uuid.uuid4())
+    db = SessionLocal()
+    try:
+        db.add(ParsedStatement(id=statement_id, filename="a.pdf", issuer="HDFC Bank",
+                               confidence_score=0.9, created_at=datetime(2024, 1, 1)))
+        db.commit()
+        db.add(ParsedStatement(id=statement_id, filename="b.pdf", issuer="HDFC Bank",
+                               confidence_score=0.9, created_at=datetime(2024, 2, 1)))
+        with pytest.raises(IntegrityError):
+            db.commit()
+        db.rollback()
+    finally:
+        db.close()
+
+
+def test_retention_without_partitions(tmp_path):
+    now = datetime(2026, 10, 18)
+    old_id, kept_id = str(uuid.uuid4()), str(uuid.uuid4())
+    old, kept = _statement(old_id), _statement(kept_id)
+    old.created_at = datetime(2025, 8, 31, 23, 59)
+    kept.created_at = datetime(2025, 9, 1)
+    store_statement(old, build_statement_text(old_id, SAMPLE_TEXT))
+    store_statement(kept, build_statement_text(kept_id, SAMPLE_TEXT))
+
+    with engine.begin() as connection:
+        assert ensure_partitions(connection, now=now) == []  # SQLite: no partitions
+
+    assert run_retention(months=0, archive_dir=str(tmp_path), now=now)["archives"] == []
+    preview = run_retention(months=13, archive_dir=str(tmp_path), now=now, dry_run=True)
+    assert preview["cutoff"] == "2025-09-01T00:00:00" and preview["rows"] >= 1
+
+    get_result_cache().put(old_id, serialize_result(old))
+    result = run_retention(months=13, archive_dir=str(tmp_path), now=now)
+    assert get_result_cache().get(old_id) is None  # Deleted results are not served from memory
+    statements_file, texts_file = result["archives"]
+    with gzip.open(statements_file, "rt", newline="") as archive:
+        archived = {row["id"] for row in csv.DictReader(archive)}
+    with gzip.open(texts_file, "rt", newline="") as archive:
+        assert old_id in {row["statement_id"] for row in csv.DictReader(archive)}
+    assert old_id in archived and kept_id not in archived
+
+    db = SessionLocal()
+    try:
+        assert db.get(ParsedStatement, old_id) is None and db.get(StatementText, old_id) is None
+        assert db.get(ParsedStatement, kept_id) is not None
+    finally:
+        db.close()
+
+
+@pytest.fixture
+def db():
+    """Session on an empty job queue"""
+    session = SessionLocal()
+    session.query(ParseJob).delete()
+    session.commit()
+    try:
+        yield session
+    finally:
+        session.query(ParseJob).delete()
+        session.commit()
+        session.close()
+
+
+def _enqueue(db, name="a.pdf"):
+    return enqueue_job(db, str(uuid.uuid4()), name, b"%PDF-1.4", "0" * 64).id
+
+
+def test_claim_is_exclusive_and_fifo(db):
+    first, second = _enqueue(db, "first.pdf"), _enqueue(db, "second.pdf")
+
+    job = claim_job(db, "worker-1")
+    assert job.id == first and job.status == "running" and job.attempts == 1
+    assert claim_job(db, "worker-2").id == second
+    assert claim_job(db, "worker-3") is None
+
+    # Only the lease holder can renew or complete
+    assert not renew_lease(db, first, "worker-2")
+    assert renew_lease(db, first, "worker-1")
+    assert complete_job(db, first, "worker-1", {"id": first, "status": "success"})
+    assert not complete_job(db, first, "worker-1", {})
+    assert db.get(ParseJob, first).content is None
+
+
+def test_failed_attempts_back_off_then_fail(db, monkeypatch):
+    monkeypatch.setattr(settings, "JOB_MAX_ATTEMPTS", 2)
+    job_id = _enqueue(db)
+
+    claim_job(db, "worker-1")
+    assert fail_job(db, job_id, "worker-1", "boom") == "queued"
+    assert claim_job(db, "worker-1") is None  # Backing off
+
+    later = datetime.utcnow() + timedelta(seconds=settings.JOB_RETRY_BACKOFF_SECONDS + 1)
+    assert claim_job(db, "worker-1", now=later).attempts == 2
+    assert fail_job(db, job_id, "worker-1", "boom again") == "failed"
+    assert queue_stats(db)["recent_failures"][0]["last_error"] == "boom again"
+
+    # Unusable input fails at once
+    other = _enqueue(db)
+    claim_job(db, "worker-1")
+    assert fail_job(db, other, "worker-1", "no text", retryable=False) == "failed"
+
+
+def test_expired_leases_are_reaped(db, monkeypatch):
+    monkeypatch.setattr(settings, "JOB_MAX_ATTEMPTS", 2)
+    job_id = _enqueue(db)
+    claim_job(db, "dead-worker")
+
+    expired = datetime.utcnow() + timedelta(seconds=settings.JOB_LEASE_SECONDS + 1)
+    assert queue_stats(db, now=expired)["stuck"][0]["lease_owner"] == "dead-worker"
+    assert reap_expired_leases(db, now=expired) == 1
+    assert claim_job(db, "worker-2", now=expired).attempts == 2
+
+    # Out of attempts: a second expiry fails the job
+    expired += timedelta(seconds=settings.JOB_LEASE_SECONDS + 1)
+    reap_expired_leases(db, now=expired)
+    db.expire_all()
+    assert db.get(ParseJob, job_id).status == "failed"
+    assert queue_stats(db)["counts"]["failed"] == 1
+
+
+def test_enqueue_rejects_when_queue_full(db, monkeypatch):
+    monkeypatch.setattr(settings, "JOB_QUEUE_MAX_PENDING", 1)
+    _enqueue(db)
+    with pytest.raises(Saturated) as exc:
+        _enqueue(db)
+    assert exc.value.status_code == 429